@@ -0,0 +1,108 @@
+"""Benchmark the output path of a fan-out bolt, comparing plain emits,
+emit_many and output buffering.
+
+For every simulated input tuple the bolt emits FANOUT tuples and acks the input
+one. Output goes to /dev/null through an unbuffered file, so that every write
+on the stream is an actual write syscall.
+
+Usage: python benchmarks/emit_benchmark.py [NUM_TUPLES] [FANOUT]
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+
+import io
+import os
+import sys
+import time
+
+from pyleus.storm import SimpleBolt
+from pyleus.storm import StormTuple
+from pyleus.storm.component import SERIALIZERS
+
+
+class CountingStream(object):
+    """Forward writes to an unbuffered file, counting write syscalls."""
+
+    def __init__(self, raw):
+        self._raw = raw
+        self.writes = 0
+
+    def write(self, data):
+        self.writes += 1
+        if not isinstance(data, bytes):
+            data = data.encode("utf-8")
+        self._raw.write(data)
+
+    def flush(self):
+        pass
+
+
+class FanOutBolt(SimpleBolt):
+
+    FANOUT = 10
+    USE_EMIT_MANY = False
+
+    def process_tuple(self, tup):
+        word, = tup.values
+        values_list = [(word, i) for i in range(self.FANOUT)]
+        if self.USE_EMIT_MANY:
+            self.emit_many(values_list, anchors=[tup], need_task_ids=False)
+        else:
+            for values in values_list:
+                self.emit(values, anchors=[tup], need_task_ids=False)
+
+
+def run(serializer, num_tuples, fanout, use_emit_many, buffering):
+    raw = io.open(os.devnull, "wb", buffering=0)
+    stream = CountingStream(raw)
+
+    bolt = FanOutBolt(input_stream=None, output_stream=stream)
+    bolt.FANOUT = fanout
+    bolt.USE_EMIT_MANY = use_emit_many
+    bolt.pyleus_config = {
+        'serializer': serializer,
+        'output_buffering': buffering,
+        'output_buffer_max_messages': 1000,
+    }
+    bolt.initialize_serializer()
+    bolt.initialize_output_buffering()
+
+    tup = StormTuple("1234", "spout", "default", 1, ("word",))
+
+    start = time.time()
+    for _ in range(num_tuples):
+        bolt._process_tuple(tup)
+        # Storm components flush right before blocking on the next read
+        bolt.flush()
+    elapsed = time.time() - start
+
+    raw.close()
+    return stream.writes, elapsed
+
+
+def main():
+    num_tuples = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    fanout = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    print("{0} input tuples, {1} emits per input tuple".format(
+        num_tuples, fanout))
+    print("{0:<10} {1:<30} {2:>12} {3:>16}".format(
+        "serializer", "mode", "writes/tuple", "input tuples/s"))
+
+    modes = [
+        ("emit", False, False),
+        ("emit_many", True, False),
+        ("emit + output_buffering", False, True),
+        ("emit_many + output_buffering", True, True),
+    ]
+    for serializer in sorted(SERIALIZERS):
+        for name, use_emit_many, buffering in modes:
+            writes, elapsed = run(
+                serializer, num_tuples, fanout, use_emit_many, buffering)
+            print("{0:<10} {1:<30} {2:>12.2f} {3:>16.0f}".format(
+                serializer, name, float(writes) / num_tuples,
+                num_tuples / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Compare the available JSON backends of the JSON serializer on realistic
+Storm multilang traffic.
+
+For every backend it measures:
+
+* encoding of the emit + ack commands a SimpleBolt sends for every tuple;
+* decoding of the bolt tuple messages Storm sends, read in bulk from a file
+  through JSONSerializer.read_msg.
+
+Usage: python benchmarks/json_backend_benchmark.py [NUM_MESSAGES]
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+
+import io
+import os
+import sys
+import tempfile
+import time
+
+from pyleus.storm import StormWentAwayError
+from pyleus.storm.serializers.json_serializer import JSON_BACKENDS
+from pyleus.storm.serializers.json_serializer import JSONSerializer
+from pyleus.storm.serializers.json_serializer import get_json_backend
+
+EMIT = {
+    'command': "emit",
+    'anchors': ["-6955786537413359385"],
+    'stream': "default",
+    'tuple': ("http://www.example.com/biz/some-business", 1431029214, 3.5),
+    'need_task_ids': False,
+}
+
+ACK = {
+    'command': "ack",
+    'id': "-6955786537413359385",
+}
+
+BOLT_TUPLE = {
+    'id': "-6955786537413359385",
+    'comp': "access-log-spout",
+    'stream': "default",
+    'task': 9,
+    'tuple': ["127.0.0.1 - - [07/May/2015:19:53:34 +0000] "
+              "\"GET /biz/some-business HTTP/1.1\" 200 2326"],
+}
+
+
+def bench_encode(backend, num_messages):
+    serializer = JSONSerializer(
+        None, io.BytesIO(), json_backend=backend.name)
+    start = time.time()
+    for _ in range(num_messages):
+        serializer.send_msg(EMIT)
+        serializer.send_msg(ACK)
+    return time.time() - start
+
+
+def bench_decode(backend, path, num_messages):
+    with io.open(path, "rb") as input_stream:
+        serializer = JSONSerializer(
+            input_stream, None, json_backend=backend.name)
+        start = time.time()
+        try:
+            while True:
+                serializer.read_msg()
+        except StormWentAwayError:
+            pass
+        return time.time() - start
+
+
+def main():
+    num_messages = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    # Input file, encoded with the standard library like Storm would
+    fd, path = tempfile.mkstemp()
+    encoded = get_json_backend("json").dumps(BOLT_TUPLE) + b"\nend\n"
+    with os.fdopen(fd, "wb") as f:
+        f.write(encoded * num_messages)
+
+    print("{0} messages".format(num_messages))
+    print("{0:<12} {1:>18} {2:>18}".format(
+        "backend", "emit+ack enc/s", "tuple dec/s"))
+
+    try:
+        for name in sorted(JSON_BACKENDS):
+            try:
+                backend = get_json_backend(name)
+            except ImportError:
+                print("{0:<12} {1:>18}".format(name, "not available"))
+                continue
+
+            encode_time = bench_encode(backend, num_messages)
+            decode_time = bench_decode(backend, path, num_messages)
+            print("{0:<12} {1:>18.0f} {2:>18.0f}".format(
+                name, num_messages / encode_time, num_messages / decode_time))
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
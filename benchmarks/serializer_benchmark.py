@@ -0,0 +1,119 @@
+"""Compare bytes on the pipe and encoding/decoding speed of all the
+serializers on a typical bolt workload: one incoming tuple, one emit and one
+ack.
+
+Usage: python benchmarks/serializer_benchmark.py [NUM_MESSAGES]
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+
+import io
+import os
+import sys
+import tempfile
+import time
+
+import msgpack
+
+from pyleus.storm import StormWentAwayError
+from pyleus.storm.component import BINARY_SERIALIZER
+from pyleus.storm.component import JSON_SERIALIZER
+from pyleus.storm.component import MSGPACK_SERIALIZER
+from pyleus.storm.component import SERIALIZERS
+from pyleus.storm.serializers import binary_serializer
+from pyleus.storm.serializers.json_serializer import get_json_backend
+
+OUTPUT_FIELDS = {'default': ["url", "timestamp", "latency"]}
+
+EMIT = {
+    'command': "emit",
+    'anchors': ["-6955786537413359385"],
+    'tuple': ("http://www.example.com/biz/some-business", 1431029214, 3.5),
+    'need_task_ids': False,
+}
+
+ACK = {
+    'command': "ack",
+    'id': "-6955786537413359385",
+}
+
+BOLT_TUPLE = {
+    'id': "-6955786537413359385",
+    'comp': "access-log-spout",
+    'stream': "default",
+    'task': 9,
+    'tuple': ["http://www.example.com/biz/some-business", 1431029214, 3.5],
+}
+
+
+def _storm_encode(serializer):
+    """Encode BOLT_TUPLE like the Java side of the serializer would."""
+    if serializer == JSON_SERIALIZER:
+        return get_json_backend("json").dumps(BOLT_TUPLE) + b"\nend\n"
+    elif serializer == MSGPACK_SERIALIZER:
+        return msgpack.packb(BOLT_TUPLE)
+    elif serializer == BINARY_SERIALIZER:
+        header = msgpack.packb([
+            binary_serializer.BOLT_TUPLE, BOLT_TUPLE['id'],
+            BOLT_TUPLE['comp'], BOLT_TUPLE['stream'], BOLT_TUPLE['task']])
+        values = msgpack.packb(BOLT_TUPLE['tuple'])
+        return binary_serializer.FRAME_HEADER.pack(
+            len(header) + len(values), len(header)) + header + values
+
+
+def _make_serializer(serializer, input_stream, output_stream):
+    kwargs = {}
+    if serializer == BINARY_SERIALIZER:
+        kwargs['output_fields'] = OUTPUT_FIELDS
+    return SERIALIZERS[serializer](input_stream, output_stream, **kwargs)
+
+
+def bench_encode(serializer, num_messages):
+    output_stream = io.BytesIO()
+    instance = _make_serializer(serializer, None, output_stream)
+    start = time.time()
+    for _ in range(num_messages):
+        instance.send_msg(EMIT)
+        instance.send_msg(ACK)
+    return time.time() - start, len(output_stream.getvalue())
+
+
+def bench_decode(serializer, num_messages):
+    fd, path = tempfile.mkstemp()
+    encoded = _storm_encode(serializer)
+    with os.fdopen(fd, "wb") as f:
+        f.write(encoded * num_messages)
+
+    try:
+        with io.open(path, "rb") as input_stream:
+            instance = _make_serializer(serializer, input_stream, None)
+            start = time.time()
+            try:
+                while True:
+                    instance.read_msg()['tuple']
+            except StormWentAwayError:
+                pass
+            return time.time() - start, len(encoded) * num_messages
+    finally:
+        os.remove(path)
+
+
+def main():
+    num_messages = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    print("{0} messages".format(num_messages))
+    print("{0:<10} {1:>14} {2:>16} {3:>14} {4:>14}".format(
+        "serializer", "out bytes/tup", "emit+ack enc/s", "in bytes/tup",
+        "tuple dec/s"))
+
+    for serializer in sorted(SERIALIZERS):
+        encode_time, out_bytes = bench_encode(serializer, num_messages)
+        decode_time, in_bytes = bench_decode(serializer, num_messages)
+        print("{0:<10} {1:>14.1f} {2:>16.0f} {3:>14.1f} {4:>14.0f}".format(
+            serializer,
+            float(out_bytes) / num_messages, num_messages / encode_time,
+            float(in_bytes) / num_messages, num_messages / decode_time))
+
+
+if __name__ == '__main__':
+    main()
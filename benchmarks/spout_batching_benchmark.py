@@ -0,0 +1,161 @@
+"""Benchmark spout throughput as a function of the number of tuples emitted for
+every next command, comparing fixed batch sizes with the adaptive BatchingSpout.
+
+The spout runs in a thread talking msgpack over a pair of pipes to a simulated
+Storm worker, which behaves like ShellSpout: it sends one command at a time and
+waits for the spout sync, stops sending next commands while
+MAX_SPOUT_PENDING tuples are pending, and acks every tuple ACK_DELAY_MS
+milliseconds after it was emitted.
+
+Usage: python benchmarks/spout_batching_benchmark.py
+       [DURATION_S] [MAX_SPOUT_PENDING] [ACK_DELAY_MS]
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+
+from collections import deque
+import io
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from pyleus.storm import BatchingSpout
+from pyleus.storm.serializers.msgpack_serializer import MsgpackSerializer
+
+
+class CounterSpout(BatchingSpout):
+
+    def initialize(self):
+        self.counter = 0
+
+    def next_tuple(self):
+        self.counter += 1
+        self.emit((self.counter,), tup_id=self.counter, need_task_ids=False)
+
+
+class SimulatedStorm(object):
+    """Storm side of the multilang protocol for a single spout."""
+
+    def __init__(self, serializer, max_spout_pending, ack_delay):
+        self._serializer = serializer
+        self._max_spout_pending = max_spout_pending
+        self._ack_delay = ack_delay
+        # (ack time, tup_id) of pending tuples, in emit order
+        self._pending = deque()
+        self.emitted = 0
+        self.round_trips = 0
+
+    def setup(self, pid_dir, conf):
+        self._serializer.send_msg(
+            {'pidDir': pid_dir, 'conf': conf, 'context': {}})
+        self._serializer.flush()
+        self._serializer.read_msg()
+
+    def _command(self, msg):
+        """Send a command and handle spout messages until it syncs."""
+        self.round_trips += 1
+        self._serializer.send_msg(msg)
+        self._serializer.flush()
+        while True:
+            msg = self._serializer.read_msg()
+            if msg['command'] == 'sync':
+                return
+            if msg['command'] == 'emit':
+                self.emitted += 1
+                self._pending.append(
+                    (time.time() + self._ack_delay, msg.get('id')))
+
+    def run(self, duration):
+        deadline = time.time() + duration
+        while True:
+            now = time.time()
+            if now >= deadline:
+                break
+            while self._pending and self._pending[0][0] <= now:
+                _, tup_id = self._pending.popleft()
+                self._command({'command': 'ack', 'id': tup_id})
+            if len(self._pending) < self._max_spout_pending:
+                self._command({'command': 'next'})
+            else:
+                time.sleep(max(0, self._pending[0][0] - now))
+
+
+def run(duration, max_spout_pending, ack_delay, min_batch, max_batch):
+    spout_in_r, spout_in_w = os.pipe()
+    spout_out_r, spout_out_w = os.pipe()
+    spout_in = io.open(spout_in_r, "rb", buffering=0)
+    spout_out = io.open(spout_out_w, "wb", buffering=0)
+    storm_in = io.open(spout_out_r, "rb", buffering=0)
+    storm_out = io.open(spout_in_w, "wb", buffering=0)
+
+    spout = CounterSpout(input_stream=spout_in, output_stream=spout_out)
+    spout.MIN_BATCH_SIZE = min_batch
+    spout.MAX_BATCH_SIZE = max_batch
+    spout.pyleus_config = {
+        'serializer': 'msgpack',
+        'output_buffering': True,
+    }
+    spout.initialize_serializer()
+    spout.initialize_output_buffering()
+    spout.initialize_task_ids()
+    spout.batch_size = min_batch
+
+    def spout_main():
+        spout.setup_component()
+        spout.run_component()
+
+    thread = threading.Thread(target=spout_main)
+    thread.start()
+
+    pid_dir = tempfile.mkdtemp()
+    storm = SimulatedStorm(
+        MsgpackSerializer(storm_in, storm_out),
+        max_spout_pending, ack_delay)
+    try:
+        storm.setup(pid_dir, {
+            'topology.max.spout.pending': max_spout_pending,
+        })
+        start = time.time()
+        storm.run(duration)
+        elapsed = time.time() - start
+    finally:
+        # The spout exits on EOF
+        storm_out.close()
+        thread.join()
+        for stream in (spout_in, spout_out, storm_in):
+            stream.close()
+        shutil.rmtree(pid_dir)
+
+    return storm.emitted, storm.round_trips, elapsed, spout.batch_size
+
+
+def main():
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+    max_spout_pending = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    ack_delay_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 10.0
+
+    # The spout logs a warning every time the simulated Storm goes away
+    logging.disable(logging.WARNING)
+
+    print("{0}s per run, max spout pending {1}, ack delay {2}ms".format(
+        duration, max_spout_pending, ack_delay_ms))
+    print("{0:<14} {1:>12} {2:>16} {3:>10}".format(
+        "K", "tuples/s", "tuples/next+ack", "final K"))
+
+    runs = [(str(k), k, k) for k in (1, 2, 5, 10, 20, 50, 100)]
+    runs.append(("adaptive", 1, 100))
+    for name, min_batch, max_batch in runs:
+        emitted, round_trips, elapsed, final_batch_size = run(
+            duration, max_spout_pending, ack_delay_ms / 1000.0,
+            min_batch, max_batch)
+        print("{0:<14} {1:>12.0f} {2:>16.2f} {3:>10}".format(
+            name, emitted / elapsed, float(emitted) / round_trips,
+            final_batch_size))
+
+
+if __name__ == '__main__':
+    main()
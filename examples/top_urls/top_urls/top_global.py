@@ -1,36 +1,26 @@
 from __future__ import absolute_import
 
 import logging
-from operator import itemgetter
 
-from pyleus.storm import SimpleBolt
+from pyleus.storm import TopNMergeBolt
 
 log = logging.getLogger('top_global_bolt')
 
 
-class TopGlobalBolt(SimpleBolt):
+class TopGlobalBolt(TopNMergeBolt):
 
     OPTIONS = ["N"]
     OUTPUT_FIELDS = ["top_N"]
 
-    def initialize(self):
-        self.top_N = []
-        self.N = self.options["N"]
-
-    def process_tick(self):
-        log.debug("-------------")
-        log.debug(self.top_N)
-        self.emit((self.top_N,))
-        self.top_N = []
-
     def process_tuple(self, tup):
         task_ranking, = tup.values
         log.debug("Task {0}: {1}".format(tup.task, task_ranking))
+        super(TopGlobalBolt, self).process_tuple(tup)
 
-        # Update top N
-        self.top_N.extend(task_ranking)
-        self.top_N.sort(key=itemgetter(1), reverse=True)
-        self.top_N = self.top_N[:self.N]
+    def process_top(self, top_N):
+        log.debug("-------------")
+        log.debug(top_N)
+        self.emit((top_N,))
 
 
 if __name__ == '__main__':
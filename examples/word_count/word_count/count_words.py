@@ -1,4 +1,3 @@
-from collections import defaultdict
 from collections import namedtuple
 import logging
 
@@ -13,14 +12,13 @@ class CountWordsBolt(SimpleBolt):
 
     OUTPUT_FIELDS = Counter
 
-    def initialize(self):
-        self.words = defaultdict(int)
-
     def process_tuple(self, tup):
         word, = tup.values
-        self.words[word] += 1
-        log.debug("{0} {1}".format(word, self.words[word]))
-        self.emit((word, self.words[word]), anchors=[tup])
+        # Counts survive restarts, as the state is checkpointed on ticks
+        count = self.state.get(word, 0) + 1
+        self.state[word] = count
+        log.debug("{0} {1}".format(word, count))
+        self.emit((word, count), anchors=[tup])
 
 
 if __name__ == '__main__':
@@ -1,7 +1,7 @@
 import logging
 import random
 
-from pyleus.storm import Spout
+from pyleus.storm import PrefetchingSpout
 
 log = logging.getLogger('counter')
 
@@ -41,12 +41,15 @@ quis iaculis ante pharetra id. In
 """.strip().split('\n')
 
 
-class LineSpout(Spout):
+class LineSpout(PrefetchingSpout):
 
     OUTPUT_FIELDS = ["line"]
 
-    def next_tuple(self):
-        line = random.choice(LINES)
+    def generate_items(self):
+        while True:
+            yield random.choice(LINES)
+
+    def process_item(self, line):
         log.debug(line)
         self.emit((line,), tup_id=random.randrange(999999999))
 
@@ -0,0 +1,80 @@
+"""This module is used only by pyleus.cli build and emulate commands to
+describe all the components of a topology within a single interpreter, instead
+of paying an interpreter start and the import of pyleus and of the topology
+dependencies for every component module run with --describe.
+
+Usage: python -m pyleus._describe MODULE [MODULE ...]
+
+It prints a JSON object mapping every module to its description, or to null if
+the module could not be described this way, e.g. because it failed to import.
+
+The modules of the topology imported while describing a component are removed
+from sys.modules afterwards, so that every component imports them afresh, as
+it would on its own, and never sees changes made at import time by the
+components described before it.
+"""
+from __future__ import absolute_import
+
+import json
+import os
+import runpy
+import sys
+
+from pyleus.compat import StringIO
+from pyleus.storm.component import DESCRIBE_OPT
+
+
+def _installation_prefixes():
+    """Return the directories the standard library and the installed
+    packages, e.g. of the virtualenv, live in.
+    """
+    prefixes = set()
+    for attr in ("prefix", "exec_prefix", "base_prefix", "base_exec_prefix",
+                 "real_prefix"):
+        prefix = getattr(sys, attr, None)
+        if prefix:
+            prefixes.add(os.path.join(os.path.realpath(prefix), ""))
+    return tuple(prefixes)
+
+
+def _is_topology_module(name, module, prefixes):
+    """Tell whether the module was loaded from outside pyleus, the standard
+    library and the installed packages.
+    """
+    if name == "pyleus" or name.startswith("pyleus."):
+        return False
+    paths = list(getattr(module, "__path__", None) or [])
+    if getattr(module, "__file__", None):
+        paths.append(module.__file__)
+    # Built-in modules have no path
+    return any(not os.path.realpath(path).startswith(prefixes)
+               for path in paths)
+
+
+def describe(module):
+    """Run module as ``python -m MODULE --describe`` would do and return its
+    parsed description, or ``None`` on failure.
+    """
+    argv, stdout = sys.argv, sys.stdout
+    imported = set(sys.modules)
+    sys.argv = [module, DESCRIBE_OPT]
+    sys.stdout = out = StringIO()
+    try:
+        runpy.run_module(module, run_name="__main__", alter_sys=True)
+        return json.loads(out.getvalue())
+    except (Exception, SystemExit):
+        return None
+    finally:
+        sys.argv, sys.stdout = argv, stdout
+        prefixes = _installation_prefixes()
+        for name in set(sys.modules) - imported:
+            if _is_topology_module(name, sys.modules[name], prefixes):
+                del sys.modules[name]
+
+
+def main(modules):
+    print(json.dumps(dict((module, describe(module)) for module in modules)))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
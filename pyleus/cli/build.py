@@ -5,28 +5,39 @@ object. The caller function should handle PyleusError exceptions.
 """
 from __future__ import absolute_import
 
+from contextlib import closing
+import copy
 import glob
+import json
 import logging
 import os
 import re
 import shutil
+import struct
 import tempfile
 import yaml
 import zipfile
+import zlib
 
 from pyleus import __version__
+from pyleus.cli.static_describe import describe_module
 from pyleus.cli.topology_spec import TopologySpec
+from pyleus.cli.venv_cache import venv_cache_key
+from pyleus.cli.venv_cache import VirtualenvCache
 from pyleus.cli.virtualenv_proxy import VirtualenvProxy
 from pyleus.compat import StringIO
 from pyleus.storm.component import DESCRIBE_OPT
+from pyleus.exception import ConfigurationError
 from pyleus.exception import InvalidTopologyError
 from pyleus.exception import JarError
+from pyleus.exception import VirtualenvError
 from pyleus.utils import expand_path
 
 RESOURCES_PATH = "resources"
 YAML_FILENAME = "pyleus_topology.yaml"
 DEFAULT_REQUIREMENTS_FILENAME = "requirements.txt"
 VIRTUALENV_NAME = "pyleus_venv"
+BUILD_INFO_PATH = "META-INF/pyleus_build.json"
 
 log = logging.getLogger(__name__)
 
@@ -69,6 +80,128 @@ def _pack_jar(tmp_dir, output_jar):
         zf.close()
 
 
+def _crc32(path):
+    """Return the CRC-32 of a file, as stored in zip entries."""
+    crc = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b""):
+            crc = zlib.crc32(chunk, crc)
+    return crc & 0xffffffff
+
+
+def _copy_zip_entry(src, info, dst):
+    """Copy the entry info of the src zip file to the dst one raw, without
+    decompressing and compressing it again.
+    """
+    # Data starts after the local header, whose file name and extra field
+    # may differ from the ones of the central directory
+    src.fp.seek(info.header_offset)
+    header = src.fp.read(zipfile.sizeFileHeader)
+    if len(header) != zipfile.sizeFileHeader or \
+            header[:4] != zipfile.stringFileHeader:
+        raise zipfile.BadZipfile(
+            "Bad local header: {0}".format(info.filename))
+    name_len, extra_len = struct.unpack("<HH", header[-4:])
+    src.fp.seek(name_len + extra_len, os.SEEK_CUR)
+
+    new_info = zipfile.ZipInfo(info.filename, info.date_time)
+    new_info.compress_type = info.compress_type
+    new_info.external_attr = info.external_attr
+    new_info.create_system = info.create_system
+    new_info.CRC = info.CRC
+    new_info.compress_size = info.compress_size
+    new_info.file_size = info.file_size
+    # Sizes are known, so they go in the local header instead of a data
+    # descriptor after the data
+    new_info.flag_bits = info.flag_bits & ~0x08
+    new_info.header_offset = dst.fp.tell()
+    dst.fp.write(new_info.FileHeader())
+
+    remaining = info.compress_size
+    while remaining:
+        chunk = src.fp.read(min(remaining, 64 * 1024))
+        if not chunk:
+            raise zipfile.BadZipfile(
+                "Truncated entry: {0}".format(info.filename))
+        dst.fp.write(chunk)
+        remaining -= len(chunk)
+
+    dst.filelist.append(new_info)
+    dst.NameToInfo[new_info.filename] = new_info
+    # Where the central directory is written on close
+    dst.start_dir = dst.fp.tell()
+    dst._didModify = True
+
+
+def _repack_jar(tmp_dir, previous_jar, output_jar):
+    """Build a jar from the temporary directory, holding the topology
+    resources without the virtualenv, and from the previous jar of the
+    topology.
+
+    Entries of the previous jar are copied raw, but for the resources
+    that changed or no longer exist, and new or changed files are added.
+    """
+    resources_prefix = RESOURCES_PATH + "/"
+    venv_prefix = resources_prefix + VIRTUALENV_NAME + "/"
+
+    files = {}
+    for root, dirs, filenames in os.walk(tmp_dir):
+        for filename in filenames:
+            path = os.path.join(root, filename)
+            arcname = os.path.relpath(path, tmp_dir).replace(os.sep, "/")
+            files[arcname] = path
+
+    fd, tmp_jar = tempfile.mkstemp(dir=os.path.dirname(output_jar))
+    os.close(fd)
+    try:
+        with closing(zipfile.ZipFile(previous_jar, "r")) as src:
+            with closing(zipfile.ZipFile(tmp_jar, "w")) as dst:
+                for info in src.infolist():
+                    path = files.get(info.filename)
+                    if path is not None:
+                        if (os.path.getsize(path) != info.file_size or
+                                _crc32(path) != info.CRC):
+                            continue
+                        del files[info.filename]
+                    elif (info.filename.startswith(resources_prefix) and
+                            not info.filename.startswith(venv_prefix)):
+                        # Removed from the topology
+                        continue
+                    _copy_zip_entry(src, info, dst)
+
+                for arcname, path in sorted(files.items()):
+                    log.debug("Adding to jar: {0}".format(arcname))
+                    dst.write(path, arcname, zipfile.ZIP_DEFLATED)
+        shutil.copymode(previous_jar, tmp_jar)
+        os.rename(tmp_jar, output_jar)
+    except:
+        os.remove(tmp_jar)
+        raise
+
+
+def _build_info(base_jar, venv_key):
+    """Return what the content of the jar built for a topology depends on,
+    but for the topology directory.
+    """
+    stat = os.stat(base_jar)
+    return {
+        "pyleus": __version__,
+        "base_jar": [base_jar, stat.st_size, int(stat.st_mtime)],
+        "virtualenv": venv_key,
+    }
+
+
+def _read_build_info(jar):
+    """Return the build info stored in jar, or None if missing."""
+    if not os.path.isfile(jar) or not zipfile.is_zipfile(jar):
+        return None
+    try:
+        with closing(zipfile.ZipFile(jar, "r")) as zf:
+            return json.loads(zf.read(BUILD_INFO_PATH).decode("utf-8"))
+    except (KeyError, ValueError, zipfile.BadZipfile):
+        return None
+
+
 def _validate_venv(topology_dir, venv):
     """Ensure that VIRTUALENV does not exist inside the directory"""
     if os.path.exists(venv):
@@ -103,15 +236,35 @@ def _remove_pyleus_base_jar(venv):
 
 def _set_up_virtualenv(venv_name, tmp_dir, req,
                        include_packages, system_site_packages,
-                       pypi_index_url, python_interpreter, verbose):
-    """Create a virtualenv with the specified options and the default packages
-    specified in configuration. Then run `pip install -r [requirements file]`.
+                       pypi_index_url, python_interpreter, verbose,
+                       venv_cache=None, wheelhouse=None, offline=False):
+    """Create a virtualenv with the specified options, then install pyleus,
+    the default packages specified in configuration and the requirements file
+    with a single `pip install`.
+
+    If wheelhouse is not None, wheels are built into it and installed from
+    it, without accessing any package index if offline is True.
+
+    If venv_cache is not None, the virtualenv is copied from the cache if it
+    has already been built with the same options, or added to it otherwise.
     """
+    venv_path = os.path.join(tmp_dir, venv_name)
+
+    cache_key = None
+    if venv_cache is not None:
+        cache_key = venv_cache_key(
+            req, include_packages, python_interpreter, system_site_packages,
+            pypi_index_url)
+        if venv_cache.fetch(cache_key, venv_path):
+            return VirtualenvProxy(venv_path, verbose=verbose, create=False)
+
     venv = VirtualenvProxy(
-        os.path.join(tmp_dir, venv_name),
+        venv_path,
         system_site_packages=system_site_packages,
         pypi_index_url=pypi_index_url,
         python_interpreter=python_interpreter,
+        wheelhouse=wheelhouse,
+        offline=offline,
         verbose=verbose
     )
 
@@ -119,29 +272,66 @@ def _set_up_virtualenv(venv_name, tmp_dir, req,
     if include_packages is not None:
         packages += include_packages
 
-    for package in packages:
-        venv.install_package(package)
-
-    if req is not None:
-        venv.install_from_requirements(req)
+    venv.install(packages, req)
 
     _remove_pyleus_base_jar(venv)
 
+    if venv_cache is not None:
+        venv_cache.store(cache_key, venv_path)
+
     return venv
 
 
-def _assemble_full_topology_yaml(spec, venv, resources_dir):
-    """Assemble a full version of the topology yaml file given by the user
-    adding to it the information coming from the python source files.
+def _describe_modules(modules, get_venv, resources_dir):
+    """Return a dict mapping each module to the description of its component.
+
+    Modules are described statically from their source when possible, the
+    others by a single pyleus._describe process. Modules it could not
+    describe, or all of them if pyleus in the virtualenv does not provide it,
+    are run with --describe on their own, reporting their errors.
+
+    get_venv returns the virtualenv, only set up if some modules cannot be
+    described statically.
     """
-    for component in spec.topology:
-        if component.type == "python":
-            log.debug('Assemble component module: {0}'.format(component.module))
-            description = venv.execute_module(module=component.module,
+    descriptions = {}
+    for module in modules:
+        description = describe_module(module, resources_dir)
+        if description is not None:
+            descriptions[module] = description
+
+    remaining = [module for module in modules if module not in descriptions]
+    if not remaining:
+        return descriptions
+
+    venv = get_venv()
+    try:
+        descriptions.update(json.loads(venv.execute_module(
+            module="pyleus._describe", args=remaining, cwd=resources_dir)))
+    except (VirtualenvError, ValueError):
+        log.debug("Unable to describe all modules at once")
+
+    for module in remaining:
+        if descriptions.get(module) is None:
+            log.debug("Describe component module: {0}".format(module))
+            description = venv.execute_module(module=module,
                                               args=[DESCRIBE_OPT],
                                               cwd=resources_dir)
-            module_spec = yaml.load(description)
-            component.update_from_module(module_spec)
+            descriptions[module] = yaml.safe_load(description)
+    return descriptions
+
+
+def _assemble_full_topology_yaml(spec, get_venv, resources_dir):
+    """Assemble a full version of the topology yaml file given by the user
+    adding to it the information coming from the python source files.
+    """
+    python_components = [component for component in spec.topology
+                         if component.type == "python"]
+    modules = sorted(set(component.module for component in python_components))
+    descriptions = _describe_modules(modules, get_venv, resources_dir)
+    for component in python_components:
+        # Copied, as shared objects would be dumped as yaml aliases
+        component.update_from_module(
+            copy.deepcopy(descriptions[component.module]))
 
     spec.verify_groupings()
 
@@ -179,7 +369,8 @@ def _copy_dir_content(src, dst, exclude):
 
 def _create_pyleus_jar(original_topology_spec, topology_dir, base_jar,
                        output_jar, zip_file, tmp_dir, include_packages,
-                       system_site_packages, pypi_index_url, verbose):
+                       system_site_packages, pypi_index_url, verbose,
+                       venv_cache=None, wheelhouse=None, offline=False):
     """Coordinate the creation of the the topology JAR:
 
         - Validate the topology
@@ -187,6 +378,12 @@ def _create_pyleus_jar(original_topology_spec, topology_dir, base_jar,
         - Copy all source files into the directory
         - If using virtualenv, create it and install dependencies
         - Re-pack the temporary directory into the final JAR
+
+    If the output jar was previously built with the same base jar and
+    dependencies, and venv_cache is not None, only the topology sources and
+    yaml are copied to the temporary directory, and the jar is rebuilt from
+    them and from the entries of the previous jar. The virtualenv is then only
+    set up if needed to describe the components.
     """
     requirements_filename = original_topology_spec.requirements_filename
     if not requirements_filename:
@@ -201,11 +398,24 @@ def _create_pyleus_jar(original_topology_spec, topology_dir, base_jar,
 
     _validate_venv(topology_dir, venv)
 
-    # Extract pyleus base jar content in a tmp dir
-    zip_file.extractall(tmp_dir)
+    build_info = _build_info(base_jar, venv_cache_key(
+        req, include_packages, python_interpreter, system_site_packages,
+        pypi_index_url))
+    incremental = (venv_cache is not None and
+                   _read_build_info(output_jar) == build_info)
+
+    if incremental:
+        log.debug("Rebuilding {0} incrementally".format(output_jar))
+        # The virtualenv, if needed, is set up out of the jar directory
+        jar_dir = os.path.join(tmp_dir, "jar")
+        os.mkdir(jar_dir)
+    else:
+        jar_dir = tmp_dir
+        # Extract pyleus base jar content in a tmp dir
+        zip_file.extractall(jar_dir)
 
     # Create resources directory
-    resources_dir = os.path.join(tmp_dir, RESOURCES_PATH)
+    resources_dir = os.path.join(jar_dir, RESOURCES_PATH)
     os.mkdir(resources_dir)
 
     # Add the topology directory skipping yaml and requirements
@@ -215,21 +425,32 @@ def _create_pyleus_jar(original_topology_spec, topology_dir, base_jar,
         exclude=[venv, req, output_jar],
     )
 
-    venv = _set_up_virtualenv(
-        venv_name=VIRTUALENV_NAME,
-        tmp_dir=resources_dir,
-        req=req,
-        include_packages=include_packages,
-        system_site_packages=system_site_packages,
-        pypi_index_url=pypi_index_url,
-        python_interpreter=python_interpreter,
-        verbose=verbose)
+    venvs = []
+
+    def get_venv():
+        if not venvs:
+            venvs.append(_set_up_virtualenv(
+                venv_name=VIRTUALENV_NAME,
+                tmp_dir=tmp_dir if incremental else resources_dir,
+                req=req,
+                include_packages=include_packages,
+                system_site_packages=system_site_packages,
+                pypi_index_url=pypi_index_url,
+                python_interpreter=python_interpreter,
+                verbose=verbose,
+                venv_cache=venv_cache,
+                wheelhouse=wheelhouse,
+                offline=offline))
+        return venvs[0]
+
+    if not incremental:
+        get_venv()
 
     # Assemble the full version of the topolgy yaml file from the user yaml and
     # the python code
     new_yaml = _assemble_full_topology_yaml(
         spec=original_topology_spec,
-        venv=venv,
+        get_venv=get_venv,
         resources_dir=resources_dir)
 
     # Copy the new yaml file into its directory, overwriting the old one
@@ -237,8 +458,18 @@ def _create_pyleus_jar(original_topology_spec, topology_dir, base_jar,
     with open(jar_yaml, 'w') as f:
         f.write(new_yaml)
 
+    # Record what the jar was built from, for later incremental builds
+    build_info_path = os.path.join(jar_dir, BUILD_INFO_PATH)
+    if not os.path.isdir(os.path.dirname(build_info_path)):
+        os.makedirs(os.path.dirname(build_info_path))
+    with open(build_info_path, 'w') as f:
+        json.dump(build_info, f, sort_keys=True)
+
     # Pack the tmp directory into a jar
-    _pack_jar(tmp_dir, output_jar)
+    if incremental:
+        _repack_jar(jar_dir, output_jar, output_jar)
+    else:
+        _pack_jar(jar_dir, output_jar)
 
 
 def _build_output_path(output_arg, topology_name):
@@ -255,7 +486,7 @@ def _build_output_path(output_arg, topology_name):
 
 def parse_original_topology(topology_path):
     with open(topology_path) as f:
-        yaml_spec = yaml.load(f)
+        yaml_spec = yaml.safe_load(f)
 
     return TopologySpec(yaml_spec)
 
@@ -278,6 +509,21 @@ def build_topology_jar(configs):
     if configs.include_packages is not None:
         include_packages = configs.include_packages.split(" ")
 
+    venv_cache = None
+    if not configs.no_cache:
+        venv_cache = VirtualenvCache(
+            expand_path(configs.venv_cache_dir),
+            int(configs.venv_cache_size_mb) * 1024 ** 2)
+
+    wheelhouse = None
+    if configs.wheelhouse is not None:
+        wheelhouse = expand_path(configs.wheelhouse)
+
+    offline = str(configs.offline).lower() in ("1", "yes", "true", "on")
+    if offline and wheelhouse is None:
+        raise ConfigurationError(
+            "Offline builds need a wheelhouse to install packages from")
+
     # Open the base jar as a zip
     zip_file = _open_jar(base_jar)
 
@@ -296,6 +542,9 @@ def build_topology_jar(configs):
                 system_site_packages=configs.system_site_packages,
                 pypi_index_url=configs.pypi_index_url,
                 verbose=configs.verbose,
+                venv_cache=venv_cache,
+                wheelhouse=wheelhouse,
+                offline=offline,
             )
         finally:
             shutil.rmtree(tmp_dir)
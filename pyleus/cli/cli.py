@@ -8,6 +8,7 @@ import logging
 
 from pyleus import __version__
 from pyleus.cli.commands.build_subcommand import BuildSubCommand
+from pyleus.cli.commands.emulate_subcommand import EmulateSubCommand
 from pyleus.cli.commands.list_subcommand import ListSubCommand
 from pyleus.cli.commands.local_subcommand import LocalSubCommand
 from pyleus.cli.commands.submit_subcommand import SubmitSubCommand
@@ -17,6 +18,7 @@ SUB_COMMAND_CLASSES = [
     BuildSubCommand,
     ListSubCommand,
     LocalSubCommand,
+    EmulateSubCommand,
     SubmitSubCommand,
     KillSubCommand,
 ]
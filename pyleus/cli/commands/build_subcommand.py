@@ -35,6 +35,10 @@ class BuildSubCommand(SubCommand):
             "-s", "--system-site-packages", dest="system_site_packages",
             action="store_true",
             help="Do not install packages already present on your system.")
+        parser.add_argument(
+            "--no-cache", dest="no_cache", action="store_true",
+            help="Build the virtualenv from scratch, without using nor"
+            " updating the virtualenv cache.")
 
     def run(self, configs):
         build_topology_jar(configs)
@@ -0,0 +1,39 @@
+"""Sub-command for running a Pyleus topology on the local machine without
+Storm nor a JVM, straight from its source directory. Tuples are routed and
+acked by a Python emulation of Storm, and the stats of the run are printed
+at the end.
+
+Args:
+    TOPOLOGY_PATH - the path to a topology YAML file, defaulting to
+        'pyleus_topology.yaml' in the current directory.
+
+Components run with the current Python interpreter, so their requirements
+must be installed in the current environment.
+"""
+from __future__ import absolute_import
+
+from pyleus.cli.commands.subcommand import SubCommand
+from pyleus.cli.topologies import emulate_topology
+from pyleus.configuration import DEFAULTS
+
+
+class EmulateSubCommand(SubCommand):
+    """Emulate subcommand class."""
+
+    NAME = "emulate"
+    DESCRIPTION = "Run a Pyleus topology locally in a Python emulation of Storm"
+
+    STORM_REQUIRED = False
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "topology_path", metavar="TOPOLOGY_PATH", nargs="?",
+            default=DEFAULTS.topology_path,
+            help="Path to Pyleus topology file. Default: %(default)s")
+        parser.add_argument(
+            "-t", "--time", dest="run_time", metavar="SECONDS",
+            help="Stop the topology after SECONDS. Default: run until"
+            " interrupted")
+
+    def run(self, configs):
+        emulate_topology(configs)
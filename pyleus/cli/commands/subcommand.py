@@ -41,6 +41,9 @@ class SubCommand(object):
     NAME = None
     DESCRIPTION = None
 
+    # Whether the sub-command needs the Storm executable
+    STORM_REQUIRED = True
+
     def add_arguments(self, parser):
         """Define arguments and options of the sub-command
         in an argparse-fashion way.
@@ -96,7 +99,8 @@ class SubCommand(object):
         except PyleusError as e:
             self.error(e)
 
-        configs = _ensure_storm_path_in_configs(configs)
+        if self.STORM_REQUIRED:
+            configs = _ensure_storm_path_in_configs(configs)
 
         # Update configuration with command line values
         configs = update_configuration(configs, vars(arguments))
@@ -0,0 +1,808 @@
+"""Pure Python emulation of a Storm cluster, running a pyleus topology
+straight from its YAML definition, without a JVM nor a jar.
+
+Every task is a subprocess speaking the multilang protocol, exactly as under
+Storm, while a single thread plays Storm's part: it routes tuples according
+to the groupings, tracks tuple trees to ack or fail spout tuples, sends tick
+tuples and paces spouts. Routing is deterministic, so that runs of the same
+topology are comparable, which makes it suitable for throughput benchmarks of
+the Python code of a topology on a laptop or in CI.
+
+Components must be importable from the topology directory with the current
+Python interpreter. Kafka spouts are not supported.
+"""
+from __future__ import absolute_import
+
+from collections import defaultdict
+from collections import deque
+from collections import OrderedDict
+import itertools
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+
+import msgpack
+import six
+from six.moves import queue
+
+from pyleus.cli.static_describe import describe_module
+from pyleus.cli.topology_spec import SpoutSpec
+from pyleus.exception import InvalidTopologyError
+from pyleus.exception import StormError
+from pyleus.storm import DEFAULT_STREAM
+from pyleus.storm import LOG_TRACE
+from pyleus.storm import LOG_DEBUG
+from pyleus.storm import LOG_INFO
+from pyleus.storm import LOG_WARN
+from pyleus.storm import LOG_ERROR
+from pyleus.storm import StormWentAwayError
+from pyleus.storm.component import BINARY_SERIALIZER
+from pyleus.storm.component import COMPONENT_OPTIONS_OPT
+from pyleus.storm.component import DESCRIBE_OPT
+from pyleus.storm.component import JSON_SERIALIZER
+from pyleus.storm.component import MSGPACK_SERIALIZER
+from pyleus.storm.component import PYLEUS_CONFIG_OPT
+from pyleus.storm.component import SERIALIZERS
+from pyleus.storm.serializers import binary_serializer
+from pyleus.storm.serializers.serializer import Serializer
+
+log = logging.getLogger(__name__)
+
+# Defaults of the Storm configuration
+DEFAULT_MESSAGE_TIMEOUT_SECS = 30
+DEFAULT_SLEEP_SPOUT_WAIT_STRATEGY_TIME_MS = 1
+
+# Maximum number of messages handled between two flushes of the output
+MAX_MESSAGES_PER_FLUSH = 1000
+
+# Seconds given to tasks to start
+STARTUP_TIMEOUT_SECS = 60
+
+# Seconds given to tasks to exit once their input is closed
+STOP_TIMEOUT_SECS = 5
+
+LOG_LEVELS = {
+    LOG_TRACE: logging.DEBUG,
+    LOG_DEBUG: logging.DEBUG,
+    LOG_INFO: logging.INFO,
+    LOG_WARN: logging.WARNING,
+    LOG_ERROR: logging.ERROR,
+}
+
+
+class _DictChannel(object):
+    """Storm side of the multilang protocol for the JSON and msgpack
+    serializers, which encode the same message dictionaries both ways.
+    """
+
+    def __init__(self, serializer):
+        self._serializer = serializer
+        self._serializer.enable_output_buffering(64 * 1024)
+
+    def read_msg(self):
+        return self._serializer.read_msg()
+
+    def send_setup(self, setup_info):
+        self._serializer.send_msg(setup_info)
+
+    def send_tuple(self, tup_id, comp, stream, task, values):
+        self._serializer.send_msg({
+            'id': tup_id,
+            'comp': comp,
+            'stream': stream,
+            'task': task,
+            'tuple': values,
+        })
+
+    def send_spout_command(self, command, tup_id=None):
+        msg = {'command': command}
+        if tup_id is not None:
+            msg['id'] = tup_id
+        self._serializer.send_msg(msg)
+
+    def send_task_ids(self, task_ids):
+        self._serializer.send_msg(task_ids)
+
+    def decode_values(self, values):
+        return values
+
+    def flush(self):
+        self._serializer.flush()
+
+
+class _BinaryChannel(Serializer):
+    """Storm side of the multilang protocol for the binary serializer.
+
+    Tuple values are kept msgpack encoded and forwarded as they are, and only
+    decoded by fields groupings.
+
+    .. seealso:: :mod:`pyleus.storm.serializers.binary_serializer`
+    """
+
+    def __init__(self, input_stream, output_stream, output_fields=None,
+                 **kwargs):
+        super(_BinaryChannel, self).__init__(
+            input_stream, output_stream, **kwargs)
+        self.enable_output_buffering(64 * 1024)
+
+        self._streams = binary_serializer._declared_streams(output_fields)
+        self._frames = binary_serializer._frames_generator(
+            self._input_stream, self._read_buffer_size)
+        self._packer = msgpack.Packer()
+
+    def _decode_frame(self, header, values):
+        header = msgpack.unpackb(header)
+        code = header[0]
+
+        if code == binary_serializer.EMIT:
+            _, stream, tup_id, anchors, task, need_task_ids = header
+            if isinstance(stream, int):
+                stream = self._streams[stream]
+            return {
+                'command': 'emit',
+                'stream': stream,
+                'id': tup_id,
+                'anchors': anchors,
+                'task': task,
+                'need_task_ids': need_task_ids,
+                'tuple': bytes(values),
+            }
+        elif code in (binary_serializer.ACK, binary_serializer.FAIL):
+            return {
+                'command': binary_serializer.COMMAND_NAMES[code],
+                'id': header[1],
+            }
+        elif code == binary_serializer.SYNC:
+            return {'command': 'sync'}
+        elif code == binary_serializer.LOG:
+            return {'command': 'log', 'msg': header[1], 'level': header[2]}
+        elif code == binary_serializer.ERROR:
+            return {'command': 'error', 'msg': header[1]}
+        elif code == binary_serializer.PID:
+            return {'pid': header[1]}
+
+        raise ValueError("Unknown message code: {0}".format(code))
+
+    def _read_msgs(self):
+        return [self._decode_frame(header, values)
+                for header, values in next(self._frames)]
+
+    def _send_frame(self, header, values=b""):
+        header = self._packer.pack(header)
+        self._write(b"".join((
+            binary_serializer.FRAME_HEADER.pack(
+                len(header) + len(values), len(header)),
+            header,
+            values)))
+
+    def send_setup(self, setup_info):
+        self._send_frame([binary_serializer.SETUP, setup_info])
+
+    def send_tuple(self, tup_id, comp, stream, task, values):
+        if not isinstance(values, bytes):
+            values = self._packer.pack(values)
+        self._send_frame(
+            [binary_serializer.BOLT_TUPLE, tup_id, comp, stream, task],
+            values)
+
+    def send_spout_command(self, command, tup_id=None):
+        self._send_frame([
+            binary_serializer.SPOUT_COMMAND,
+            binary_serializer.COMMAND_CODES[command],
+            tup_id])
+
+    def send_task_ids(self, task_ids):
+        self._send_frame([binary_serializer.TASK_IDS, task_ids])
+
+    def decode_values(self, values):
+        return msgpack.unpackb(values)
+
+
+class Grouping(object):
+    """Choice of the tasks of a bolt receiving the tuples of a stream it
+    subscribed to.
+
+    Shuffle, local or shuffle and none groupings send tuples to the tasks in
+    turn, and fields groupings to the task selected by a CRC32 of the
+    grouping fields, so that routing does not depend on Python hash
+    randomization.
+
+    :param grouping_type: grouping name, as in the topology definition
+    :type grouping_type: ``str``
+    :param tasks: receiving tasks
+    :type tasks: ``list``
+    :param field_indexes:
+     indexes of the grouping fields in the tuple values, for fields groupings
+    :type field_indexes: ``list`` of ``int``
+    """
+
+    def __init__(self, grouping_type, tasks, field_indexes=None):
+        self.grouping_type = grouping_type
+        self.tasks = tasks
+        self.field_indexes = field_indexes
+        self._next_tasks = itertools.cycle(tasks)
+
+    def select(self, values):
+        """Return the list of the tasks receiving a tuple. ``values`` are only
+        needed, decoded, by fields groupings.
+        """
+        if self.grouping_type == "all_grouping":
+            return self.tasks
+        elif self.grouping_type == "global_grouping":
+            return self.tasks[:1]
+        elif self.grouping_type == "fields_grouping":
+            key = msgpack.packb([values[i] for i in self.field_indexes])
+            return [self.tasks[zlib.crc32(key) % len(self.tasks)]]
+        return [next(self._next_tasks)]
+
+
+class _Task(object):
+    """A running task and the bookkeeping about it."""
+
+    def __init__(self, task_id, component, proc, channel):
+        self.task_id = task_id
+        self.component = component
+        self.proc = proc
+        self.channel = channel
+        # Set once the task is set up
+        self.pid = None
+        self.is_spout = isinstance(component, SpoutSpec)
+        # Whether there is something to flush on the channel
+        self.dirty = False
+
+        # Spouts only: the last command sent, until the spout syncs
+        self.command = None
+        self.emitted = False
+        self.sleep_until = 0
+        # Ack and fail commands to be sent
+        self.commands = deque()
+        # Spout tuples not acked nor failed yet
+        self.pending = 0
+
+
+class _Root(object):
+    """A spout tuple and the number of tuples of its tree not acked yet."""
+
+    __slots__ = ('task', 'msg_id', 'pending', 'start')
+
+    def __init__(self, task, msg_id, start):
+        self.task = task
+        self.msg_id = msg_id
+        self.pending = 0
+        self.start = start
+
+
+def _num_tasks(component):
+    return (getattr(component, "tasks", None) or
+            getattr(component, "parallelism_hint", None) or 1)
+
+
+class LocalRunner(object):
+    """Run a pyleus topology in local subprocesses, routing tuples and
+    tracking their acks in Python.
+
+    :param spec: topology specification
+    :type spec: :class:`~pyleus.cli.topology_spec.TopologySpec`
+    :param topology_dir: directory containing the topology code
+    :type topology_dir: ``str``
+    :param python: Python interpreter running the components, default the
+     current one
+    :type python: ``str``
+    """
+
+    def __init__(self, spec, topology_dir, python=None):
+        self._spec = spec
+        self._topology_dir = topology_dir
+        self._python = python or sys.executable
+
+        self._serializer = getattr(spec, "serializer", MSGPACK_SERIALIZER)
+        self._max_spout_pending = getattr(spec, "max_spout_pending", None)
+        self._message_timeout = getattr(
+            spec, "message_timeout_secs", DEFAULT_MESSAGE_TIMEOUT_SECS)
+        self._spout_sleep = getattr(
+            spec, "sleep_spout_wait_strategy_time_ms",
+            DEFAULT_SLEEP_SPOUT_WAIT_STRATEGY_TIME_MS) / 1000.0
+
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(
+            p for p in (topology_dir, env.get("PYTHONPATH")) if p)
+        self._env = env
+
+        self._tasks = {}
+        self._events = queue.Queue()
+        # (component, stream) -> list of Grouping
+        self._subscribers = defaultdict(list)
+        self._tuple_ids = itertools.count(1)
+        # Root ids of the tracked tuples sent to bolts, by tuple id
+        self._tuples = {}
+        # Spout tuples being processed, oldest first
+        self._roots = OrderedDict()
+        self._pid_dir = None
+
+        self._spout_tasks = []
+        # [tick frequency, next tick time, tasks] by ticked component
+        self._ticks = []
+
+        #: ``dict`` of the numbers of ``emitted``, ``transferred``,
+        #: ``executed``, ``acked`` and ``failed`` tuples and of the total
+        #: ``complete_latency_ms``, by component name.
+        self.stats = defaultdict(lambda: defaultdict(int))
+
+    def _describe(self):
+        """Read output fields and options from the component modules,
+        described statically when possible, then by a single pyleus._describe
+        process but for the ones it failed to describe.
+        """
+        for component in self._spec.topology:
+            if component.type != "python":
+                raise InvalidTopologyError(
+                    "[{0}] Only Python components can run locally without"
+                    " Storm".format(component.name))
+
+        descriptions = {}
+        for component in self._spec.topology:
+            description = describe_module(component.module,
+                                          self._topology_dir)
+            if description is not None:
+                descriptions[component.module] = description
+
+        remaining = sorted(set(
+            component.module for component in self._spec.topology
+            if component.module not in descriptions))
+        if remaining:
+            descriptions.update(json.loads(subprocess.check_output(
+                [self._python, "-m", "pyleus._describe"] + remaining,
+                cwd=self._topology_dir, env=self._env).decode()))
+
+        for component in self._spec.topology:
+            description = descriptions[component.module]
+            if description is None:
+                try:
+                    description = json.loads(subprocess.check_output(
+                        [self._python, "-m", component.module, DESCRIBE_OPT],
+                        cwd=self._topology_dir, env=self._env).decode())
+                except subprocess.CalledProcessError:
+                    raise InvalidTopologyError(
+                        "[{0}] Unable to describe module {1}".format(
+                            component.name, component.module))
+            component.update_from_module(description)
+
+        self._spec.verify_groupings()
+
+    def _pyleus_config(self):
+        """Mirror PythonComponentsFactory.buildPyleusConfig."""
+        spec = self._spec
+        pyleus_config = {
+            "logging_config_path": getattr(spec, "logging_config", None),
+            "serializer": self._serializer,
+            "output_buffering": getattr(spec, "output_buffering", False),
+            "need_task_ids": getattr(spec, "need_task_ids", True),
+            "lazy_task_ids": getattr(spec, "lazy_task_ids", False),
+        }
+        for key in ("json_backend", "read_buffer_size", "output_buffer_size",
+                    "output_buffer_max_messages", "state_dir",
+                    "state_backend"):
+            if getattr(spec, key, None) is not None:
+                pyleus_config[key] = getattr(spec, key)
+        return pyleus_config
+
+    def _conf(self, component):
+        conf = {
+            "topology.name": self._spec.name,
+            "topology.message.timeout.secs": self._message_timeout,
+            "topology.max.spout.pending": self._max_spout_pending,
+            "topology.sleep.spout.wait.strategy.time.ms":
+                self._spout_sleep * 1000,
+        }
+        if getattr(component, "tick_freq_secs", None) is not None:
+            conf["topology.tick.tuple.freq.secs"] = component.tick_freq_secs
+        return conf
+
+    def _create_channel(self, proc, component):
+        kwargs = {}
+        if getattr(self._spec, "read_buffer_size", None):
+            kwargs["read_buffer_size"] = self._spec.read_buffer_size
+
+        if self._serializer == BINARY_SERIALIZER:
+            return _BinaryChannel(
+                proc.stdout, proc.stdin,
+                output_fields=component.output_fields, **kwargs)
+        elif self._serializer == JSON_SERIALIZER:
+            kwargs["json_backend"] = getattr(self._spec, "json_backend", None)
+        return _DictChannel(
+            SERIALIZERS[self._serializer](proc.stdout, proc.stdin, **kwargs))
+
+    def _read_messages(self, task):
+        """Reader thread of a task, passing its messages to the main loop."""
+        try:
+            while True:
+                self._events.put((task, task.channel.read_msg()))
+        except StormWentAwayError:
+            self._events.put((task, None))
+
+    def _start_tasks(self):
+        pyleus_config = json.dumps(self._pyleus_config())
+        task_ids = itertools.count(1)
+        task_to_component = {}
+        components_tasks = []
+        for component in self._spec.topology:
+            ids = [next(task_ids) for _ in range(_num_tasks(component))]
+            components_tasks.append((component, ids))
+            for task_id in ids:
+                task_to_component[str(task_id)] = component.name
+
+        for component, ids in components_tasks:
+            cmd = [self._python, "-m", component.module]
+            if component.options:
+                cmd += [COMPONENT_OPTIONS_OPT, json.dumps(component.options)]
+            cmd += [PYLEUS_CONFIG_OPT, pyleus_config]
+
+            for task_id in ids:
+                proc = subprocess.Popen(
+                    cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                    cwd=self._topology_dir, env=self._env)
+                task = _Task(task_id, component, proc,
+                             self._create_channel(proc, component))
+                self._tasks[task_id] = task
+
+                task.channel.send_setup({
+                    "pidDir": self._pid_dir,
+                    "conf": self._conf(component),
+                    "context": {
+                        "task->component": task_to_component,
+                        "taskid": task_id,
+                    },
+                })
+                task.channel.flush()
+
+                thread = threading.Thread(
+                    target=self._read_messages, args=(task,))
+                thread.daemon = True
+                thread.start()
+
+    def _component_tasks(self, name):
+        return sorted(
+            (task for task in self._tasks.values()
+             if task.component.name == name),
+            key=lambda task: task.task_id)
+
+    def _build_groupings(self):
+        output_fields = dict(
+            (component.name, component.output_fields)
+            for component in self._spec.topology)
+
+        for component in self._spec.topology:
+            for grouping in getattr(component, "groupings", None) or []:
+                grouping_type, = grouping.keys()
+                grouping_spec = grouping[grouping_type]
+                source = grouping_spec["component"]
+                stream = grouping_spec["stream"]
+
+                field_indexes = None
+                if grouping_type == "fields_grouping":
+                    fields = output_fields[source][stream]
+                    field_indexes = [
+                        fields.index(field)
+                        for field in grouping_spec["fields"]]
+
+                self._subscribers[(source, stream)].append(Grouping(
+                    grouping_type, self._component_tasks(component.name),
+                    field_indexes))
+
+    def _send_tuple(self, target, tup_id, comp, stream, task_id, values):
+        target.channel.send_tuple(tup_id, comp, stream, task_id, values)
+        target.dirty = True
+
+    def _complete(self, root_id, now):
+        root = self._roots.pop(root_id)
+        root.task.pending -= 1
+        root.task.commands.append(("ack", root.msg_id))
+        stats = self.stats[root.task.component.name]
+        stats["acked"] += 1
+        stats["complete_latency_ms"] += (now - root.start) * 1000
+
+    def _fail_root(self, root_id):
+        root = self._roots.pop(root_id)
+        root.task.pending -= 1
+        root.task.commands.append(("fail", root.msg_id))
+        self.stats[root.task.component.name]["failed"] += 1
+
+    def _spout_msg_id(self, msg_id):
+        """Return the id Storm sends back to a spout acking or failing a
+        tuple it emitted with msg_id: the msgpack and binary serializers of
+        the Java side turn integer ids into strings, the JSON one does not.
+        """
+        if (self._serializer != JSON_SERIALIZER and
+                isinstance(msg_id, six.integer_types) and
+                not isinstance(msg_id, bool)):
+            return str(msg_id)
+        return msg_id
+
+    def _emit(self, task, msg):
+        name = task.component.name
+        stream = msg.get('stream') or DEFAULT_STREAM
+        values = msg['tuple']
+
+        direct_task = msg.get('task')
+        if direct_task is not None:
+            targets = [self._tasks[direct_task]]
+        else:
+            targets = []
+            decoded = None
+            for grouping in self._subscribers.get((name, stream), ()):
+                if grouping.field_indexes is not None and decoded is None:
+                    decoded = task.channel.decode_values(values)
+                targets.extend(grouping.select(decoded))
+
+        if msg.get('need_task_ids', True):
+            task.channel.send_task_ids([target.task_id for target in targets])
+            task.dirty = True
+
+        now = time.time()
+        root_ids = ()
+        if task.is_spout:
+            if msg.get('id') is not None:
+                root_id = next(self._tuple_ids)
+                self._roots[root_id] = _Root(
+                    task, self._spout_msg_id(msg['id']), now)
+                task.pending += 1
+                root_ids = (root_id,)
+            task.emitted = True
+        else:
+            root_ids = set()
+            for anchor in msg.get('anchors') or ():
+                root_ids.update(self._tuples.get(anchor, ()))
+            # Trees already failed are not tracked anymore
+            root_ids.intersection_update(self._roots)
+
+        for target in targets:
+            tup_id = next(self._tuple_ids)
+            if root_ids:
+                self._tuples[tup_id] = root_ids
+                for root_id in root_ids:
+                    self._roots[root_id].pending += 1
+            self._send_tuple(target, tup_id, name, stream, task.task_id,
+                             values)
+
+        # Spout tuples going nowhere are complete right away
+        if task.is_spout and root_ids and not targets:
+            self._complete(root_ids[0], now)
+
+        stats = self.stats[name]
+        stats["emitted"] += 1
+        stats["transferred"] += len(targets)
+
+    def _ack(self, task, tup_id):
+        self.stats[task.component.name]["executed"] += 1
+        now = None
+        for root_id in self._tuples.pop(tup_id, ()):
+            root = self._roots.get(root_id)
+            if root is None:
+                continue
+            root.pending -= 1
+            if root.pending == 0:
+                now = now or time.time()
+                self._complete(root_id, now)
+
+    def _fail(self, task, tup_id):
+        self.stats[task.component.name]["executed"] += 1
+        for root_id in self._tuples.pop(tup_id, ()):
+            if root_id in self._roots:
+                self._fail_root(root_id)
+
+    def _handle_msg(self, task, msg):
+        if msg is None:
+            raise StormError(
+                "Task {0} of component {1} exited".format(
+                    task.task_id, task.component.name))
+        if isinstance(msg, list):
+            return
+
+        command = msg.get('command')
+        if command == 'emit':
+            self._emit(task, msg)
+        elif command == 'ack':
+            self._ack(task, msg['id'])
+        elif command == 'fail':
+            self._fail(task, msg['id'])
+        elif command == 'sync':
+            if task.command == 'next' and not task.emitted:
+                task.sleep_until = time.time() + self._spout_sleep
+            task.command = None
+        elif command == 'log':
+            log.log(LOG_LEVELS.get(msg.get('level'), logging.INFO),
+                    "[{0}:{1}] {2}".format(
+                        task.component.name, task.task_id, msg['msg']))
+        elif command == 'error':
+            log.error("[{0}:{1}] {2}".format(
+                task.component.name, task.task_id, msg['msg']))
+        elif 'pid' in msg:
+            task.pid = msg['pid']
+
+    def _drive_spouts(self, now):
+        """Send the next command to every spout waiting for one."""
+        for task in self._spout_tasks:
+            if task.command is not None:
+                continue
+            if task.commands:
+                task.command, msg_id = task.commands.popleft()
+                task.channel.send_spout_command(task.command, msg_id)
+            elif (now >= task.sleep_until and
+                    (not self._max_spout_pending or
+                     task.pending < self._max_spout_pending)):
+                task.command = 'next'
+                task.emitted = False
+                task.channel.send_spout_command('next')
+            else:
+                continue
+            task.dirty = True
+
+    def _send_ticks(self, now):
+        for ticks in self._ticks:
+            freq, next_tick, tasks = ticks
+            if now < next_tick:
+                continue
+            for task in tasks:
+                self._send_tuple(task, next(self._tuple_ids), "__system",
+                                 "__tick", -1, [freq])
+            ticks[1] = max(next_tick + freq, now)
+
+    def _expire_roots(self, now):
+        """Fail the spout tuples whose tree is not complete in time."""
+        deadline = now - self._message_timeout
+        while self._roots:
+            root_id, root = next(iter(self._roots.items()))
+            if root.start > deadline:
+                break
+            self._fail_root(root_id)
+
+    def _flush(self):
+        for task in self._tasks.values():
+            if task.dirty:
+                task.dirty = False
+                try:
+                    task.channel.flush()
+                except (IOError, OSError):
+                    raise StormError(
+                        "Task {0} of component {1} went away".format(
+                            task.task_id, task.component.name))
+
+    def _wait_timeout(self, now, deadline):
+        """Return how long to wait for messages before the next scheduled
+        action.
+        """
+        wake = [now + 1]
+        if deadline is not None:
+            wake.append(deadline)
+        wake.extend(next_tick for _, next_tick, _ in self._ticks)
+        # Spouts held back by max spout pending wait for acks instead
+        wake.extend(
+            task.sleep_until for task in self._spout_tasks
+            if task.command is None and task.sleep_until > now)
+        return max(0, min(wake) - now)
+
+    def _wait_ready(self):
+        """Wait for every task to be set up, so that start up time is not
+        counted in the run.
+        """
+        deadline = time.time() + STARTUP_TIMEOUT_SECS
+        while any(task.pid is None for task in self._tasks.values()):
+            try:
+                task, msg = self._events.get(
+                    timeout=max(0, deadline - time.time()))
+            except queue.Empty:
+                raise StormError("Tasks did not start in time")
+            self._handle_msg(task, msg)
+
+    def _loop(self, deadline):
+        while True:
+            now = time.time()
+            if deadline is not None and now >= deadline:
+                return
+            self._send_ticks(now)
+            self._expire_roots(now)
+            self._drive_spouts(now)
+            self._flush()
+
+            try:
+                task, msg = self._events.get(
+                    timeout=self._wait_timeout(now, deadline))
+            except queue.Empty:
+                continue
+            self._handle_msg(task, msg)
+
+            for _ in range(MAX_MESSAGES_PER_FLUSH):
+                try:
+                    task, msg = self._events.get_nowait()
+                except queue.Empty:
+                    break
+                self._handle_msg(task, msg)
+
+    def _stop(self):
+        """Close the input of every task, letting it exit, or kill it."""
+        for task in self._tasks.values():
+            try:
+                task.proc.stdin.close()
+            except (IOError, OSError):
+                pass
+
+        stop_deadline = time.time() + STOP_TIMEOUT_SECS
+        for task in self._tasks.values():
+            while task.proc.poll() is None and time.time() < stop_deadline:
+                time.sleep(0.01)
+            if task.proc.poll() is None:
+                task.proc.kill()
+                task.proc.wait()
+
+    def run(self, duration=None):
+        """Run the topology for duration seconds, or until interrupted with
+        Ctrl-C if ``None``.
+
+        :return: seconds elapsed since the topology started running
+        :rtype: ``float``
+
+        :raise: StormError if a task exits before the end of the run
+        """
+        self._describe()
+
+        self._pid_dir = tempfile.mkdtemp()
+        try:
+            self._start_tasks()
+            self._build_groupings()
+            self._spout_tasks = [
+                task for task in self._tasks.values() if task.is_spout]
+            self._wait_ready()
+
+            start = time.time()
+            self._ticks = [
+                [component.tick_freq_secs, start + component.tick_freq_secs,
+                 self._component_tasks(component.name)]
+                for component in self._spec.topology
+                if getattr(component, "tick_freq_secs", None)]
+
+            deadline = None if duration is None else start + duration
+            try:
+                self._loop(deadline)
+            except KeyboardInterrupt:
+                log.info("Interrupted, stopping the topology")
+            return time.time() - start
+        finally:
+            self._stop()
+            shutil.rmtree(self._pid_dir, ignore_errors=True)
+
+
+def format_stats(stats, elapsed):
+    """Return a table of the stats of a run, one component per line.
+
+    :param stats: :attr:`~.LocalRunner.stats` of the run
+    :type stats: ``dict``
+    :param elapsed: duration of the run in seconds
+    :type elapsed: ``float``
+    """
+    line = "{0:<24} {1:>12} {2:>12} {3:>12} {4:>12} {5:>10} {6:>12}"
+    lines = [line.format(
+        "component", "emitted", "emitted/s", "executed", "acked", "failed",
+        "latency_ms")]
+    for name in sorted(stats):
+        component_stats = stats[name]
+        acked = component_stats["acked"]
+        latency = ""
+        if acked:
+            latency = "{0:.2f}".format(
+                component_stats["complete_latency_ms"] / acked)
+        lines.append(line.format(
+            name,
+            component_stats["emitted"],
+            int(component_stats["emitted"] / elapsed) if elapsed else "",
+            component_stats["executed"],
+            acked,
+            component_stats["failed"],
+            latency))
+    return "\n".join(lines)
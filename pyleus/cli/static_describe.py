@@ -0,0 +1,525 @@
+"""Static description of Python components, reading COMPONENT_TYPE,
+OUTPUT_FIELDS and OPTIONS from the source of their modules instead of running
+them with --describe, which imports the modules and all their dependencies.
+
+A module can be described statically when it runs its component with
+``MyComponent().run()`` under ``if __name__ == '__main__':`` and the attributes
+are bound, along the class hierarchy, to literals, namedtuple definitions or
+names bound to them. Base classes are either pyleus classes, whose actual
+attributes are used, or classes defined in modules of the topology, parsed the
+same way.
+
+Anything else, e.g. attributes computed at import time, bound conditionally,
+mutated by storing an attribute or item or calling a method, or inherited from
+third-party classes, makes describe_module return None, so that the module is
+run with --describe instead.
+"""
+from __future__ import absolute_import
+
+import ast
+import collections
+import importlib
+import json
+import logging
+import os
+
+import six
+from six.moves import builtins
+
+from pyleus.storm.component import _expand_output_fields
+from pyleus.storm.component import _serialize
+
+try:
+    from typing import NamedTuple
+except ImportError:
+    NamedTuple = None
+
+log = logging.getLogger(__name__)
+
+# Modules whose attributes are resolved by actually importing them
+IMPORTABLE_MODULES = ("pyleus", "collections", "typing")
+
+DEFINITIONS = tuple(getattr(ast, name) for name in
+                    ("FunctionDef", "AsyncFunctionDef", "ClassDef")
+                    if hasattr(ast, name))
+
+# Methods whose override could change the output of --describe. The component
+# instance is created, running __new__ and __init__, before describe() reads
+# its attributes, which __init_subclass__ of a base class may set as well
+DESCRIBE_METHODS = ("describe", "run", "__new__", "__init__",
+                    "__init_subclass__", "__getattribute__")
+
+
+class _Unresolvable(Exception):
+    """Raised when a module cannot be described statically."""
+
+
+def _is_importable(module):
+    return any(module == name or module.startswith(name + ".")
+               for name in IMPORTABLE_MODULES)
+
+
+def _source_path(path, module, main=False):
+    """Return the source file of module in path, or None if not found.
+
+    If main is True, return the file executed by ``python -m module``.
+    """
+    base = os.path.join(path, *module.split("."))
+    if os.path.isfile(os.path.join(base, "__init__.py")):
+        source_path = os.path.join(base, "__main__.py" if main else
+                                   "__init__.py")
+    else:
+        source_path = base + ".py"
+    return source_path if os.path.isfile(source_path) else None
+
+
+def _bound_names(stmt):
+    """Return the names bound by stmt in the scope it belongs to."""
+    names = set()
+    nodes = [stmt]
+    while nodes:
+        node = nodes.pop()
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+            names.add(node.id)
+        elif isinstance(node, DEFINITIONS):
+            # Names bound in the body belong to another scope
+            names.add(node.name)
+            continue
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                names.add((alias.asname or alias.name).split(".")[0])
+        nodes.extend(ast.iter_child_nodes(node))
+    return names
+
+
+def _mutated_root(node):
+    """Return the name at the root of the attribute or subscript node, and the
+    attribute of it the node goes through, if any.
+    """
+    attrs = []
+    while isinstance(node, (ast.Attribute, ast.Subscript)):
+        attrs.append(getattr(node, "attr", None))
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None, None, 0
+    return node.id, attrs[-1] if attrs else None, len(attrs)
+
+
+def _c3_merge(sequences):
+    """Merge the linearizations of the bases of a class, as Python does to
+    compute its method resolution order.
+    """
+    result = []
+    sequences = [list(seq) for seq in sequences if seq]
+    while sequences:
+        for seq in sequences:
+            head = seq[0]
+            if not any(head in other[1:] for other in sequences):
+                break
+        else:
+            raise _Unresolvable("Inconsistent class hierarchy")
+        result.append(head)
+        sequences = [seq[1:] if seq[0] is head else seq for seq in sequences]
+        sequences = [seq for seq in sequences if seq]
+    return result
+
+
+_Binding = collections.namedtuple("_Binding", "kind node module scopes")
+"""Statement binding a name: kind is one of "value", "class", "module" or
+"import", scopes are the ones to evaluate node in.
+"""
+
+
+class _Scope(object):
+    """Names bound by the top-level statements of a module or class body.
+
+    Names bound more than once, or within compound statements such as if or
+    try, are ambiguous and cannot be resolved. So are the names whose value
+    may be mutated anywhere in the body, even in functions.
+    """
+
+    def __init__(self, body, module, parent=None):
+        self.module = module
+        self.bindings = {}
+        self.ambiguous = set()
+        # (module, name) of the objects of other modules which may be mutated
+        self.foreign_mutations = set()
+        self.scopes = [self] if parent is None else [self, parent]
+        for stmt in body:
+            self._bind_stmt(stmt)
+        for stmt in body:
+            self._find_mutations(stmt)
+
+    def _bind(self, name, kind, node):
+        if name in self.bindings:
+            self.ambiguous.add(name)
+        self.bindings[name] = _Binding(kind, node, self.module, self.scopes)
+
+    def _bind_stmt(self, stmt):
+        if isinstance(stmt, ast.Assign):
+            for target in stmt.targets:
+                if isinstance(target, ast.Name):
+                    self._bind(target.id, "value", stmt.value)
+                else:
+                    # Attribute and item stores are found by _find_mutations
+                    self.ambiguous.update(_bound_names(stmt))
+        elif getattr(ast, "AnnAssign", None) and \
+                isinstance(stmt, ast.AnnAssign):
+            if stmt.value is not None and isinstance(stmt.target, ast.Name):
+                self._bind(stmt.target.id, "value", stmt.value)
+        elif isinstance(stmt, ast.ClassDef):
+            self._bind(stmt.name, "class", stmt)
+        elif isinstance(stmt, ast.Import):
+            for alias in stmt.names:
+                if alias.asname is not None:
+                    self._bind(alias.asname, "module", alias.name)
+                else:
+                    name = alias.name.split(".")[0]
+                    self._bind(name, "module", name)
+        elif isinstance(stmt, ast.ImportFrom):
+            module = self._absolute_module(stmt)
+            for alias in stmt.names:
+                if alias.name == "*":
+                    raise _Unresolvable("Star import")
+                self._bind(alias.asname or alias.name, "import",
+                           (module, alias.name))
+        else:
+            for name in _bound_names(stmt):
+                self._bind(name, "other", None)
+
+    def _find_mutations(self, stmt):
+        """Find the names whose value stmt may mutate, e.g. with
+        ``MyBolt.OPTIONS = [...]``, ``FIELDS[0] = "a"``, ``FIELDS.append("b")``
+        or ``global FIELDS`` in a function.
+        """
+        for node in ast.walk(stmt):
+            if isinstance(node, ast.Global):
+                self.ambiguous.update(
+                    name for name in node.names if name in self.bindings)
+            elif (isinstance(node, (ast.Attribute, ast.Subscript)) and
+                    isinstance(node.ctx, (ast.Store, ast.Del))):
+                self._mutated(*_mutated_root(node))
+            elif (isinstance(node, ast.Call) and
+                    isinstance(node.func, ast.Attribute)):
+                name, attr, depth = _mutated_root(node.func)
+                binding = self.bindings.get(name)
+                # Calling a function of a module does not count, unlike
+                # calling a method of an object it holds
+                if binding is None or binding.kind != "module" or depth > 1:
+                    self._mutated(name, attr, depth)
+
+    def _mutated(self, name, attr, depth):
+        binding = self.bindings.get(name)
+        if binding is None:
+            return
+        self.ambiguous.add(name)
+        if binding.kind == "module":
+            self.foreign_mutations.add((binding.node, attr))
+        elif binding.kind == "import":
+            self.foreign_mutations.add(binding.node)
+
+    def _absolute_module(self, stmt):
+        if not stmt.level:
+            return stmt.module
+        package = self.module.package.split(".") \
+            if self.module.package else []
+        if stmt.level > 1:
+            package = package[:-(stmt.level - 1)]
+        return ".".join(package + ([stmt.module] if stmt.module else []))
+
+    def lookup(self, name):
+        """Return the binding of name, or None if it is not bound."""
+        if name in self.ambiguous:
+            raise _Unresolvable("Ambiguous name: {0}".format(name))
+        return self.bindings.get(name)
+
+
+class _Module(object):
+    """Parsed source of a module of the topology."""
+
+    def __init__(self, name, source_path):
+        self.name = name
+        self.package = name
+        if os.path.basename(source_path) not in ("__init__.py",
+                                                 "__main__.py"):
+            self.package = name.rpartition(".")[0]
+        with open(source_path, "rb") as f:
+            self.tree = ast.parse(f.read(), source_path)
+        self.scope = _Scope(self.tree.body, self)
+
+
+class _StaticClass(object):
+    """Class defined in a module of the topology."""
+
+    def __init__(self, node, module):
+        if node.decorator_list or getattr(node, "keywords", None):
+            raise _Unresolvable("Decorated class or metaclass")
+        self.node = node
+        self.scope = _Scope(node.body, module, parent=module.scope)
+
+
+class _StaticDescriber(object):
+    """Describe the components of modules found in path."""
+
+    def __init__(self, path):
+        self.path = path
+        self._modules = {}
+        self._classes = {}
+
+    def _load(self, name, main=False):
+        """Return the parsed module name, or None if it is not a module of
+        the topology.
+        """
+        if (name, main) not in self._modules:
+            source_path = _source_path(self.path, name, main=main)
+            module = None
+            if source_path is not None:
+                module = _Module(name, source_path)
+            self._modules[name, main] = module
+        return self._modules[name, main]
+
+    def _class(self, node, module):
+        if id(node) not in self._classes:
+            self._classes[id(node)] = _StaticClass(node, module)
+        return self._classes[id(node)]
+
+    def _import(self, module, attrs):
+        """Return what the attributes attrs of module refer to, either a
+        binding or an actual object.
+        """
+        if _is_importable(module):
+            try:
+                obj = importlib.import_module(module)
+                for i, attr in enumerate(attrs):
+                    if not hasattr(obj, attr):
+                        importlib.import_module(
+                            ".".join([module] + attrs[:i + 1]))
+                    obj = getattr(obj, attr)
+            except (ImportError, AttributeError):
+                raise _Unresolvable("Unknown name in module: {0}".format(
+                    module))
+            return obj
+
+        if not attrs:
+            return _Binding("module", module, None, None)
+
+        parsed = self._load(module)
+        binding = None
+        if parsed is not None:
+            binding = parsed.scope.lookup(attrs[0])
+        if binding is None:
+            # Submodule of a package
+            if self._load(module + "." + attrs[0]) is None:
+                raise _Unresolvable("Unknown module: {0}".format(module))
+            return self._import(module + "." + attrs[0], attrs[1:])
+        return self._follow(binding, attrs[1:])
+
+    def _follow(self, binding, attrs):
+        """Follow imports and attributes from binding."""
+        if binding.kind == "module":
+            return self._import(binding.node, attrs)
+        if binding.kind == "import":
+            module, name = binding.node
+            return self._import(module, [name] + attrs)
+        if attrs or binding.kind == "other":
+            raise _Unresolvable("Unsupported reference")
+        return binding
+
+    def _resolve(self, node, scopes):
+        """Return what the name or attribute node refers to."""
+        attrs = []
+        while isinstance(node, ast.Attribute):
+            attrs.insert(0, node.attr)
+            node = node.value
+        if not isinstance(node, ast.Name):
+            raise _Unresolvable("Unsupported expression")
+
+        for scope in scopes:
+            binding = scope.lookup(node.id)
+            if binding is not None:
+                return self._follow(binding, attrs)
+        if hasattr(builtins, node.id) and not attrs:
+            return getattr(builtins, node.id)
+        raise _Unresolvable("Unknown name: {0}".format(node.id))
+
+    def _evaluate(self, node, scopes):
+        """Return the value of the expression node, namedtuple classes being
+        replaced by the list of their fields.
+        """
+        try:
+            return ast.literal_eval(node)
+        except (ValueError, TypeError, SyntaxError):
+            pass
+
+        if isinstance(node, (ast.List, ast.Tuple)):
+            return [self._evaluate(elt, scopes) for elt in node.elts]
+        if isinstance(node, ast.Dict):
+            return dict((self._evaluate(key, scopes),
+                         self._evaluate(value, scopes))
+                        for key, value in zip(node.keys, node.values))
+        if isinstance(node, ast.Call):
+            return self._namedtuple_fields(node, scopes)
+        return self._value(self._resolve(node, scopes))
+
+    def _value(self, target):
+        """Return the value of what a name refers to."""
+        if not isinstance(target, _Binding):
+            return target
+        if target.kind == "value":
+            return self._evaluate(target.node, target.scopes)
+        if target.kind == "class":
+            return self._namedtuple_class_fields(target.node, target.module)
+        raise _Unresolvable("Unsupported value")
+
+    def _namedtuple_fields(self, call, scopes):
+        """Return the fields of the namedtuple created by call."""
+        if getattr(call, "starargs", None) or getattr(call, "kwargs", None):
+            raise _Unresolvable("Unsupported namedtuple call")
+        args = list(call.args)
+        for keyword in call.keywords:
+            if keyword.arg in ("typename", "field_names", "fields"):
+                args.append(keyword.value)
+            elif keyword.arg not in ("defaults", "module"):
+                raise _Unresolvable("Unsupported namedtuple argument")
+        if len(args) != 2:
+            raise _Unresolvable("Unsupported namedtuple call")
+
+        factory = self._resolve(call.func, scopes)
+        if factory is collections.namedtuple:
+            fields = self._evaluate(args[1], scopes)
+            if isinstance(fields, six.string_types):
+                fields = fields.replace(",", " ").split()
+            return list(fields)
+        if factory is NamedTuple and isinstance(args[1],
+                                                (ast.List, ast.Tuple)):
+            # Only names are evaluated, not types
+            return [self._evaluate(field.elts[0], scopes)
+                    for field in args[1].elts]
+        raise _Unresolvable("Unsupported call")
+
+    def _namedtuple_class_fields(self, node, module):
+        """Return the fields of the namedtuple class defined by node."""
+        if len(node.bases) != 1:
+            raise _Unresolvable("Unsupported class")
+        base = node.bases[0]
+        if isinstance(base, ast.Call):
+            return self._namedtuple_fields(base, module.scope.scopes)
+        target = self._resolve(base, module.scope.scopes)
+        if target is NamedTuple:
+            return [stmt.target.id for stmt in node.body
+                    if isinstance(stmt, getattr(ast, "AnnAssign", ()))]
+        return self._value(target)
+
+    def _mro(self, cls):
+        """Return the method resolution order of cls, made of static classes
+        and actual ones.
+        """
+        if not isinstance(cls, _StaticClass):
+            return list(cls.__mro__)
+
+        bases = []
+        for base in cls.node.bases:
+            target = self._resolve(base, cls.scope.scopes[1:])
+            if isinstance(target, _Binding):
+                if target.kind != "class":
+                    raise _Unresolvable("Unsupported base class")
+                target = self._class(target.node, target.module)
+            elif not isinstance(target, type):
+                raise _Unresolvable("Unsupported base class")
+            bases.append(target)
+
+        return [cls] + _c3_merge([self._mro(base) for base in bases] +
+                                 [bases])
+
+    def _attribute(self, mro, name):
+        for cls in mro:
+            if isinstance(cls, _StaticClass):
+                binding = cls.scope.lookup(name)
+                if binding is not None:
+                    return self._value(self._follow(binding, []))
+            elif name in vars(cls):
+                return vars(cls)[name]
+        raise _Unresolvable("Missing attribute: {0}".format(name))
+
+    def _main_class(self, module):
+        """Return the class run under ``if __name__ == '__main__':``."""
+        classes = []
+        for stmt in module.tree.body:
+            if not (isinstance(stmt, ast.If) and
+                    isinstance(stmt.test, ast.Compare)):
+                continue
+            operands = [stmt.test.left] + stmt.test.comparators
+            names = [operand.id for operand in operands
+                     if isinstance(operand, ast.Name)]
+            if names != ["__name__"] or len(operands) != 2 or \
+                    not isinstance(stmt.test.ops[0], ast.Eq):
+                continue
+            for node in ast.walk(stmt):
+                if (isinstance(node, ast.Call) and
+                        isinstance(node.func, ast.Attribute) and
+                        node.func.attr == "run" and
+                        isinstance(node.func.value, ast.Call)):
+                    classes.append(node.func.value.func)
+
+        if len(classes) != 1:
+            raise _Unresolvable("Component class not found")
+        target = self._resolve(classes[0], module.scope.scopes)
+        if isinstance(target, _Binding):
+            if target.kind != "class":
+                raise _Unresolvable("Unsupported component class")
+            return self._class(target.node, target.module)
+        return target
+
+    def _check_foreign_mutations(self):
+        """Raise _Unresolvable if a module parsed so far may mutate an object
+        of pyleus or of another module of the topology.
+        """
+        for module in list(self._modules.values()):
+            if module is None:
+                continue
+            for target, attr in module.scope.foreign_mutations:
+                if (_is_importable(target) or
+                        self._load(target) is not None or
+                        (attr is not None and
+                         self._load(target + "." + attr) is not None)):
+                    raise _Unresolvable("Mutated name of {0}".format(target))
+
+    def describe(self, name):
+        """Return the description of the component run by the module name,
+        as printed by ``Component.describe``.
+        """
+        module = self._load(name, main=True)
+        if module is None:
+            raise _Unresolvable("Module not found: {0}".format(name))
+
+        mro = self._mro(self._main_class(module))
+        for cls in mro:
+            if isinstance(cls, _StaticClass):
+                for method in DESCRIBE_METHODS:
+                    if cls.scope.lookup(method) is not None:
+                        raise _Unresolvable("Overridden {0}".format(method))
+
+        output_fields = self._attribute(mro, "OUTPUT_FIELDS")
+        if isinstance(output_fields, dict):
+            output_fields = dict(output_fields)
+
+        description = {
+            "component_type": self._attribute(mro, "COMPONENT_TYPE"),
+            "output_fields": _expand_output_fields(output_fields),
+            "options": _serialize(self._attribute(mro, "OPTIONS")),
+        }
+        self._check_foreign_mutations()
+        # Same types as the JSON output of --describe
+        return json.loads(json.dumps(description))
+
+
+def describe_module(module, path):
+    """Return the description of the component run by module, whose source is
+    looked up in path, or None if it cannot be described statically.
+    """
+    try:
+        return _StaticDescriber(path).describe(module)
+    except Exception as e:
+        # Whatever the reason, the module is then run with --describe
+        log.debug("Unable to describe {0} statically: {1}".format(module, e))
+        return None
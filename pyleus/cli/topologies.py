@@ -2,10 +2,15 @@
 """
 from __future__ import absolute_import
 
+import os
 import zipfile
 
+from pyleus.cli.build import parse_original_topology
+from pyleus.cli.local_runner import format_stats
+from pyleus.cli.local_runner import LocalRunner
 from pyleus.cli.storm_cluster import LocalStormCluster
 from pyleus.cli.storm_cluster import StormCluster
+from pyleus.utils import expand_path
 
 
 def add_nimbus_arguments(parser):
@@ -27,6 +32,19 @@ def run_topology_locally(jar_path, configs):
         configs.jvm_opts)
 
 
+def emulate_topology(configs):
+    """Run the pyleus topology defined in configs.topology_path without
+    Storm, then print the stats of the run.
+    """
+    topology_path = expand_path(configs.topology_path)
+    runner = LocalRunner(
+        parse_original_topology(topology_path),
+        os.path.dirname(topology_path))
+    elapsed = runner.run(
+        float(configs.run_time) if configs.run_time is not None else None)
+    print(format_stats(runner.stats, elapsed))
+
+
 def submit_topology(jar_path, configs):
     """Submit the topology jar to the Storm cluster specified in configs."""
     StormCluster(
@@ -11,6 +11,8 @@ import copy
 from pyleus.exception import InvalidTopologyError
 from pyleus.storm import DEFAULT_STREAM
 from pyleus.storm.component import SERIALIZERS
+from pyleus.storm.serializers.json_serializer import JSON_BACKENDS
+from pyleus.storm.state import STATE_BACKENDS
 
 
 def _as_set(obj):
@@ -72,6 +74,43 @@ class TopologySpec(object):
                     "Unknown serializer. Allowed: {0}. Found: {1}"
                     .format(SERIALIZERS, specs["serializer"]))
 
+        if "read_buffer_size" in specs:
+            self.read_buffer_size = specs["read_buffer_size"]
+
+        if "output_buffering" in specs:
+            self.output_buffering = specs["output_buffering"]
+
+        if "output_buffer_size" in specs:
+            self.output_buffer_size = specs["output_buffer_size"]
+
+        if "output_buffer_max_messages" in specs:
+            self.output_buffer_max_messages = specs["output_buffer_max_messages"]
+
+        if "need_task_ids" in specs:
+            self.need_task_ids = specs["need_task_ids"]
+
+        if "lazy_task_ids" in specs:
+            self.lazy_task_ids = specs["lazy_task_ids"]
+
+        if "json_backend" in specs:
+            if specs["json_backend"] in JSON_BACKENDS:
+                self.json_backend = specs["json_backend"]
+            else:
+                raise InvalidTopologyError(
+                    "Unknown JSON backend. Allowed: {0}. Found: {1}"
+                    .format(sorted(JSON_BACKENDS), specs["json_backend"]))
+
+        if "state_dir" in specs:
+            self.state_dir = specs["state_dir"]
+
+        if "state_backend" in specs:
+            if specs["state_backend"] in STATE_BACKENDS:
+                self.state_backend = specs["state_backend"]
+            else:
+                raise InvalidTopologyError(
+                    "Unknown state backend. Allowed: {0}. Found: {1}"
+                    .format(sorted(STATE_BACKENDS), specs["state_backend"]))
+
         self.requirements_filename = specs.get("requirements_filename")
         self.python_interpreter = specs.get("python_interpreter")
 
@@ -0,0 +1,173 @@
+"""Local cache of the virtualenvs built for topologies.
+
+Entries are keyed by a hash of everything determining the content of the
+virtualenv: requirements file content, included packages, Python interpreter,
+system site packages flag, PyPI index and pyleus version. On a cache hit the
+cached virtualenv is copied into the jar staging directory, with hard links
+when possible, instead of being built again.
+
+The least recently used entries are evicted when the cache grows over its
+maximum size.
+
+.. note::
+   Entries do not expire when unpinned requirements get new releases: build
+   with ``--no-cache`` to pick them up.
+"""
+from __future__ import absolute_import
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+from pyleus import __version__
+
+log = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = "~/.cache/pyleus/virtualenvs"
+DEFAULT_CACHE_SIZE_MB = 2048
+
+VENV_DIRNAME = "venv"
+SIZE_FILENAME = "size"
+
+
+def _dir_size(path):
+    """Return the size in bytes of the files in path, not following
+    symlinks.
+    """
+    size = 0
+    for root, dirs, files in os.walk(path):
+        for name in dirs + files:
+            size += os.lstat(os.path.join(root, name)).st_size
+    return size
+
+
+def _link_or_copy(src, dst):
+    """Hard link src to dst, or copy it if linking is not possible."""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def _copy_tree(src, dst):
+    """Copy the src directory to dst, hard linking files when possible and
+    preserving symlinks, such as the interpreter of a virtualenv.
+    """
+    os.makedirs(dst)
+    for name in os.listdir(src):
+        src_path = os.path.join(src, name)
+        dst_path = os.path.join(dst, name)
+        if os.path.islink(src_path):
+            os.symlink(os.readlink(src_path), dst_path)
+        elif os.path.isdir(src_path):
+            _copy_tree(src_path, dst_path)
+        else:
+            _link_or_copy(src_path, dst_path)
+    shutil.copystat(src, dst)
+
+
+def venv_cache_key(req, include_packages, python_interpreter,
+                   system_site_packages, pypi_index_url):
+    """Return the cache key of a virtualenv built with these options.
+
+    :param req: path of the requirements file, or ``None``
+    :type req: ``str``
+    """
+    requirements = None
+    if req is not None:
+        with open(req, "rb") as f:
+            requirements = hashlib.sha256(f.read()).hexdigest()
+
+    return hashlib.sha256(json.dumps({
+        "requirements": requirements,
+        "include_packages": include_packages,
+        "python_interpreter": python_interpreter,
+        "system_site_packages": bool(system_site_packages),
+        "pypi_index_url": pypi_index_url,
+        "pyleus": __version__,
+    }, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class VirtualenvCache(object):
+    """Directory of cached virtualenvs, one subdirectory per key, whose
+    modification time records its last use.
+
+    :param path: cache directory, created if needed
+    :type path: ``str``
+    :param max_size: maximum size of the cache in bytes
+    :type max_size: ``int``
+    """
+
+    def __init__(self, path, max_size=DEFAULT_CACHE_SIZE_MB * 1024 ** 2):
+        self.path = path
+        self.max_size = max_size
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+    def _entry_path(self, key):
+        return os.path.join(self.path, key)
+
+    def fetch(self, key, venv_path):
+        """Copy the virtualenv cached for key to venv_path.
+
+        :return: ``True`` on a cache hit, ``False`` otherwise
+        :rtype: ``bool``
+        """
+        entry = self._entry_path(key)
+        if not os.path.isdir(entry):
+            return False
+
+        log.debug("Virtualenv cache hit: {0}".format(key))
+        _copy_tree(os.path.join(entry, VENV_DIRNAME), venv_path)
+        # Mark the entry as the most recently used one
+        os.utime(entry, None)
+        return True
+
+    def store(self, key, venv_path):
+        """Add a copy of the virtualenv at venv_path to the cache for key,
+        then evict the least recently used entries if the cache is full.
+        """
+        # Copied aside first, so that entries are never seen incomplete
+        tmp_entry = tempfile.mkdtemp(prefix=".tmp-", dir=self.path)
+        try:
+            _copy_tree(venv_path, os.path.join(tmp_entry, VENV_DIRNAME))
+            with open(os.path.join(tmp_entry, SIZE_FILENAME), "w") as f:
+                f.write(str(_dir_size(tmp_entry)))
+            os.rename(tmp_entry, self._entry_path(key))
+        except OSError:
+            # Most likely stored by a concurrent build meanwhile
+            log.debug("Unable to store virtualenv in cache: {0}".format(key))
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+
+        self.evict()
+
+    def _entries(self):
+        """Return the list of (last use, size, path) of the entries."""
+        entries = []
+        for name in os.listdir(self.path):
+            entry = os.path.join(self.path, name)
+            if name.startswith(".") or not os.path.isdir(entry):
+                continue
+            try:
+                with open(os.path.join(entry, SIZE_FILENAME)) as f:
+                    size = int(f.read())
+            except (IOError, ValueError):
+                size = _dir_size(entry)
+            entries.append((os.stat(entry).st_mtime, size, entry))
+        return entries
+
+    def evict(self):
+        """Remove the least recently used entries until the cache fits its
+        maximum size.
+        """
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if total <= self.max_size:
+                break
+            log.debug("Evicting virtualenv from cache: {0}".format(entry))
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
@@ -6,6 +6,10 @@ Options:
     dependencies already installed system-wide.
     index_url - allow to specify the URL of the Python Package Index.
     refer to the last pip install execution.
+    wheelhouse - directory of wheels shared across builds. Wheels of all the
+    dependencies are built or downloaded into it, then installed from it.
+    offline - if True, dependencies are installed from the wheelhouse only,
+    without accessing any package index.
     verbose - if True all command will write on stdout.
 """
 from __future__ import absolute_import
@@ -37,13 +41,20 @@ class VirtualenvProxy(object):
                  pypi_index_url=None,
                  use_wheel=True,
                  python_interpreter=None,
-                 verbose=False):
-        """Creates the virtualenv with the options specified"""
+                 wheelhouse=None,
+                 offline=False,
+                 verbose=False,
+                 create=True):
+        """Creates the virtualenv with the options specified, unless create
+        is False, meaning that it already exists at path.
+        """
         self.path = path
         self._system_site_packages = system_site_packages
         self._pypi_index_url = pypi_index_url
         self._use_wheel = use_wheel
         self._python_interpreter = python_interpreter
+        self._wheelhouse = wheelhouse
+        self._offline = offline
 
         self._verbose = verbose
         self._out_stream = None
@@ -51,7 +62,8 @@ class VirtualenvProxy(object):
             self._out_stream = open(os.devnull, "w")
         self._err_stream = subprocess.STDOUT
 
-        self._create_virtualenv()
+        if create:
+            self._create_virtualenv()
 
     def _create_virtualenv(self):
         """Creates the actual virtualenv"""
@@ -67,33 +79,65 @@ class VirtualenvProxy(object):
                         err_msg="Failed to create virtualenv: {0}".
                                 format(self.path))
 
-    def install_package(self, package):
-        """Interface to `pip install SINGLE_PACKAGE`"""
-        cmd = [os.path.join(self.path, "bin", "pip"), "install", package]
+    def _pip_cmd(self, pip_command, args, no_index=False):
+        """Build the command line of `pip PIP_COMMAND ARGS` with the index
+        and wheel options.
+        """
+        cmd = [os.path.join(self.path, "bin", "pip"), pip_command] + args
 
-        if self._pypi_index_url is not None:
+        if no_index:
+            cmd += ["--no-index"]
+        elif self._pypi_index_url is not None:
             cmd += ["-i", self._pypi_index_url]
 
+        if self._wheelhouse is not None:
+            cmd += ["--find-links", self._wheelhouse]
+
         if self._use_wheel:
             cmd += ['--use-wheel']
 
+        return cmd
+
+    def install(self, packages, req=None):
+        """Interface to `pip install PACKAGES -r REQUIREMENTS_FILE`, resolving
+        and installing all the dependencies in a single pip run.
+
+        With a wheelhouse, `pip wheel` first adds the missing wheels to it,
+        unless offline, then pip installs from the wheelhouse only.
+        """
+        args = list(packages)
+        if req is not None:
+            args += ["-r", req]
+
+        if self._wheelhouse is not None and not self._offline:
+            wheel_args = ["--wheel-dir", self._wheelhouse] + args
+            _exec_shell_cmd(
+                self._pip_cmd("wheel", wheel_args),
+                stdout=self._out_stream, stderr=self._err_stream,
+                err_msg="Failed to build wheels for this topology."
+                " Run with --verbose for detailed info.")
+
         _exec_shell_cmd(
-            cmd, stdout=self._out_stream, stderr=self._err_stream,
+            self._pip_cmd(
+                "install", args,
+                no_index=self._wheelhouse is not None or self._offline),
+            stdout=self._out_stream, stderr=self._err_stream,
+            err_msg="Failed to install dependencies for this topology."
+            " Run with --verbose for detailed info.")
+
+    def install_package(self, package):
+        """Interface to `pip install SINGLE_PACKAGE`"""
+        _exec_shell_cmd(
+            self._pip_cmd("install", [package]),
+            stdout=self._out_stream, stderr=self._err_stream,
             err_msg="Failed to install {0} package."
             " Run with --verbose for detailed info.".format(package))
 
     def install_from_requirements(self, req):
         """Interface to `pip install -r REQUIREMENTS_FILE`"""
-        cmd = [os.path.join(self.path, "bin", "pip"), "install", "-r", req]
-
-        if self._pypi_index_url is not None:
-            cmd += ["-i", self._pypi_index_url]
-
-        if self._use_wheel:
-            cmd += ['--use-wheel']
-
         _exec_shell_cmd(
-            cmd, stdout=self._out_stream, stderr=self._err_stream,
+            self._pip_cmd("install", ["-r", req]),
+            stdout=self._out_stream, stderr=self._err_stream,
             err_msg="Failed to install dependencies for this topology."
             " Run with --verbose for detailed info.")
 
@@ -43,6 +43,20 @@ invocations.
 
    # list of packages to always include in your topologies
    include_packages: foo bar<4.0 baz==0.1
+
+   # directory where built virtualenvs are cached for later builds
+   venv_cache_dir: ~/.cache/pyleus/virtualenvs
+
+   # maximum size of the virtualenv cache in MB (default: 2048)
+   venv_cache_size_mb: 4096
+
+   # directory of wheels built or downloaded for your topologies, kept
+   # across builds and used to install them
+   wheelhouse: ~/.cache/pyleus/wheelhouse
+
+   # install packages from the wheelhouse only, without accessing any
+   # package index (default: false)
+   offline: true
 """
 from __future__ import absolute_import
 
@@ -50,6 +64,8 @@ import collections
 import os
 
 from pyleus import BASE_JAR_PATH
+from pyleus.cli.venv_cache import DEFAULT_CACHE_DIR
+from pyleus.cli.venv_cache import DEFAULT_CACHE_SIZE_MB
 from pyleus.utils import expand_path
 from pyleus.exception import ConfigurationError
 from pyleus.compat import configparser
@@ -68,7 +84,8 @@ Configuration = collections.namedtuple(
     "base_jar config_file debug func include_packages output_jar \
      pypi_index_url nimbus_host nimbus_port storm_cmd_path \
      system_site_packages topology_path topology_jar topology_name verbose \
-     wait_time jvm_opts"
+     wait_time jvm_opts run_time no_cache venv_cache_dir venv_cache_size_mb \
+     wheelhouse offline"
 )
 """Namedtuple containing all pyleus configuration values."""
 
@@ -91,6 +108,12 @@ DEFAULTS = Configuration(
     verbose=False,
     wait_time=None,
     jvm_opts=None,
+    run_time=None,
+    no_cache=False,
+    venv_cache_dir=DEFAULT_CACHE_DIR,
+    venv_cache_size_mb=DEFAULT_CACHE_SIZE_MB,
+    wheelhouse=None,
+    offline=False,
 )
 
 
@@ -3,6 +3,9 @@
 from __future__ import absolute_import
 
 from collections import namedtuple
+import sys
+
+import msgpack
 
 DEFAULT_STREAM = "default"
 
@@ -18,10 +21,66 @@ StormTuple = namedtuple('StormTuple', "id comp stream task values")
 * **id**\(``str`` or ``long``): tuple identifier
 * **comp**\(``str``): name of the emitting component
 * **stream**\(``str``): name of the input stream the tuple belongs to
-* **values**\(``tuple``): values contained by the tuple
+* **values**\(``tuple`` or :class:`~.LazyValues`): values contained by the
+  tuple
 """
 
 
+class LazyValues(object):
+    """Read-only sequence wrapping the msgpack encoded values of a tuple.
+
+    Values are all decoded on first access, then cached, so that components
+    forwarding the tuple unchanged, or not reading it at all, do not pay for
+    decoding it.
+
+    :param raw: msgpack encoded array of values
+    :type raw: ``bytes`` or ``bytearray``
+    """
+
+    __slots__ = ('raw', '_values')
+
+    def __init__(self, raw):
+        self.raw = raw
+        self._values = None
+
+    @property
+    def is_decoded(self):
+        """``True`` if the values have already been fully decoded."""
+        return self._values is not None
+
+    def _decode(self):
+        if self._values is None:
+            self._values = msgpack.unpackb(self.raw)
+        return self._values
+
+    def __getitem__(self, index):
+        return self._decode()[index]
+
+    def __len__(self):
+        return len(self._decode())
+
+    def __iter__(self):
+        return iter(self._decode())
+
+    def __eq__(self, other):
+        if isinstance(other, LazyValues):
+            return self.raw == other.raw or self._decode() == other._decode()
+        if isinstance(other, (list, tuple)):
+            return list(self._decode()) == list(other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "LazyValues({0!r})".format(self._decode())
+
+
 def is_tick(tup):
     """Tell whether the tuple is a tick tuple or not.
 
@@ -54,7 +113,19 @@ class StormWentAwayError(Exception):
         super(StormWentAwayError, self).__init__(message)
 
 
-from pyleus.storm.bolt import Bolt, SimpleBolt
-from pyleus.storm.spout import Spout
+from pyleus.storm.bolt import Bolt, SimpleBolt, BatchBolt
+from pyleus.storm.concurrent_bolt import ConcurrentBolt
+from pyleus.storm.process_pool_bolt import ProcessPoolBolt
+from pyleus.storm.sliding_window_bolt import SlidingWindowBolt
+from pyleus.storm.top_n_bolt import TopNBolt, TopNMergeBolt
+from pyleus.storm.windowed_bolt import WindowedBolt
+from pyleus.storm.spout import Spout, BatchingSpout, ReliableSpout
+from pyleus.storm.prefetching_spout import PrefetchingSpout
+
+_ = [Bolt, SimpleBolt, BatchBolt, ConcurrentBolt, ProcessPoolBolt,
+     SlidingWindowBolt, TopNBolt, TopNMergeBolt, WindowedBolt, Spout,
+     BatchingSpout, ReliableSpout, PrefetchingSpout] # pyflakes
 
-_ = [Bolt, SimpleBolt, Spout] # pyflakes
+if sys.version_info >= (3, 5):
+    from pyleus.storm.aio import AsyncBolt, AsyncSpout
+    _ = [AsyncBolt, AsyncSpout] # pyflakes
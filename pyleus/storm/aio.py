@@ -0,0 +1,371 @@
+"""Module containing asyncio based implementations of the Bolt and Spout
+components, for components spending most of their time awaiting network I/O.
+
+Requires Python >= 3.5.
+"""
+from __future__ import absolute_import
+
+import asyncio
+from collections import deque
+import logging
+
+from pyleus.storm import is_heartbeat, is_tick, StormWentAwayError
+from pyleus.storm.bolt import Bolt
+from pyleus.storm.concurrent_bolt import DEFAULT_MAX_PENDING
+from pyleus.storm.concurrent_bolt import MAX_PENDING_CONF
+from pyleus.storm.concurrent_bolt import PENDING_WAIT_TIMEOUT
+from pyleus.storm.spout import Spout
+
+log = logging.getLogger(__name__)
+
+
+def _all_tasks(loop):
+    if hasattr(asyncio, 'all_tasks'):
+        return asyncio.all_tasks(loop)
+    # Python < 3.7
+    return asyncio.Task.all_tasks(loop)
+
+
+class _AsyncComponentMixin(object):
+    """Event loop driven transport shared by async components.
+
+    A single reader task reads from Storm whenever the input stream is
+    readable, without ever blocking the event loop. Task ids are handed to
+    the emits waiting for them in emit order, while commands are passed to
+    :meth:`~._dispatch_command`.
+    """
+
+    _loop = None
+
+    # Emits already return awaitables
+    _LAZY_TASK_IDS_SUPPORTED = False
+
+    def _init_async(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        # Futures of the emits waiting for their task ids, in emit order
+        self._taskid_waiters = deque()
+        # Set every time the reader may need to resume reading
+        self._resume_reading = asyncio.Event()
+
+    def read_taskid(self):
+        """Return a future which will hold the next task ids sent by Storm.
+        Task ids are matched to emits in order.
+        """
+        future = self._loop.create_future()
+        if self._pending_taskids:
+            future.set_result(self._pending_taskids.popleft())
+        else:
+            self._taskid_waiters.append(future)
+            self._resume_reading.set()
+        return future
+
+    def _wait_readable(self):
+        """Return a future done once the input stream is readable."""
+        future = self._loop.create_future()
+        fileno = self._input_stream.fileno()
+
+        def on_readable():
+            if not future.done():
+                future.set_result(None)
+
+        self._loop.add_reader(fileno, on_readable)
+        future.add_done_callback(lambda _: self._loop.remove_reader(fileno))
+        return future
+
+    async def _read_msg(self):
+        """Coroutine version of :meth:`.Component.read_command`, returning
+        both commands and task ids.
+        """
+        if self._pending_commands:
+            return self._pending_commands.popleft()
+
+        while not self._serializer.has_buffered_msgs():
+            # About to wait for input, Storm must see our output first
+            self.flush()
+            await self._wait_readable()
+            self._serializer.read_input()
+
+        return self._serializer.read_msg()
+
+    def _should_pause_reading(self):
+        """Tell whether the reader should stop reading from Storm for a
+        while, e.g. because too many tuples are being processed.
+        """
+        return False
+
+    async def _read_loop(self):
+        """Read from Storm until it goes away."""
+        while True:
+            while self._should_pause_reading() and not self._taskid_waiters:
+                # Read at least once in a while to keep heartbeats going
+                self._resume_reading.clear()
+                try:
+                    await asyncio.wait_for(
+                        self._resume_reading.wait(), PENDING_WAIT_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+
+            msg = await self._read_msg()
+            if self._msg_is_taskid(msg):
+                if self._taskid_waiters:
+                    self._taskid_waiters.popleft().set_result(msg)
+                else:
+                    log.warning("Received unexpected task ids: {0}"
+                                .format(msg))
+            else:
+                self._dispatch_command(msg)
+
+    def _dispatch_command(self, msg):
+        """Handle a command read from Storm.
+
+        .. note: Implement in subclass.
+        """
+        raise NotImplementedError
+
+    def _cancel_taskid_waiters(self):
+        while self._taskid_waiters:
+            self._taskid_waiters.popleft().set_exception(StormWentAwayError())
+
+    def _awaitable(self, result):
+        """Wrap emit results so that they can always be awaited."""
+        if isinstance(result, list):
+            return asyncio.gather(*result)
+        if result is None:
+            future = self._loop.create_future()
+            future.set_result(None)
+            return future
+        return result
+
+    def emit(self, *args, **kwargs):
+        """Send an output tuple command without waiting for Storm. Return an
+        awaitable holding the task ids the tuple has been sent to, if
+        ``need_task_ids`` is ``True``, or ``None``.
+
+        .. seealso:: :meth:`.Bolt.emit` and :meth:`.Spout.emit`
+        """
+        return self._awaitable(
+            super(_AsyncComponentMixin, self).emit(*args, **kwargs))
+
+    def emit_many(self, *args, **kwargs):
+        """Like :meth:`~.emit`, but the awaitable holds the list of task ids
+        of every tuple, if ``need_task_ids`` is ``True``.
+
+        .. seealso:: :meth:`.Bolt.emit_many` and :meth:`.Spout.emit_many`
+        """
+        return self._awaitable(
+            super(_AsyncComponentMixin, self).emit_many(*args, **kwargs))
+
+    async def _run(self):
+        """Main coroutine of the component.
+
+        .. note: Implement in subclass.
+        """
+        raise NotImplementedError
+
+    def setup_component(self):
+        """Create the event loop before the component initialization."""
+        self._init_async()
+        super(_AsyncComponentMixin, self).setup_component()
+
+    def run_component(self):
+        """Run the component main coroutine in the event loop."""
+        try:
+            self._loop.run_until_complete(self._run())
+        except StormWentAwayError:
+            log.warning("Disconnected from Storm. Exiting.")
+        finally:
+            self._cancel_taskid_waiters()
+            # Give tuples still in flight the chance to handle cancellation
+            tasks = _all_tasks(self._loop)
+            for task in tasks:
+                task.cancel()
+            self._loop.run_until_complete(
+                asyncio.gather(*tasks, return_exceptions=True))
+            self._loop.close()
+
+
+class AsyncBolt(_AsyncComponentMixin, Bolt):
+    """A Bolt whose process_tuple() and process_tick() are coroutines, many
+    of which can run at the same time. Tuples are automatically acked once
+    processed, or failed if an exception is raised, in which case the bolt
+    terminates like a :class:`~pyleus.storm.bolt.SimpleBolt` would.
+
+    :meth:`~.emit` and :meth:`~.emit_many` do not block, but return an
+    awaitable holding the task ids, if requested.
+
+    The bolt stops reading tuples while ``MAX_PENDING`` of them are being
+    processed. It still reads once in a while to answer heartbeats, holding
+    the tuples read meanwhile until some are done. ``MAX_PENDING`` can be
+    overridden by the ``max_pending`` component option, provided it is listed
+    in ``OPTIONS``.
+
+    :Example:
+     .. code-block:: python
+
+        class EnrichBolt(AsyncBolt):
+
+            async def process_tuple(self, tup):
+                user = await fetch_user(tup.values[0])
+                self.emit((user,), anchors=[tup], need_task_ids=False)
+    """
+
+    #: ``int`` maximum number of tuples processed at the same time. If
+    #: ``None``, ``topology.shellbolt.max.pending`` from the Storm
+    #: configuration is used.
+    MAX_PENDING = None
+
+    def setup_component(self):
+        """Configure the maximum number of pending tuples."""
+        super(AsyncBolt, self).setup_component()
+
+        max_pending = (self.options or {}).get("max_pending", self.MAX_PENDING)
+        if max_pending is None:
+            max_pending = self.conf.get(MAX_PENDING_CONF) or DEFAULT_MAX_PENDING
+        self._max_pending = max_pending
+        self._tasks = set()
+        # Tuples read while max_pending of them were being processed
+        self._held = deque()
+        self._failure = self._loop.create_future()
+
+    async def process_tuple(self, tup):
+        """Process the incoming tuple.
+
+        :param tup: pyleus tuple representing the message to be processed
+        :type tup: :class:`~pyleus.storm.StormTuple`
+
+        .. note:: Implement in subclass.
+        """
+        pass
+
+    async def process_tick(self):
+        """Code to be executed when a tick tuple reaches the component.
+
+        .. note:: Implement in subclass."""
+        pass
+
+    def _should_pause_reading(self):
+        return len(self._tasks) >= self._max_pending
+
+    def _dispatch_command(self, msg):
+        tup = self._command_to_tuple(msg)
+        if is_heartbeat(tup):
+            self.sync()
+            return
+
+        if self._held or self._should_pause_reading():
+            self._held.append(tup)
+        else:
+            self._start_tuple(tup)
+
+    def _start_tuple(self, tup):
+        task = self._loop.create_task(self._run_tuple(tup))
+        self._tasks.add(task)
+        task.add_done_callback(self._tuple_done)
+
+    def _tuple_done(self, task):
+        self._tasks.discard(task)
+        while (self._held and not self._failure.done() and
+                not self._should_pause_reading()):
+            self._start_tuple(self._held.popleft())
+        self._resume_reading.set()
+
+    async def _run_tuple(self, tup):
+        """Process a tuple and ack or fail it."""
+        try:
+            if is_tick(tup):
+                await self.process_tick()
+            else:
+                await self.process_tuple(tup)
+        except Exception as e:
+            self.fail(tup)
+            if not self._failure.done():
+                self._failure.set_exception(e)
+        else:
+            self.ack(tup)
+
+    async def _run(self):
+        reader = self._loop.create_task(self._read_loop())
+        try:
+            await asyncio.wait(
+                [reader, self._failure],
+                return_when=asyncio.FIRST_COMPLETED)
+            if self._failure.done():
+                self._failure.result()
+            reader.result()
+        finally:
+            self.flush()
+
+
+class AsyncSpout(_AsyncComponentMixin, Spout):
+    """A Spout whose next_tuple(), ack() and fail() are coroutines.
+
+    Storm sends the next command only after the previous one has been
+    handled, but task ids keep being read while commands are awaited, so
+    emits can be awaited from any coroutine, including background tasks
+    scheduled on the event loop.
+
+    :meth:`~.emit` and :meth:`~.emit_many` do not block, but return an
+    awaitable holding the task ids, if requested.
+    """
+
+    def setup_component(self):
+        """Create the queue of commands to be handled."""
+        super(AsyncSpout, self).setup_component()
+        self._commands = asyncio.Queue()
+
+    async def next_tuple(self):
+        """Emit the next tuple into the topology.
+
+        .. note:: Implement in subclass.
+        """
+        pass
+
+    async def ack(self, tup_id):
+        """Ack a tuple to the source.
+
+        :param tup_id: tuple identifier
+        :type tup_id: ``str`` or ``long``
+
+        .. note:: Implement in subclass. Default behaviour is ``pass``.
+        """
+        pass
+
+    async def fail(self, tup_id):
+        """Fail a tuple to the source.
+
+        :param tup_id: tuple identifier
+        :type tup_id: ``str`` or ``long``
+
+        .. note:: Implement in subclass. Default behaviour is ``pass``.
+        """
+        pass
+
+    def _dispatch_command(self, msg):
+        self._commands.put_nowait(msg)
+
+    async def _handle_command(self, msg):
+        """Switch on the type of command."""
+        command = msg['command']
+
+        if command == 'next':
+            await self.next_tuple()
+        elif command == 'ack':
+            await self.ack(msg['id'])
+        elif command == 'fail':
+            await self.fail(msg['id'])
+
+    async def _run(self):
+        reader = self._loop.create_task(self._read_loop())
+        try:
+            while True:
+                command = self._loop.create_task(self._commands.get())
+                await asyncio.wait(
+                    [reader, command], return_when=asyncio.FIRST_COMPLETED)
+                if not command.done():
+                    command.cancel()
+                    reader.result()
+                await self._handle_command(command.result())
+                self._sync()
+        finally:
+            self.flush()
@@ -5,8 +5,10 @@ nicer API for handling tick tuples.
 from __future__ import absolute_import
 
 import logging
+import time
 
 from pyleus.storm import is_tick, is_heartbeat, StormWentAwayError
+from pyleus.storm import LazyValues
 from pyleus.storm.component import Component
 
 log = logging.getLogger(__name__)
@@ -88,16 +90,18 @@ class Bolt(Component):
         """Respond to heartbeat.
         """
         self.send_command('sync')
+        # Do not let buffered output delay the answer
+        self.flush()
 
     def emit(
             self, values,
             stream=None, anchors=None,
-            direct_task=None, need_task_ids=True):
+            direct_task=None, need_task_ids=None):
         """Build and send an output tuple command dict and return the ids of
         the tasks to which the tuple was sent by Storm.
 
         :param values: pyleus tuple values to be emitted
-        :type values: ``tuple`` or ``list``
+        :type values: ``tuple``, ``list`` or :class:`~pyleus.storm.LazyValues`
         :param stream:
          output stream the message is going to belong to, default ``DEFAULT``
         :type stream: ``str``
@@ -109,8 +113,14 @@ class Bolt(Component):
         :type direct_task: ``int``
         :param need_task_ids:
          whether emit should return the ids of the task the message has been
-         sent to, default ``True``
+         sent to, default ``None``, meaning the topology level
+         ``need_task_ids`` setting, itself ``True`` if not specified
         :type need_task_ids: ``bool``
+        :return:
+         the list of the ids of the tasks the message has been sent to, if
+         ``need_task_ids`` is ``True``. With topology level ``lazy_task_ids``
+         enabled, a :class:`~pyleus.storm.component.TaskIdsFuture` behaving
+         like that list, but not waiting for Storm until accessed
 
         .. tip::
            Setting ``need_task_ids`` to ``False`` really helps in achieving
@@ -120,17 +130,68 @@ class Bolt(Component):
         .. danger::
            ``direct_task`` is not yet supported.
         """
-        assert isinstance(values, list) or isinstance(values, tuple)
+        need_task_ids = self._default_need_task_ids(need_task_ids)
+        command_dict = self._build_emit_command_dict(
+            values, stream, self._anchor_ids(anchors), direct_task,
+            need_task_ids)
 
+        self.send_command('emit', command_dict)
+
+        if need_task_ids:
+            return self._emit_task_ids()
+
+    def emit_many(
+            self, values_list,
+            stream=None, anchors=None,
+            direct_task=None, need_task_ids=None):
+        """Like :meth:`~.emit`, but emit a whole list of output tuples sharing
+        the same stream, anchors and options. All the messages are written to
+        the output stream at once and, if requested, task ids are read only
+        after that, so that there is no round trip with Storm for every tuple.
+
+        :param values_list: list of pyleus tuple values to be emitted
+        :type values_list: ``list`` of ``tuple`` or ``list``
+        :return:
+         list containing the ids of the tasks each tuple has been sent to,
+         if ``need_task_ids`` is ``True``
+        :rtype: ``list`` of ``list``
+
+        .. seealso:: :meth:`~.emit` for the other parameters.
+        """
+        need_task_ids = self._default_need_task_ids(need_task_ids)
+        anchor_ids = self._anchor_ids(anchors)
+        command_dicts = [
+            self._build_emit_command_dict(
+                values, stream, anchor_ids, direct_task, need_task_ids)
+            for values in values_list]
+
+        self.send_commands('emit', command_dicts)
+
+        if need_task_ids:
+            return [self._emit_task_ids() for _ in command_dicts]
+
+    def _anchor_ids(self, anchors):
+        """Return the list of ids of the anchor tuples."""
         if anchors is None:
-            anchors = []
+            return []
+        return [anchor.id for anchor in anchors]
 
-        command_dict = {
-            'anchors': [anchor.id for anchor in anchors],
-            # Different versions of simplejson serialize namedtuples differently.
-            # Cast to tuple in order to have consistent
+    def _build_emit_command_dict(
+            self, values, stream, anchor_ids, direct_task, need_task_ids):
+        """Build the options dict of an emit command."""
+        assert isinstance(values, (list, tuple, LazyValues))
+
+        if not isinstance(values, LazyValues):
+            # Different versions of simplejson serialize namedtuples
+            # differently. Cast to tuple in order to have consistent
             # behavior between msgpack, json and simplejson.
-            'tuple': tuple(values),
+            values = tuple(values)
+        # else the input tuple values are forwarded as they are, so that the
+        # serializer can write them without decoding and encoding them again
+
+        command_dict = {
+            'anchors': anchor_ids,
+            'tuple': values,
         }
 
         if stream is not None:
@@ -145,10 +206,7 @@ class Bolt(Component):
         if not need_task_ids:
             command_dict['need_task_ids'] = False
 
-        self.send_command('emit', command_dict)
-
-        if need_task_ids:
-            return self.read_taskid()
+        return command_dict
 
 
 class SimpleBolt(Bolt):
@@ -156,8 +214,87 @@ class SimpleBolt(Bolt):
 
     Implement process_tick() in a subclass to handle tick tuples with a nicer
     API.
+
+    Setting ``ACK_BATCH_SIZE`` enables acks coalescing: acks and fails are
+    queued and sent to Storm with a single write once ``ACK_BATCH_SIZE`` of
+    them are pending, once the oldest one has been waiting for
+    ``ACK_MAX_DELAY_MS`` milliseconds, or when the bolt is about to wait for
+    more input, whichever comes first. Both can be overridden by the
+    ``ack_batch_size`` and ``ack_max_delay_ms`` component options, provided
+    they are listed in ``OPTIONS``.
     """
 
+    #: ``int`` maximum number of acks and fails to be queued before sending
+    #: them to Storm. Acks coalescing is disabled if ``0``.
+    ACK_BATCH_SIZE = 0
+
+    #: ``int`` or ``float`` maximum number of milliseconds an ack or fail
+    #: can be delayed when acks coalescing is enabled.
+    ACK_MAX_DELAY_MS = 100
+
+    _ack_batch_size = 0
+    _ack_max_delay = 0
+    _pending_acks = None
+    _pending_acks_since = None
+
+    def setup_component(self):
+        """Configure acks coalescing before the bolt initialization."""
+        options = self.options or {}
+        self._ack_batch_size = options.get(
+            "ack_batch_size", self.ACK_BATCH_SIZE)
+        self._ack_max_delay = options.get(
+            "ack_max_delay_ms", self.ACK_MAX_DELAY_MS) / 1000.0
+        self._pending_acks = []
+        super(SimpleBolt, self).setup_component()
+
+    def _queue_ack(self, command, tup):
+        """Queue an ack or fail command, sending all the pending ones if the
+        batch is full or too old.
+        """
+        if not self._pending_acks:
+            self._pending_acks_since = time.time()
+        self._pending_acks.append(
+            self._build_command_dict(command, {'id': tup.id}))
+
+        if (len(self._pending_acks) >= self._ack_batch_size or
+                time.time() - self._pending_acks_since >= self._ack_max_delay):
+            self.flush_acks()
+
+    def flush_acks(self):
+        """Send all the queued acks and fails to Storm at once."""
+        if self._pending_acks:
+            pending_acks = self._pending_acks
+            self._pending_acks = []
+            self._serializer.send_msgs(pending_acks)
+
+    def ack(self, tup):
+        """Ack a tuple, queueing the command if acks coalescing is enabled.
+
+        .. seealso:: :meth:`.Bolt.ack`
+        """
+        if self._ack_batch_size:
+            self._queue_ack('ack', tup)
+        else:
+            super(SimpleBolt, self).ack(tup)
+
+    def fail(self, tup):
+        """Fail a tuple, queueing the command if acks coalescing is enabled.
+
+        .. seealso:: :meth:`.Bolt.fail`
+        """
+        if self._ack_batch_size:
+            self._queue_ack('fail', tup)
+        else:
+            super(SimpleBolt, self).fail(tup)
+
+    def flush(self):
+        """Send the queued acks and fails along with the buffered output.
+
+        .. seealso:: :meth:`.Component.flush`
+        """
+        self.flush_acks()
+        super(SimpleBolt, self).flush()
+
     def process_tick(self):
         """Code to be executed when a tick tuple reaches the component.
 
@@ -175,3 +312,118 @@ class SimpleBolt(Bolt):
                 self.process_tuple(tup)
 
             self.ack(tup)
+
+
+class BatchBolt(Bolt):
+    """A Bolt that processes tuples in batches and automatically acks/fails
+    them.
+
+    Implement process_batch() in a subclass. A batch is made of all the tuples
+    which can be read without blocking, up to ``BATCH_SIZE``, possibly waiting
+    ``BATCH_MAX_WAIT_MS`` milliseconds after the first one for more tuples to
+    come. Both can be overridden by the ``batch_size`` and
+    ``batch_max_wait_ms`` component options, provided they are listed in
+    ``OPTIONS``.
+
+    Heartbeats are answered as soon as they are read. A tick tuple ends the
+    current batch and is handled by process_tick() right after it.
+    """
+
+    #: ``int`` maximum number of tuples in a batch.
+    BATCH_SIZE = 100
+
+    #: ``int`` or ``float`` maximum number of milliseconds to wait for more
+    #: tuples after the first one of a batch. If ``0``, a batch is only made of
+    #: the tuples already sent by Storm.
+    BATCH_MAX_WAIT_MS = 0
+
+    _batch_size = BATCH_SIZE
+    _batch_max_wait = 0
+
+    def setup_component(self):
+        """Configure batching before the bolt initialization."""
+        options = self.options or {}
+        self._batch_size = options.get("batch_size", self.BATCH_SIZE)
+        self._batch_max_wait = options.get(
+            "batch_max_wait_ms", self.BATCH_MAX_WAIT_MS) / 1000.0
+        super(BatchBolt, self).setup_component()
+
+    def process_batch(self, tuples):
+        """Process a batch of incoming tuples.
+
+        :param tuples: non-empty list of pyleus tuples to be processed
+        :type tuples: ``list`` of :class:`~pyleus.storm.StormTuple`
+        :return:
+         tuples to be failed, if any. All the other tuples of the batch are
+         acked. If an exception is raised, the whole batch is failed.
+        :rtype: iterable of :class:`~pyleus.storm.StormTuple` or ``None``
+
+        .. note:: Implement in subclass.
+        """
+        pass
+
+    def process_tick(self):
+        """Code to be executed when a tick tuple reaches the component.
+
+        .. note:: Implement in subclass."""
+        pass
+
+    def _read_batch(self):
+        """Read tuples until the batch is full, no more tuples are available
+        in time or a tick tuple comes in. Return the list of tuples and the
+        tick tuple, if any.
+        """
+        batch = []
+        deadline = None
+        while len(batch) < self._batch_size:
+            if deadline is not None:
+                timeout = max(0, deadline - time.time())
+                if not self.command_available(timeout):
+                    break
+
+            tup = self.read_tuple()
+            if is_heartbeat(tup):
+                self.sync()
+            elif is_tick(tup):
+                return batch, tup
+            else:
+                batch.append(tup)
+                if deadline is None:
+                    deadline = time.time() + self._batch_max_wait
+
+        return batch, None
+
+    def _process_batch(self, batch):
+        """Process a batch and send all acks and fails at once."""
+        try:
+            failed = self.process_batch(batch)
+        except:
+            self.send_commands('fail', [{'id': tup.id} for tup in batch])
+            raise
+
+        failed_ids = set(tup.id for tup in failed) if failed else set()
+        acks = []
+        fails = []
+        for tup in batch:
+            if tup.id in failed_ids:
+                fails.append({'id': tup.id})
+            else:
+                acks.append({'id': tup.id})
+
+        if acks:
+            self.send_commands('ack', acks)
+        if fails:
+            self.send_commands('fail', fails)
+
+    def run_component(self):
+        """BatchBolt main loop."""
+        try:
+            while True:
+                batch, tick = self._read_batch()
+                if batch:
+                    self._process_batch(batch)
+                if tick is not None:
+                    self.process_tick()
+                    self.ack(tick)
+        except StormWentAwayError:
+            log.warning("Disconnected from Storm. Exiting.")
@@ -9,6 +9,7 @@ import logging
 import logging.config
 import os
 import sys
+import tempfile
 import traceback
 
 try:
@@ -24,8 +25,13 @@ from pyleus.storm import LOG_INFO
 from pyleus.storm import LOG_WARN
 from pyleus.storm import LOG_ERROR
 from pyleus.storm import StormTuple
+from pyleus.storm import is_tick
+from pyleus.storm.serializers.binary_serializer import BinarySerializer
 from pyleus.storm.serializers.msgpack_serializer import MsgpackSerializer
 from pyleus.storm.serializers.json_serializer import JSONSerializer
+from pyleus.storm.serializers.serializer import DEFAULT_READ_BUFFER_SIZE
+from pyleus.storm.state import DEFAULT_STATE_BACKEND
+from pyleus.storm.state import open_state
 
 
 # Please keeep in sync with java TopologyBuilder
@@ -37,11 +43,18 @@ DEFAULT_LOGGING_CONFIG_PATH = "pyleus_logging.conf"
 
 JSON_SERIALIZER = "json"
 MSGPACK_SERIALIZER = "msgpack"
+BINARY_SERIALIZER = "binary"
 SERIALIZERS = {
     JSON_SERIALIZER: JSONSerializer,
     MSGPACK_SERIALIZER: MsgpackSerializer,
+    BINARY_SERIALIZER: BinarySerializer,
 }
 
+DEFAULT_OUTPUT_BUFFER_SIZE = 64 * 1024
+DEFAULT_OUTPUT_BUFFER_MAX_MESSAGES = 0 # No limit, only buffer size matters
+
+DEFAULT_STATE_DIR = os.path.join(tempfile.gettempdir(), "pyleus_state")
+
 
 log = logging.getLogger(__name__)
 
@@ -104,6 +117,64 @@ class StormConfig(dict):
         return self.get("topology.tick.tuple.freq.secs")
 
 
+class TaskIdsFuture(object):
+    """Lazily resolved list of the ids of the tasks a tuple has been sent to,
+    returned by emit when lazy task ids are enabled.
+
+    Task ids are read from Storm only when the result is accessed, or as soon
+    as they come in while the component is reading the next command, so that
+    emitting does not wait for a round trip with Storm. It behaves like the
+    ``list`` which would be returned otherwise.
+    """
+
+    __slots__ = ('_component', '_task_ids')
+
+    def __init__(self, component):
+        self._component = component
+        self._task_ids = None
+
+    def done(self):
+        """``True`` if the task ids have already been received."""
+        return self._task_ids is not None
+
+    def result(self):
+        """Return the task ids, waiting for them if needed.
+
+        :rtype: ``list`` of ``int``
+        """
+        if self._task_ids is None:
+            self._component._resolve_task_ids_futures(until=self)
+        return self._task_ids
+
+    def _set_result(self, task_ids):
+        self._task_ids = task_ids
+        self._component = None
+
+    def __iter__(self):
+        return iter(self.result())
+
+    def __len__(self):
+        return len(self.result())
+
+    def __getitem__(self, index):
+        return self.result()[index]
+
+    def __eq__(self, other):
+        if isinstance(other, TaskIdsFuture):
+            other = other.result()
+        return self.result() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        if self._task_ids is None:
+            return "TaskIdsFuture(<pending>)"
+        return "TaskIdsFuture({0!r})".format(self._task_ids)
+
+
 class Component(object):
     """Base class for all pyleus components."""
 
@@ -136,17 +207,22 @@ class Component(object):
 
     pyleus_config = None
 
+    # Components handling task ids on their own may not support lazy ones
+    _LAZY_TASK_IDS_SUPPORTED = True
+
     def __init__(self, input_stream=None, output_stream=None):
         """The Storm component will parse the command line in order
         to figure out if it has been queried for a description or for
         actually running."""
         super(Component, self).__init__()
 
+        # Serializers read and write bytes, use the underlying binary
+        # buffers of stdin and stdout on Python 3
         if input_stream is None:
-            input_stream = sys.stdin
+            input_stream = getattr(sys.stdin, 'buffer', sys.stdin)
 
         if output_stream is None:
-            output_stream = sys.stdout
+            output_stream = getattr(sys.stdout, 'buffer', sys.stdout)
 
         self._input_stream = input_stream
         self._output_stream = output_stream
@@ -154,7 +230,14 @@ class Component(object):
         self._pending_commands = deque()
         self._pending_taskids = deque()
 
+        # Default value for the need_task_ids emit parameter
+        self._need_task_ids = True
+        self._lazy_task_ids = False
+        # Unresolved TaskIdsFuture objects, in emit order
+        self._task_ids_futures = deque()
+
         self._serializer = None
+        self._state = None
 
     def describe(self):
         """Print to stdout a JSON description of the component.
@@ -185,11 +268,47 @@ class Component(object):
         """
         serializer = self.pyleus_config.get('serializer')
         if serializer in SERIALIZERS:
+            kwargs = {
+                'read_buffer_size': self.pyleus_config.get(
+                    'read_buffer_size', DEFAULT_READ_BUFFER_SIZE),
+            }
+            if serializer == JSON_SERIALIZER:
+                kwargs['json_backend'] = self.pyleus_config.get(
+                    'json_backend')
+            elif serializer == BINARY_SERIALIZER:
+                kwargs['output_fields'] = _expand_output_fields(
+                    self.OUTPUT_FIELDS)
+
             self._serializer = SERIALIZERS[serializer](
-                self._input_stream, self._output_stream)
+                self._input_stream, self._output_stream, **kwargs)
         else:
             raise ValueError("Unknown serializer: {0}", serializer)
 
+    def initialize_output_buffering(self):
+        """Enable output buffering if requested in command line configuration.
+
+        When buffering is enabled, commands are not written as soon as they are
+        sent, but accumulated by the serializer and written all at once by
+        :meth:`~.flush` right before the component blocks waiting for Storm.
+        """
+        if self.pyleus_config.get('output_buffering'):
+            self._serializer.enable_output_buffering(
+                self.pyleus_config.get(
+                    'output_buffer_size', DEFAULT_OUTPUT_BUFFER_SIZE),
+                self.pyleus_config.get(
+                    'output_buffer_max_messages',
+                    DEFAULT_OUTPUT_BUFFER_MAX_MESSAGES))
+
+    def initialize_task_ids(self):
+        """Set the default value of the ``need_task_ids`` emit parameter and
+        whether task ids should be returned lazily, as requested in command
+        line configuration.
+        """
+        self._need_task_ids = self.pyleus_config.get('need_task_ids', True)
+        self._lazy_task_ids = (
+            self._LAZY_TASK_IDS_SUPPORTED and
+            self.pyleus_config.get('lazy_task_ids', False))
+
     def setup_component(self):
         """Storm component setup before execution. It will also
         call the initialization method implemented in the subclass.
@@ -197,6 +316,60 @@ class Component(object):
         self.conf, self.context = self._init_component()
         self.initialize()
 
+    def _state_path(self, state_dir, backend):
+        """Return the path of the state file of the task, unique within the
+        topology and stable across restarts.
+        """
+        context = self.context or {}
+        task_id = context.get('taskid')
+        # JSON encoded contexts have string keys
+        task_to_component = context.get('task->component', {})
+        component = task_to_component.get(
+            task_id, task_to_component.get(str(task_id), self.COMPONENT_TYPE))
+
+        directory = os.path.join(
+            state_dir, (self.conf or {}).get('topology.name', 'topology'))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        return os.path.join(
+            directory, "{0}-{1}.{2}".format(component, task_id, backend))
+
+    @property
+    def state(self):
+        """Persistent ``dict``-like :class:`~pyleus.storm.state.State` of the
+        task, opened on first access.
+
+        Keys and values must be serializable by msgpack. Updates are kept in
+        memory and written to disk on every tick tuple, so that they are cheap
+        enough to be done for every tuple, and when the component terminates.
+        A task restarted on the same host recovers the state of its last
+        checkpoint, so set ``tick_freq_secs`` for the component in the
+        topology definition, or call ``self.state.checkpoint()`` at will.
+
+        The location and the format of the state are set by the
+        ``state_dir`` and ``state_backend`` topology options.
+
+        .. warning::
+           Updates since the last checkpoint are lost if the task crashes,
+           even though their tuples may have been acked already.
+        """
+        if self._state is None:
+            pyleus_config = self.pyleus_config or {}
+            backend = (pyleus_config.get('state_backend') or
+                       DEFAULT_STATE_BACKEND)
+            self._state = open_state(
+                self._state_path(
+                    pyleus_config.get('state_dir') or DEFAULT_STATE_DIR,
+                    backend),
+                backend)
+        return self._state
+
+    def close_state(self):
+        """Checkpoint and close the state, if it has been opened."""
+        if self._state is not None:
+            self._state.close()
+            self._state = None
+
     def initialize(self):
         """Called after component has been launched, but before processing any
         tuples. You can use this method to setup your component.
@@ -234,11 +407,15 @@ class Component(object):
         try:
             self.initialize_logging()
             self.initialize_serializer()
+            self.initialize_output_buffering()
+            self.initialize_task_ids()
             self.setup_component()
             self.run_component()
+            self.close_state()
         except:
             log.exception("Exception in {0}.run".format(self.COMPONENT_TYPE))
             self.error(traceback.format_exc())
+            self.flush()
 
     def run_component(self):
         """Run the main loop of the component. Implemented in Bolt and
@@ -249,13 +426,36 @@ class Component(object):
     def _msg_is_command(self, msg):
         """Storm differentiates between commands and taskids by whether the
         message is a ``dict`` or ``list``.
+
+        Serializers may also return bolt tuples as already built
+        :class:`~pyleus.storm.StormTuple` objects, which are commands as well.
         """
-        return isinstance(msg, dict)
+        return not isinstance(msg, list)
 
     def _msg_is_taskid(self, msg):
         """..seealso::  :meth:`~._msg_is_command`"""
         return isinstance(msg, list)
 
+    def _flush_before_read(self):
+        """Flush the output if reading the next message may block on the input
+        stream, as Storm must see our output first. Messages already decoded
+        by the serializer belong to the same read batch and do not need it.
+        """
+        if not self._serializer.has_buffered_msgs():
+            self.flush()
+
+    def command_available(self, timeout=0):
+        """Tell whether there is a command ready to be read, waiting up to
+        ``timeout`` seconds for Storm to send one. Meant to be used by
+        components willing to poll for input instead of blocking on it.
+
+        .. seealso::
+           :meth:`~pyleus.storm.serializers.serializer.Serializer.input_available`
+        """
+        if self._pending_commands:
+            return True
+        return self._serializer.input_available(timeout)
+
     def read_command(self):
         """Return the next command from the input stream, whether from the
         _pending_commands queue or the stream directly if the queue is empty.
@@ -266,34 +466,88 @@ class Component(object):
         if self._pending_commands:
             return self._pending_commands.popleft()
 
-        msg = self._serializer.read_msg()
-
-        while self._msg_is_taskid(msg):
-            self._pending_taskids.append(msg)
+        while True:
+            # Checked before every read, as decoded messages may run out
+            self._flush_before_read()
             msg = self._serializer.read_msg()
+            if not self._msg_is_taskid(msg):
+                return msg
+            self._queue_taskid(msg)
 
-        return msg
+    def _queue_taskid(self, taskid):
+        """Hand a taskid received while reading a command over to the oldest
+        lazy emit, or queue it.
+        """
+        if self._task_ids_futures:
+            self._task_ids_futures.popleft()._set_result(taskid)
+        else:
+            self._pending_taskids.append(taskid)
+
+    def _resolve_task_ids_futures(self, until=None):
+        """Read task ids for the pending lazy emits, in emit order, until
+        ``until`` is resolved or all of them are.
+        """
+        while self._task_ids_futures:
+            future = self._task_ids_futures.popleft()
+            future._set_result(self._read_taskid())
+            if future is until:
+                break
+
+    def _emit_task_ids(self):
+        """Return the task ids of the last emit, lazily if enabled."""
+        if self._lazy_task_ids:
+            future = TaskIdsFuture(self)
+            self._task_ids_futures.append(future)
+            return future
+        return self.read_taskid()
+
+    def _default_need_task_ids(self, need_task_ids):
+        """Resolve the ``None`` value of the need_task_ids emit parameter."""
+        if need_task_ids is None:
+            return self._need_task_ids
+        return need_task_ids
 
     def read_taskid(self):
         """Like :meth:`~.read_command`, but returns the next taskid and queues
         any commands received while reading the input stream.
+
+        Task ids of previous lazy emits are read first.
         """
+        self._resolve_task_ids_futures()
+        return self._read_taskid()
+
+    def _read_taskid(self):
         if self._pending_taskids:
             return self._pending_taskids.popleft()
 
-        msg = self._serializer.read_msg()
-
-        while self._msg_is_command(msg):
-            self._pending_commands.append(msg)
+        while True:
+            # Decoded commands may all be queued before the task ids arrive,
+            # which Storm only sends once it has seen the emit
+            self._flush_before_read()
             msg = self._serializer.read_msg()
-
-        return msg
+            if not self._msg_is_command(msg):
+                return msg
+            self._pending_commands.append(msg)
 
     def read_tuple(self):
         """Read and parse a command into a StormTuple object."""
-        cmd = self.read_command()
-        return StormTuple(
-            cmd['id'], cmd['comp'], cmd['stream'], cmd['task'], cmd['tuple'])
+        return self._command_to_tuple(self.read_command())
+
+    def _command_to_tuple(self, cmd):
+        """Build a StormTuple object out of a command, unless the serializer
+        already did it.
+        """
+        if isinstance(cmd, StormTuple):
+            tup = cmd
+        else:
+            tup = StormTuple(
+                cmd['id'], cmd['comp'], cmd['stream'], cmd['task'],
+                cmd['tuple'])
+
+        # Periodic checkpoints of the state, if any
+        if self._state is not None and is_tick(tup):
+            self._state.checkpoint()
+        return tup
 
     def _create_pidfile(self, pid_dir, pid):
         """Create a file based on pid used by Storm to watch over the Python
@@ -309,21 +563,43 @@ class Component(object):
 
         pid = os.getpid()
         self._serializer.send_msg({'pid': pid})
+        self._serializer.flush()
         self._create_pidfile(setup_info['pidDir'], pid)
 
         return StormConfig(setup_info['conf']), setup_info['context']
 
-    def send_command(self, command, opts_dict=None):
-        """Merge command with options and send the message through
-        :class:`~pyleus.storm.serializers.serializer.Serializer`
-        """
+    def _build_command_dict(self, command, opts_dict):
+        """Merge command with options."""
         if opts_dict is not None:
             command_dict = dict(opts_dict)
             command_dict['command'] = command
         else:
             command_dict = dict(command=command)
 
-        self._serializer.send_msg(command_dict)
+        return command_dict
+
+    def send_command(self, command, opts_dict=None):
+        """Merge command with options and send the message through
+        :class:`~pyleus.storm.serializers.serializer.Serializer`
+        """
+        self._serializer.send_msg(self._build_command_dict(command, opts_dict))
+
+    def send_commands(self, command, opts_dicts):
+        """Like :meth:`~.send_command`, but send many messages of the same
+        command type with a single write on the output stream.
+        """
+        self._serializer.send_msgs([
+            self._build_command_dict(command, opts_dict)
+            for opts_dict in opts_dicts])
+
+    def flush(self):
+        """Write all the buffered commands to the output stream. Does nothing
+        if output buffering is disabled.
+
+        It is automatically called every time the component is about to block
+        waiting for a message from Storm.
+        """
+        self._serializer.flush()
 
     def log(self, msg, level=LOG_INFO):
         """Send a log message.
@@ -0,0 +1,306 @@
+"""Module containing the implementation of ConcurrentBolt, a Bolt component
+processing many tuples at the same time in a pool of threads. It is meant for
+I/O bound bolts, which spend most of their time waiting for network or
+database calls.
+"""
+from __future__ import absolute_import
+
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import threading
+import time
+
+from pyleus.storm import is_heartbeat, is_tick, StormWentAwayError
+from pyleus.storm.bolt import Bolt
+
+log = logging.getLogger(__name__)
+
+MAX_PENDING_CONF = "topology.shellbolt.max.pending"
+# Storm default value for topology.shellbolt.max.pending
+DEFAULT_MAX_PENDING = 100
+
+# Maximum number of seconds the bolt stops reading from Storm when too many
+# tuples are pending. Reading at least once in a while keeps heartbeats going,
+# while tuples read in the meantime are held until a worker is available.
+PENDING_WAIT_TIMEOUT = 1.0
+
+
+class ConcurrentBolt(Bolt):
+    """A Bolt that runs process_tuple() in a pool of threads and
+    automatically acks/fails tuples, by default in the same order they came
+    in.
+
+    Implement process_tuple() and, if needed, process_tick() in a subclass,
+    exactly as with :class:`~pyleus.storm.bolt.SimpleBolt`. They must be
+    thread-safe, as up to ``MAX_WORKERS`` of them run at the same time.
+    Calling emit() from them is safe: all writes to Storm go through a single
+    lock, and task ids are routed back to the emitting thread.
+
+    The main thread keeps reading from Storm and answering heartbeats while
+    tuples are processed. It stops dispatching new tuples while ``MAX_PENDING``
+    of them are being processed or waiting for a worker: tuples read in the
+    meantime are held, and dispatched as soon as some are done.
+    ``MAX_WORKERS``, ``MAX_PENDING`` and ``ORDERED`` can be overridden by the
+    ``max_workers``, ``max_pending`` and ``ordered`` component options,
+    provided they are listed in ``OPTIONS``.
+
+    If processing a tuple raises an exception, the tuple is failed and the
+    bolt terminates, like a :class:`~pyleus.storm.bolt.SimpleBolt` would.
+    """
+
+    #: ``int`` number of threads processing tuples.
+    MAX_WORKERS = 8
+
+    #: ``int`` maximum number of tuples processed or waiting for a worker at
+    #: the same time. If ``None``, ``topology.shellbolt.max.pending`` from the
+    #: Storm configuration is used.
+    MAX_PENDING = None
+
+    #: ``bool`` whether tuples should be acked in the same order they came
+    #: in, or as soon as they are processed.
+    ORDERED = True
+
+    _LAZY_TASK_IDS_SUPPORTED = False
+
+    def __init__(self, *args, **kwargs):
+        super(ConcurrentBolt, self).__init__(*args, **kwargs)
+
+        # Guards writes to Storm and the state shared with worker threads
+        self._lock = threading.Condition(threading.RLock())
+        self._concurrent = False
+        self._executor = None
+        self._max_workers = self.MAX_WORKERS
+        self._max_pending = DEFAULT_MAX_PENDING
+        self._ordered = self.ORDERED
+        # (tuple, future) pairs, in the order tuples came in
+        self._in_flight = deque()
+        # Tuples read while max_pending of them were in flight
+        self._held = deque()
+        # Futures of the emits waiting for their task ids, in emit order
+        self._taskid_waiters = deque()
+        self._local = threading.local()
+        self._failed_future = None
+
+    def setup_component(self):
+        """Configure the thread pool after Storm configuration is loaded."""
+        super(ConcurrentBolt, self).setup_component()
+
+        options = self.options or {}
+        self._max_workers = options.get("max_workers", self.MAX_WORKERS)
+        max_pending = options.get("max_pending", self.MAX_PENDING)
+        if max_pending is None:
+            max_pending = self.conf.get(MAX_PENDING_CONF) or DEFAULT_MAX_PENDING
+        self._max_pending = max_pending
+        self._ordered = options.get("ordered", self.ORDERED)
+
+    def process_tick(self):
+        """Code to be executed when a tick tuple reaches the component.
+
+        .. note:: Implement in subclass."""
+        pass
+
+    def send_command(self, command, opts_dict=None):
+        """Thread-safe version of :meth:`.Component.send_command`."""
+        with self._lock:
+            super(ConcurrentBolt, self).send_command(command, opts_dict)
+            if command == 'emit':
+                self._expect_taskids([opts_dict])
+
+    def send_commands(self, command, opts_dicts):
+        """Thread-safe version of :meth:`.Component.send_commands`."""
+        with self._lock:
+            super(ConcurrentBolt, self).send_commands(command, opts_dicts)
+            if command == 'emit':
+                self._expect_taskids(opts_dicts)
+
+    def flush(self):
+        """Thread-safe version of :meth:`.Component.flush`."""
+        with self._lock:
+            super(ConcurrentBolt, self).flush()
+
+    def _expect_taskids(self, opts_dicts):
+        """Register a future for every emit Storm is going to send task ids
+        back for, both globally and for the emitting thread.
+        """
+        if not self._concurrent:
+            return
+
+        local_waiters = self._local_waiters()
+        for opts_dict in opts_dicts:
+            if opts_dict.get('need_task_ids', True):
+                future = Future()
+                self._taskid_waiters.append(future)
+                local_waiters.append(future)
+
+        self._lock.notify_all()
+
+    def _local_waiters(self):
+        """Return the task ids futures of the current thread."""
+        waiters = getattr(self._local, 'waiters', None)
+        if waiters is None:
+            waiters = self._local.waiters = deque()
+        return waiters
+
+    def read_taskid(self):
+        """Wait for the main thread to read the task ids of the oldest emit
+        of the current thread.
+        """
+        if not self._concurrent:
+            return super(ConcurrentBolt, self).read_taskid()
+
+        # Storm needs to see the emit before sending back task ids
+        self.flush()
+        return self._local_waiters().popleft().result()
+
+    def _resolve_taskids(self, taskids):
+        """Hand task ids read by the main thread over to the emitting
+        thread.
+        """
+        with self._lock:
+            if not self._taskid_waiters:
+                log.warning("Received unexpected task ids: {0}".format(taskids))
+                return
+            self._taskid_waiters.popleft().set_result(taskids)
+
+    def _cancel_taskid_waiters(self):
+        with self._lock:
+            while self._taskid_waiters:
+                self._taskid_waiters.popleft().set_exception(
+                    StormWentAwayError())
+
+    def _run_tuple(self, tup):
+        """Worker thread entry point."""
+        if is_tick(tup):
+            self.process_tick()
+        else:
+            self.process_tuple(tup)
+
+    def _tuple_processed(self, tup, result):
+        """Called with the result of the worker right before acking the
+        tuple.
+        """
+        pass
+
+    def _finish_tuple(self, tup, future):
+        """Ack or fail a processed tuple."""
+        if future.cancelled():
+            return
+        if future.exception() is None:
+            self._tuple_processed(tup, future.result())
+            self.ack(tup)
+        else:
+            self.fail(tup)
+            if self._failed_future is None:
+                self._failed_future = future
+
+    def _tuple_done(self, future):
+        """Ack or fail all the tuples at the head of the queue which have
+        been processed, so that acks are sent in order. If ordering is
+        disabled, only deal with the tuple just processed.
+        """
+        with self._lock:
+            if self._ordered:
+                while self._in_flight and self._in_flight[0][1].done():
+                    self._finish_tuple(*self._in_flight.popleft())
+            else:
+                for entry in self._in_flight:
+                    if entry[1] is future:
+                        self._in_flight.remove(entry)
+                        self._finish_tuple(*entry)
+                        break
+
+            self._submit_held()
+
+            # Nobody else is going to flush if the main thread is blocked
+            # waiting for input
+            self.flush()
+            self._lock.notify_all()
+
+    def _create_executor(self):
+        return ThreadPoolExecutor(max_workers=self._max_workers)
+
+    def _submit_tuple(self, tup):
+        """Return the future of the tuple being processed by a worker."""
+        return self._executor.submit(self._run_tuple, tup)
+
+    def _submit(self, tup):
+        """Dispatch a tuple to the pool of workers."""
+        future = self._submit_tuple(tup)
+        with self._lock:
+            self._in_flight.append((tup, future))
+        future.add_done_callback(self._tuple_done)
+
+    def _dispatch(self, tup):
+        """Submit a tuple, or hold it if max_pending tuples are in flight."""
+        with self._lock:
+            if self._held or len(self._in_flight) >= self._max_pending:
+                self._held.append(tup)
+            else:
+                self._submit(tup)
+
+    def _submit_held(self):
+        """Submit the held tuples, in order, as long as slots are free."""
+        with self._lock:
+            while (self._held and self._failed_future is None and
+                    len(self._in_flight) < self._max_pending):
+                self._submit(self._held.popleft())
+
+    def _check_failure(self):
+        """Re-raise in the main thread any exception raised processing a
+        tuple.
+        """
+        if self._failed_future is not None:
+            self._failed_future.result()
+
+    def _wait_for_slot(self):
+        """Wait until less than max_pending tuples are in flight. Do not wait
+        if some worker is waiting for task ids, as they have to be read first,
+        and never wait more than PENDING_WAIT_TIMEOUT.
+        """
+        deadline = time.time() + PENDING_WAIT_TIMEOUT
+        with self._lock:
+            while (len(self._in_flight) >= self._max_pending and
+                    not self._taskid_waiters and
+                    self._failed_future is None):
+                timeout = deadline - time.time()
+                if timeout <= 0:
+                    break
+                self._lock.wait(timeout)
+
+    def _read_msg(self):
+        """Read the next message from Storm, including any command queued
+        while reading task ids before the thread pool started.
+        """
+        if self._pending_commands:
+            return self._pending_commands.popleft()
+
+        self._flush_before_read()
+        return self._serializer.read_msg()
+
+    def run_component(self):
+        """ConcurrentBolt main loop."""
+        self._executor = self._create_executor()
+        self._concurrent = True
+        try:
+            while True:
+                self._wait_for_slot()
+                self._check_failure()
+                self._submit_held()
+
+                msg = self._read_msg()
+                if self._msg_is_taskid(msg):
+                    self._resolve_taskids(msg)
+                    continue
+
+                tup = self._command_to_tuple(msg)
+                if is_heartbeat(tup):
+                    self.sync()
+                else:
+                    self._dispatch(tup)
+        except StormWentAwayError:
+            log.warning("Disconnected from Storm. Exiting.")
+        finally:
+            self._cancel_taskid_waiters()
+            self._executor.shutdown(wait=False)
@@ -0,0 +1,139 @@
+"""Module containing the implementation of PrefetchingSpout, a Spout component
+reading its input on a background thread, for spouts reading from files,
+sockets or local queues.
+"""
+from __future__ import absolute_import
+
+import logging
+import sys
+import threading
+
+import six
+from six.moves import queue
+
+from pyleus.storm.spout import Spout
+
+log = logging.getLogger(__name__)
+
+BLOCK_POLICY = "block"
+DROP_POLICY = "drop"
+
+QUEUE_POLICIES = (BLOCK_POLICY, DROP_POLICY)
+
+
+class PrefetchingSpout(Spout):
+    """A Spout running generate_items() on a background thread, which fills a
+    bounded queue of items, so that next_tuple() never blocks on I/O and
+    syncs with Storm are not delayed.
+
+    Implement generate_items() in a subclass, yielding the items to be
+    emitted, and process_item() if items are not tuple values, or need to be
+    emitted with a ``tup_id`` or on a specific stream. Do not implement
+    next_tuple(): it pops one ready item from the queue, if any, and passes it
+    to process_item().
+
+    When the queue already holds ``QUEUE_SIZE`` items, the background thread
+    waits for room if ``QUEUE_POLICY`` is ``"block"``, or discards the item if
+    it is ``"drop"``. ``QUEUE_SIZE`` and ``QUEUE_POLICY`` can be overridden by
+    the ``queue_size`` and ``queue_policy`` component options, provided they
+    are listed in ``OPTIONS``.
+
+    If generate_items() raises an exception, the spout terminates the next
+    time Storm asks for a tuple. Once it is exhausted, the spout keeps running
+    without emitting anything else.
+
+    :Example:
+     .. code-block:: python
+
+        class FileSpout(PrefetchingSpout):
+
+            OUTPUT_FIELDS = ["line"]
+
+            def generate_items(self):
+                with open("/var/log/input.log") as f:
+                    for line in f:
+                        yield (line,)
+    """
+
+    #: ``int`` maximum number of items prefetched.
+    QUEUE_SIZE = 1000
+
+    #: ``str`` what to do with new items when the queue is full, either
+    #: ``"block"`` or ``"drop"``.
+    QUEUE_POLICY = BLOCK_POLICY
+
+    def __init__(self, *args, **kwargs):
+        super(PrefetchingSpout, self).__init__(*args, **kwargs)
+
+        #: ``int`` number of items discarded because the queue was full.
+        self.dropped_count = 0
+
+        self._queue = None
+        self._queue_policy = self.QUEUE_POLICY
+        self._reader = None
+        self._reader_exc_info = None
+
+    def setup_component(self):
+        """Start the background thread after the component initialization,
+        so that generate_items() can rely on anything initialize() sets up.
+        """
+        super(PrefetchingSpout, self).setup_component()
+
+        options = self.options or {}
+        self._queue_policy = options.get("queue_policy", self.QUEUE_POLICY)
+        if self._queue_policy not in QUEUE_POLICIES:
+            raise ValueError(
+                "Unknown queue policy: {0}".format(self._queue_policy))
+        self._queue = queue.Queue(options.get("queue_size", self.QUEUE_SIZE))
+
+        self._reader = threading.Thread(target=self._prefetch)
+        # Never keep the process alive once Storm goes away
+        self._reader.daemon = True
+        self._reader.start()
+
+    def generate_items(self):
+        """Yield the items to be emitted. Runs on a background thread.
+
+        .. note:: Implement in subclass.
+        """
+        return iter(())
+
+    def process_item(self, item):
+        """Emit a prefetched item. Called by next_tuple(), on the main
+        thread. Default behaviour is to emit the item as tuple values.
+
+        :param item: item yielded by :meth:`~.generate_items`
+        """
+        self.emit(item)
+
+    def _prefetch(self):
+        """Background thread entry point."""
+        try:
+            for item in self.generate_items():
+                if self._queue_policy == BLOCK_POLICY:
+                    self._queue.put(item)
+                else:
+                    try:
+                        self._queue.put_nowait(item)
+                    except queue.Full:
+                        self.dropped_count += 1
+        except Exception:
+            log.exception("Error while prefetching items")
+            self._reader_exc_info = sys.exc_info()
+
+    def _check_reader(self):
+        """Re-raise in the main thread any exception raised by
+        generate_items().
+        """
+        if self._reader_exc_info is not None:
+            six.reraise(*self._reader_exc_info)
+
+    def next_tuple(self):
+        """Process the next prefetched item, if any, without blocking."""
+        try:
+            item = self._queue.get_nowait()
+        except queue.Empty:
+            self._check_reader()
+            return
+
+        self.process_item(item)
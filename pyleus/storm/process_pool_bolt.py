@@ -0,0 +1,124 @@
+"""Module containing the implementation of ProcessPoolBolt, a Bolt component
+processing tuples in a pool of worker processes. It is meant for CPU bound
+bolts, which could not take advantage of more than one core otherwise.
+"""
+from __future__ import absolute_import
+
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import sys
+
+from pyleus.storm import is_tick
+from pyleus.storm.concurrent_bolt import ConcurrentBolt
+
+# Bolt instance inherited by worker processes when forked
+_worker_bolt = None
+
+
+def _run_in_worker(tup):
+    """Worker process entry point. Process a tuple and return the commands
+    the bolt sent meanwhile.
+    """
+    bolt = _worker_bolt
+    bolt._worker_commands = []
+    try:
+        if is_tick(tup):
+            bolt.process_tick()
+        else:
+            bolt.process_tuple(tup)
+        return bolt._worker_commands
+    finally:
+        bolt._worker_commands = None
+
+
+class ProcessPoolBolt(ConcurrentBolt):
+    """A Bolt that runs process_tuple() in a pool of forked worker processes
+    and automatically acks/fails tuples, by default in the same order they
+    came in.
+
+    Implement process_tuple() and, if needed, process_tick() in a subclass,
+    exactly as with :class:`~pyleus.storm.bolt.SimpleBolt`. Workers are
+    forked from the process talking to Storm after initialize() has been
+    called, so they inherit its state, but changes they make to it are not
+    shared.
+
+    Tuples are sent to workers and results are sent back through
+    multiprocessing queues. Commands sent by workers, such as emits and logs,
+    are written to Storm by the main process right before acking the tuple.
+    As a consequence, emit() always returns ``None`` in workers, task ids
+    not being available.
+
+    ``MAX_WORKERS`` defaults to the number of CPUs.
+
+    .. seealso:: :class:`~pyleus.storm.concurrent_bolt.ConcurrentBolt` for
+       the other settings.
+    """
+
+    #: ``int`` number of worker processes. If ``None``, the number of CPUs.
+    MAX_WORKERS = None
+
+    # Commands sent while processing a tuple, only set in worker processes
+    _worker_commands = None
+
+    def setup_component(self):
+        """Configure the pool of workers."""
+        super(ProcessPoolBolt, self).setup_component()
+        if self._max_workers is None:
+            self._max_workers = multiprocessing.cpu_count()
+
+    def send_command(self, command, opts_dict=None):
+        """Record the command in worker processes, send it otherwise."""
+        if self._worker_commands is None:
+            return super(ProcessPoolBolt, self).send_command(
+                command, opts_dict)
+        self._record_commands(command, [opts_dict])
+
+    def send_commands(self, command, opts_dicts):
+        """Record the commands in worker processes, send them otherwise."""
+        if self._worker_commands is None:
+            return super(ProcessPoolBolt, self).send_commands(
+                command, opts_dicts)
+        self._record_commands(command, opts_dicts)
+
+    def _record_commands(self, command, opts_dicts):
+        for opts_dict in opts_dicts:
+            command_dict = self._build_command_dict(command, opts_dict)
+            if command == 'emit':
+                # Task ids can not be handed over to workers
+                command_dict['need_task_ids'] = False
+            self._worker_commands.append(command_dict)
+
+    def read_taskid(self):
+        """Return ``None`` in worker processes.
+
+        .. seealso:: :meth:`.ConcurrentBolt.read_taskid`
+        """
+        if self._worker_commands is None:
+            return super(ProcessPoolBolt, self).read_taskid()
+        return None
+
+    def flush(self):
+        """Do nothing in worker processes.
+
+        .. seealso:: :meth:`.ConcurrentBolt.flush`
+        """
+        if self._worker_commands is None:
+            super(ProcessPoolBolt, self).flush()
+
+    def _create_executor(self):
+        global _worker_bolt
+        _worker_bolt = self
+
+        kwargs = {}
+        if sys.version_info >= (3, 7):
+            # Workers rely on inheriting the bolt instance
+            kwargs['mp_context'] = multiprocessing.get_context('fork')
+        return ProcessPoolExecutor(max_workers=self._max_workers, **kwargs)
+
+    def _submit_tuple(self, tup):
+        return self._executor.submit(_run_in_worker, tup)
+
+    def _tuple_processed(self, tup, commands):
+        """Write the commands sent by the worker."""
+        if commands:
+            self._serializer.send_msgs(commands)
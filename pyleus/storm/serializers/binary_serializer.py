@@ -0,0 +1,205 @@
+"""Length-prefixed binary framing implementation of Pyleus serializer.
+
+Unlike the JSON and msgpack serializers, which encode the full command dict
+with string keys for every message, this serializer sends positional msgpack
+arrays identified by compact integer codes. Stream names are replaced by their
+index in the sorted list of streams declared in OUTPUT_FIELDS, so that field
+and stream names never travel on the pipe.
+
+Every frame has the following layout::
+
+    +--------------+---------------+--------+--------+
+    | frame length | header length | header | values |
+    |  (uint32 BE) |  (uint32 BE)  |        |        |
+    +--------------+---------------+--------+--------+
+
+where frame length counts both header and values. The header is a msgpack
+array whose first element is the message code. For messages carrying a tuple,
+the values are a separate msgpack array following the header.
+
+Please keep in sync with com.yelp.pyleus.serializer.BinarySerializer.
+"""
+import struct
+
+import msgpack
+
+from pyleus.storm import DEFAULT_STREAM
+from pyleus.storm import LazyValues
+from pyleus.storm import StormTuple
+from pyleus.storm import StormWentAwayError
+from pyleus.storm.serializers.serializer import Serializer
+from pyleus.storm.serializers.serializer import read_into
+
+FRAME_HEADER = struct.Struct(">II")
+
+# Storm -> component message codes
+SETUP = 0 # [SETUP, setup_info]
+BOLT_TUPLE = 1 # [BOLT_TUPLE, id, comp, stream, task] + values
+SPOUT_COMMAND = 2 # [SPOUT_COMMAND, command, id]
+TASK_IDS = 3 # [TASK_IDS, task_ids]
+
+# Component -> Storm message codes and spout commands
+PID = 0 # [PID, pid]
+EMIT = 1 # [EMIT, stream, id, anchors, task, need_task_ids] + values
+ACK = 2 # [ACK, id]
+FAIL = 3 # [FAIL, id]
+SYNC = 4 # [SYNC]
+LOG = 5 # [LOG, msg, level]
+ERROR = 6 # [ERROR, msg]
+NEXT = 7
+
+COMMAND_CODES = {
+    'emit': EMIT,
+    'ack': ACK,
+    'fail': FAIL,
+    'sync': SYNC,
+    'log': LOG,
+    'error': ERROR,
+    'next': NEXT,
+}
+
+COMMAND_NAMES = dict((code, name) for name, code in COMMAND_CODES.items())
+
+
+def _declared_streams(output_fields):
+    """Return the sorted list of user streams declared in output_fields."""
+    if not output_fields:
+        return [DEFAULT_STREAM]
+    return sorted(s for s in output_fields if not s.startswith("__"))
+
+
+def _frames_generator(input_stream, read_buffer_size):
+    """Yield the list of (header, values) tuples of buffers for the frames
+    completed by every read.
+    """
+    buf = bytearray(read_buffer_size)
+    view = memoryview(buf)
+    pending = bytearray()
+    fileno = input_stream.fileno()
+    unpack_frame_header = FRAME_HEADER.unpack_from
+    frame_header_size = FRAME_HEADER.size
+    while True:
+        nbytes = read_into(fileno, buf)
+        if not nbytes:
+            # Handle EOF, which usually means Storm went away
+            raise StormWentAwayError()
+        pending += view[:nbytes]
+
+        frames = []
+        start = 0
+        available = len(pending)
+        while available - start >= frame_header_size:
+            frame_len, header_len = unpack_frame_header(pending, start)
+            header_start = start + frame_header_size
+            frame_end = header_start + frame_len
+            if frame_end > available:
+                # Uncomplete frame, wait for the rest of it
+                break
+            values_start = header_start + header_len
+            frames.append((pending[header_start:values_start],
+                           pending[values_start:frame_end]))
+            start = frame_end
+
+        del pending[:start]
+        yield frames
+
+
+class BinarySerializer(Serializer):
+
+    def __init__(self, input_stream, output_stream, output_fields=None,
+                 **kwargs):
+        super(BinarySerializer, self).__init__(
+            input_stream, output_stream, **kwargs)
+
+        self._streams = _declared_streams(output_fields)
+        self._stream_indexes = dict(
+            (stream, i) for i, stream in enumerate(self._streams))
+        self._frames = _frames_generator(
+            self._input_stream, self._read_buffer_size)
+        self._packer = msgpack.Packer()
+
+    def _decode_bolt_tuple(self, header, values):
+        _, tup_id, comp, stream, task = header
+        return StormTuple(tup_id, comp, stream, task, LazyValues(values))
+
+    def _decode_frame(self, header, values):
+        """Decode a frame into the same commands, setup info and task ids
+        messages returned by the other serializers.
+
+        Bolt tuples are returned as :class:`~pyleus.storm.StormTuple` objects
+        whose values are only decoded on first access.
+        """
+        header = msgpack.unpackb(header)
+        code = header[0]
+
+        if code == BOLT_TUPLE:
+            return self._decode_bolt_tuple(header, values)
+        elif code == TASK_IDS:
+            return header[1]
+        elif code == SPOUT_COMMAND:
+            return {'command': COMMAND_NAMES[header[1]], 'id': header[2]}
+        elif code == SETUP:
+            return header[1]
+
+        raise ValueError("Unknown message code: {0}".format(code))
+
+    def _read_msgs(self):
+        return [self._decode_frame(header, values)
+                for header, values in next(self._frames)]
+
+    def _encode_stream(self, stream):
+        """Replace stream name with its index, if declared."""
+        if stream is None:
+            return None
+        return self._stream_indexes.get(stream, stream)
+
+    def _encode_msg(self, msg_dict):
+        """Return the encoded frame of a message dictionary."""
+        command = msg_dict.get('command')
+        values = b""
+
+        if command == 'emit':
+            header = [
+                EMIT,
+                self._encode_stream(msg_dict.get('stream')),
+                msg_dict.get('id'),
+                msg_dict.get('anchors'),
+                msg_dict.get('task'),
+                msg_dict.get('need_task_ids', True),
+            ]
+            values = msg_dict['tuple']
+            if isinstance(values, LazyValues):
+                # Forwarded tuple values, no need to encode them again
+                values = values.raw
+            else:
+                values = self._packer.pack(values)
+        elif command in ('ack', 'fail'):
+            header = [COMMAND_CODES[command], msg_dict['id']]
+        elif command == 'sync':
+            header = [SYNC]
+        elif command == 'log':
+            header = [LOG, msg_dict['msg'], msg_dict.get('level')]
+        elif command == 'error':
+            header = [ERROR, msg_dict['msg']]
+        elif command is None and 'pid' in msg_dict:
+            header = [PID, msg_dict['pid']]
+        else:
+            raise ValueError("Unknown command: {0}".format(command))
+
+        header = self._packer.pack(header)
+        return b"".join((
+            FRAME_HEADER.pack(len(header) + len(values), len(header)),
+            header,
+            values))
+
+    def send_msg(self, msg_dict):
+        """Encode a message dictionary into a frame and write it to the output
+        stream.
+        """
+        self._write(self._encode_msg(msg_dict))
+
+    def send_msgs(self, msg_dicts):
+        """Like :meth:`~.send_msg`, but write all the frames at once."""
+        self._write(
+            b"".join(self._encode_msg(msg_dict) for msg_dict in msg_dicts),
+            num_messages=len(msg_dicts))
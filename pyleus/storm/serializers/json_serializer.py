@@ -1,41 +1,185 @@
-"""JSON implementation of Pyleus serializer"""
+"""JSON implementation of Pyleus serializer.
 
-try:
-    import simplejson as json
-    _ = json # pyflakes
-except ImportError:
-    import json
+The actual JSON encoder/decoder is chosen from a registry of backends. Unless
+a backend is explicitly requested, ``simplejson`` is used if importable,
+falling back to the standard library ``json`` module. The faster backends
+(``orjson``, ``rapidjson``, ``ujson``) are never picked automatically, since
+they do not accept the same objects (e.g. orjson rejects non-string dict keys
+and integers wider than 64 bits) and would silently change the encoding.
+"""
+from collections import namedtuple
 
 from pyleus.storm import StormWentAwayError
 from pyleus.storm.serializers.serializer import Serializer
+from pyleus.storm.serializers.serializer import read_into
 
+# Storm multilang protocol message terminator
+MSG_END = b"\nend\n"
 
-class JSONSerializer(Serializer):
+JSONBackend = namedtuple('JSONBackend', "name dumps loads")
+"""Namedtuple representing a JSON backend.
 
-    def read_msg(self):
-        """The Storm multilang protocol consists of JSON messages followed by
-        a newline and "end\n".
-        """
-        lines = []
-        while True:
-            line = self._input_stream.readline()
-            if not line:
-                # Handle EOF, which usually means Storm went away
-                raise StormWentAwayError()
+* **name**\\(``str``): backend name
+* **dumps**\\(``callable``): encode an object into UTF-8 ``bytes``
+* **loads**\\(``callable``): decode an object from ``bytes`` or ``bytearray``
+"""
+
+
+def _orjson_backend():
+    import orjson
+    return JSONBackend("orjson", orjson.dumps, orjson.loads)
+
+
+def _rapidjson_backend():
+    import rapidjson
+    return JSONBackend(
+        "rapidjson",
+        lambda obj: rapidjson.dumps(obj).encode("utf-8"),
+        rapidjson.loads)
+
+
+def _ujson_backend():
+    import ujson
+    return JSONBackend(
+        "ujson",
+        lambda obj: ujson.dumps(obj).encode("utf-8"),
+        lambda data: ujson.loads(bytes(data)))
+
+
+def _simplejson_backend():
+    import simplejson
+    return JSONBackend(
+        "simplejson",
+        lambda obj: simplejson.dumps(obj).encode("utf-8"),
+        lambda data: simplejson.loads(data.decode("utf-8")))
+
+
+def _json_backend():
+    import json
+    return JSONBackend(
+        "json",
+        lambda obj: json.dumps(obj).encode("utf-8"),
+        lambda data: json.loads(data.decode("utf-8")))
+
+
+# Each factory returns a JSONBackend or raises ImportError if the backend is
+# not available
+JSON_BACKENDS = {
+    "orjson": _orjson_backend,
+    "rapidjson": _rapidjson_backend,
+    "ujson": _ujson_backend,
+    "simplejson": _simplejson_backend,
+    "json": _json_backend,
+}
+
+# Order in which backends are tried when none is explicitly requested. Only
+# backends encoding exactly like the standard library belong here
+JSON_BACKENDS_PREFERENCE = ["simplejson", "json"]
 
-            line = line.strip()
 
-            if line == "end":
-                break
+def register_json_backend(name, factory, preferred=False):
+    """Register a new JSON backend.
 
-            lines.append(line)
+    :param name: name of the backend
+    :type name: ``str``
+    :param factory:
+     callable returning a :class:`~.JSONBackend` or raising ``ImportError``
+     if the backend is not available
+    :type factory: ``callable``
+    :param preferred: try this backend first during automatic selection
+    :type preferred: ``bool``
+    """
+    JSON_BACKENDS[name] = factory
+    if name in JSON_BACKENDS_PREFERENCE:
+        JSON_BACKENDS_PREFERENCE.remove(name)
+    if preferred:
+        JSON_BACKENDS_PREFERENCE.insert(0, name)
+    else:
+        JSON_BACKENDS_PREFERENCE.append(name)
 
-        msg_str = '\n'.join(lines)
-        return json.loads(msg_str)
+
+def get_json_backend(name=None):
+    """Return the backend called name or, if name is ``None``, the first
+    available backend in order of preference.
+
+    :raise: ValueError if the backend is unknown
+    :raise: ImportError if the requested backend is not available
+    """
+    if name is not None:
+        if name not in JSON_BACKENDS:
+            raise ValueError("Unknown JSON backend: {0}".format(name))
+        return JSON_BACKENDS[name]()
+
+    for name in JSON_BACKENDS_PREFERENCE:
+        try:
+            return JSON_BACKENDS[name]()
+        except ImportError:
+            pass
+
+    raise ImportError("No JSON backend available")
+
+
+def _messages_generator(input_stream, read_buffer_size, loads):
+    """Yield the list of messages completed by every read."""
+    # As in the msgpack serializer, the same buffer is reused for every read
+    buf = bytearray(read_buffer_size)
+    view = memoryview(buf)
+    pending = bytearray()
+    search_from = 0
+    fileno = input_stream.fileno()
+    while True:
+        nbytes = read_into(fileno, buf)
+        if not nbytes:
+            # Handle EOF, which usually means Storm went away
+            raise StormWentAwayError()
+        pending += view[:nbytes]
+
+        # Scan the whole chunk for message terminators at once, instead of
+        # reading and comparing one line at a time
+        msgs = []
+        start = 0
+        end = pending.find(MSG_END, search_from)
+        while end != -1:
+            msgs.append(loads(pending[start:end]))
+            start = end + len(MSG_END)
+            end = pending.find(MSG_END, start)
+
+        # Keep only the beginning of the next, uncomplete message. It has
+        # already been scanned, so the next search only has to go back enough
+        # to catch a terminator split across reads
+        del pending[:start]
+        search_from = max(0, len(pending) - len(MSG_END) + 1)
+        yield msgs
+
+
+class JSONSerializer(Serializer):
+
+    def __init__(self, input_stream, output_stream, json_backend=None,
+                 **kwargs):
+        super(JSONSerializer, self).__init__(
+            input_stream, output_stream, **kwargs)
+
+        self._backend = get_json_backend(json_backend)
+        self._messages = _messages_generator(
+            self._input_stream, self._read_buffer_size, self._backend.loads)
+
+    def _read_msgs(self):
+        """The Storm multilang protocol consists of JSON messages followed by
+        a newline and "end\\n".
+        """
+        return next(self._messages)
 
     def send_msg(self, msg_dict):
         """Serialize to JSON a message dictionary and write it to the output
-        stream, followed by a newline and "end\n".
+        stream, followed by a newline and "end\\n".
         """
-        self._output_stream.write(json.dumps(msg_dict) + '\nend\n')
-        self._output_stream.flush()
+        self._write(b"".join((self._backend.dumps(msg_dict), MSG_END)))
+
+    def send_msgs(self, msg_dicts):
+        """Like :meth:`~.send_msg`, but write all the messages at once."""
+        dumps = self._backend.dumps
+        chunks = []
+        for msg_dict in msg_dicts:
+            chunks.append(dumps(msg_dict))
+            chunks.append(MSG_END)
+        self._write(b"".join(chunks), num_messages=len(msg_dicts))
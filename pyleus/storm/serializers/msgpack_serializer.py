@@ -1,22 +1,25 @@
 """Messagepack implementation of Pyleus serializer"""
 
-import os
-
 import msgpack
 
 from pyleus.storm import StormWentAwayError
 from pyleus.storm.serializers.serializer import Serializer
+from pyleus.storm.serializers.serializer import read_into
 
 
-def _messages_generator(input_stream):
+def _messages_generator(input_stream, read_buffer_size):
+    """Yield the list of messages completed by every read."""
     unpacker = msgpack.Unpacker()
+    # The same buffer is reused for every read, instead of allocating a new
+    # bytes object of read_buffer_size bytes each time
+    buf = bytearray(read_buffer_size)
+    view = memoryview(buf)
+    fileno = input_stream.fileno()
     while True:
         # f.read(n) on sys.stdin blocks until n bytes are read, causing
-        # serializer to hang.
-        # os.read(fileno, n) will block if there is nothing to read, but will
-        # return as soon as it is able to read at most n bytes.
-        line = os.read(input_stream.fileno(), 1024 ** 2)
-        if not line:
+        # serializer to hang. See read_into.
+        nbytes = read_into(fileno, buf)
+        if not nbytes:
             # Handle EOF, which usually means Storm went away
             raise StormWentAwayError()
         # As python-msgpack docs suggest, we feed data to the unpacker
@@ -24,19 +27,21 @@ def _messages_generator(input_stream):
         # boundaries recognition and uncomplete messages. In case input ends
         # with a partial message, unpacker raises a StopIteration and will be
         # able to continue after being feeded with the rest of the message.
-        unpacker.feed(line)
-        for i in unpacker:
-            yield i
+        # Feeding a memoryview slice avoids yet another intermediate copy.
+        unpacker.feed(view[:nbytes])
+        yield list(unpacker)
 
 
 class MsgpackSerializer(Serializer):
 
-    def __init__(self, input_stream, output_stream):
-        super(MsgpackSerializer, self).__init__(input_stream, output_stream)
+    def __init__(self, input_stream, output_stream, **kwargs):
+        super(MsgpackSerializer, self).__init__(
+            input_stream, output_stream, **kwargs)
 
-        self._messages = _messages_generator(self._input_stream)
+        self._messages = _messages_generator(
+            self._input_stream, self._read_buffer_size)
 
-    def read_msg(self):
+    def _read_msgs(self):
         """"Messages are delimited by msgapck itself, no need for Storm
         multilang end line.
         """
@@ -46,5 +51,10 @@ class MsgpackSerializer(Serializer):
         """"Messages are delimited by msgapck itself, no need for Storm
         multilang end line.
         """
-        msgpack.pack(msg_dict, self._output_stream)
-        self._output_stream.flush()
+        self._write(msgpack.packb(msg_dict))
+
+    def send_msgs(self, msg_dicts):
+        """Like :meth:`~.send_msg`, but write all the messages at once."""
+        self._write(
+            b''.join(msgpack.packb(msg_dict) for msg_dict in msg_dicts),
+            num_messages=len(msg_dicts))
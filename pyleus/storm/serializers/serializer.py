@@ -1,19 +1,139 @@
 """Base class for all serialziers used by Storm component. Please note that for
 each serializer a Java counterpart need to be built.
 """
+from collections import deque
+import os
+import select
+
+DEFAULT_READ_BUFFER_SIZE = 1024 ** 2
+
+
+if hasattr(os, 'readv'):
+    def read_into(fileno, buf):
+        """Read at most len(buf) bytes from fileno directly into buf and
+        return the number of bytes read.
+
+        Like os.read(fileno, n), it blocks if there is nothing to read, but
+        returns as soon as it is able to read at most len(buf) bytes. Unlike
+        os.read, it does not allocate a new bytes object at every call.
+        """
+        return os.readv(fileno, [buf])
+else:
+    # Python < 3.3
+    def read_into(fileno, buf):
+        data = os.read(fileno, len(buf))
+        buf[:len(data)] = data
+        return len(data)
 
 
 class Serializer(object):
 
-    def __init__(self, input_stream, output_stream):
+    def __init__(self, input_stream, output_stream,
+                 read_buffer_size=DEFAULT_READ_BUFFER_SIZE):
         self._input_stream = input_stream
         self._output_stream = output_stream
 
+        # Maximum number of bytes read from the input stream at once
+        self._read_buffer_size = read_buffer_size
+        # Messages already decoded from the input stream, but not read yet
+        self._input_msgs = deque()
+
+        # Output buffering is disabled when buffer size is 0
+        self._output_buffer_size = 0
+        self._output_buffer_max_messages = 0
+        self._output_buffer = []
+        self._output_buffer_len = 0
+        self._output_buffer_msgs = 0
+
+    def enable_output_buffering(self, buffer_size, max_messages=0):
+        """Accumulate encoded messages instead of writing and flushing them
+        one at a time. Buffered data is written when :meth:`~.flush` is called
+        or when the buffer holds more than ``buffer_size`` bytes or more than
+        ``max_messages`` messages (if ``max_messages`` is not 0).
+        """
+        self._output_buffer_size = buffer_size
+        self._output_buffer_max_messages = max_messages
+
+    def _read_msgs(self):
+        """Perform a single read on the input stream and return the list of
+        all the messages it completed, which may be empty.
+        raises: StormWentAwayError if EOF is reached."""
+        raise NotImplementedError
+
+    def read_input(self):
+        """Perform a single read on the input stream, blocking if there is
+        nothing to read, and buffer the messages it completed.
+        raises: StormWentAwayError if EOF is reached."""
+        self._input_msgs.extend(self._read_msgs())
+
     def read_msg(self):
         """Return the dictionary message received on the input stream.
         raises: StormWentAwayError if EOF is reached."""
-        raise NotImplementedError
+        while not self._input_msgs:
+            self.read_input()
+        return self._input_msgs.popleft()
+
+    def has_buffered_msgs(self):
+        """Tell whether :meth:`~.read_msg` can return a message without
+        reading from the input stream, and so without blocking.
+        """
+        return bool(self._input_msgs)
+
+    def input_available(self, timeout=0):
+        """Tell whether there is something to read, either already decoded or
+        on the input stream, waiting up to ``timeout`` seconds for the latter.
+
+        Data on the input stream may belong to a message not fully written
+        yet, in which case :meth:`~.read_msg` would still briefly block.
+        """
+        if self._input_msgs:
+            return True
+        readable, _, _ = select.select(
+            [self._input_stream.fileno()], [], [], timeout)
+        return bool(readable)
 
     def send_msg(self, msg_dict):
         """Serialize a message dictionary and write it to the output stream."""
         raise NotImplementedError
+
+    def send_msgs(self, msg_dicts):
+        """Serialize a list of message dictionaries and write them to the
+        output stream. Subclasses should override this in order to perform a
+        single write for all the messages.
+        """
+        for msg_dict in msg_dicts:
+            self.send_msg(msg_dict)
+
+    def _write(self, data, num_messages=1):
+        """Write encoded messages to the output stream, or add them to the
+        output buffer if output buffering is enabled.
+        """
+        if not self._output_buffer_size:
+            self._output_stream.write(data)
+            self._output_stream.flush()
+            return
+
+        self._output_buffer.append(data)
+        self._output_buffer_len += len(data)
+        self._output_buffer_msgs += num_messages
+
+        if (self._output_buffer_len >= self._output_buffer_size or
+                (self._output_buffer_max_messages and
+                 self._output_buffer_msgs >= self._output_buffer_max_messages)):
+            self.flush()
+
+    def flush(self):
+        """Write all the buffered data to the output stream and flush it. Does
+        nothing if the buffer is empty.
+        """
+        if not self._output_buffer:
+            return
+
+        chunks = self._output_buffer
+        self._output_buffer = []
+        self._output_buffer_len = 0
+        self._output_buffer_msgs = 0
+
+        # Join as str or bytes, depending on what the serializer produces
+        self._output_stream.write(chunks[0][:0].join(chunks))
+        self._output_stream.flush()
@@ -0,0 +1,306 @@
+"""Module containing the implementation of SlidingWindowBolt, a Bolt component
+summing values per key over a sliding time window, advanced by tick tuples.
+"""
+from __future__ import absolute_import
+
+from array import array
+
+from pyleus.storm.bolt import SimpleBolt
+
+
+class _RingCounter(object):
+    """Per-key ring buffer of slot values, with their running total."""
+
+    __slots__ = ('slots', 'total')
+
+    def __init__(self, slots):
+        self.slots = slots
+        self.total = 0
+
+
+class ArrayWindow(object):
+    """Sliding window of per-key sums, stored as one ``array`` ring buffer per
+    key.
+
+    Every slot remembers the keys which added a value to it, so that
+    advancing the window only clears the slot of those keys. The keys whose
+    total is greater than threshold are kept up to date as well, so that a
+    tick costs time proportional to the keys which changed, not to all the
+    keys in the window.
+
+    :param num_slots: number of slots in the window
+    :type num_slots: ``int``
+    :param typecode: ``array`` typecode of slot values
+    :type typecode: ``str``
+    :param threshold: default threshold of :meth:`~.totals`
+    :type threshold: ``int`` or ``float``
+    """
+
+    def __init__(self, num_slots, typecode='l', threshold=0):
+        self._num_slots = num_slots
+        self._empty = array(typecode, [0]) * num_slots
+        self._threshold = threshold
+        self._counters = {}
+        # Keys with a value in every slot
+        self._slot_keys = [set() for _ in range(num_slots)]
+        # Keys whose total is greater than threshold
+        self._above = set()
+        self._current = 0
+
+    def __len__(self):
+        return len(self._counters)
+
+    def _update_above(self, key, total):
+        if total > self._threshold:
+            self._above.add(key)
+        else:
+            self._above.discard(key)
+
+    def add(self, key, value=1):
+        """Add value to the current slot of key."""
+        counter = self._counters.get(key)
+        if counter is None:
+            counter = self._counters[key] = _RingCounter(
+                array(self._empty.typecode, self._empty))
+        counter.slots[self._current] += value
+        counter.total += value
+        self._slot_keys[self._current].add(key)
+        self._update_above(key, counter.total)
+
+    def total(self, key):
+        """Return the sum of the values of key in the window."""
+        counter = self._counters.get(key)
+        if counter is None:
+            return 0
+        return counter.total
+
+    def totals(self, above=None):
+        """Return the list of ``(key, total)`` pairs of the keys whose total
+        is greater than above, by default the threshold of the window, in no
+        particular order.
+
+        .. note::
+           Only the default threshold is kept up to date. Any other one scans
+           all the keys.
+        """
+        counters = self._counters
+        if above is None or above == self._threshold:
+            return [(key, counters[key].total) for key in self._above]
+        return [
+            (key, counter.total) for key, counter in counters.items()
+            if counter.total > above]
+
+    def advance(self):
+        """Move the window forward by one slot, clearing it. Keys whose total
+        is back to 0 are forgotten.
+        """
+        self._current = (self._current + 1) % self._num_slots
+        expired = self._slot_keys[self._current]
+        self._slot_keys[self._current] = set()
+        for key in expired:
+            counter = self._counters.get(key)
+            if counter is None:
+                continue
+            counter.total -= counter.slots[self._current]
+            counter.slots[self._current] = 0
+            if counter.total == 0:
+                del self._counters[key]
+                self._above.discard(key)
+            else:
+                self._update_above(key, counter.total)
+
+
+class NumpyWindow(object):
+    """Sliding window of per-key sums, stored as a NumPy matrix with a row per
+    key and a column per slot, for windows tracking many keys.
+
+    Advancing the window and selecting the keys above a threshold are
+    vectorized, so that they do not run a Python loop over all the keys.
+
+    :param num_slots: number of slots in the window
+    :type num_slots: ``int``
+    :param typecode: NumPy dtype of slot values
+    :type typecode: ``str``
+    :param threshold: default threshold of :meth:`~.totals`
+    :type threshold: ``int`` or ``float``
+    :param capacity: number of rows initially allocated
+    :type capacity: ``int``
+
+    :raise: ImportError if NumPy is not available
+    """
+
+    def __init__(self, num_slots, typecode='l', threshold=0, capacity=1024):
+        import numpy
+        self._np = numpy
+        self._num_slots = num_slots
+        self._threshold = threshold
+        self._slots = numpy.zeros((capacity, num_slots), dtype=typecode)
+        self._totals = numpy.zeros(capacity, dtype=typecode)
+        # Row of every key, and key of every used row
+        self._rows = {}
+        self._keys = [None] * capacity
+        self._free_rows = list(range(capacity - 1, -1, -1))
+        self._current = 0
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _grow(self):
+        """Double the number of rows."""
+        np = self._np
+        capacity = len(self._keys)
+        self._slots = np.concatenate(
+            (self._slots, np.zeros_like(self._slots)))
+        self._totals = np.concatenate(
+            (self._totals, np.zeros_like(self._totals)))
+        self._keys.extend([None] * capacity)
+        self._free_rows.extend(range(2 * capacity - 1, capacity - 1, -1))
+
+    def add(self, key, value=1):
+        """Add value to the current slot of key."""
+        row = self._rows.get(key)
+        if row is None:
+            if not self._free_rows:
+                self._grow()
+            row = self._rows[key] = self._free_rows.pop()
+            self._keys[row] = key
+        self._slots[row, self._current] += value
+        self._totals[row] += value
+
+    def total(self, key):
+        """Return the sum of the values of key in the window."""
+        row = self._rows.get(key)
+        if row is None:
+            return 0
+        return self._totals[row].item()
+
+    def totals(self, above=None):
+        """Return the list of ``(key, total)`` pairs of the keys whose total
+        is greater than above, by default the threshold of the window. Keys
+        whose total is back to 0 are forgotten.
+        """
+        np = self._np
+        keys = self._keys
+        if above is None:
+            above = self._threshold
+
+        for row in np.flatnonzero(self._totals == 0).tolist():
+            key = keys[row]
+            if key is not None:
+                del self._rows[key]
+                keys[row] = None
+                self._free_rows.append(row)
+
+        rows = np.flatnonzero(self._totals > above)
+        return list(zip(
+            [keys[row] for row in rows.tolist()],
+            self._totals[rows].tolist()))
+
+    def advance(self):
+        """Move the window forward by one slot."""
+        self._current = (self._current + 1) % self._num_slots
+        column = self._slots[:, self._current]
+        self._totals -= column
+        column[:] = 0
+
+
+class SlidingWindowBolt(SimpleBolt):
+    """A Bolt summing values per key over a sliding time window of
+    ``TIME_WINDOW`` seconds, split into slots of ``tick_freq_secs`` seconds.
+
+    Call :meth:`~.add` from process_tuple() to add a value to a key. At every
+    tick, :meth:`~.process_window_total` is called for each key whose total
+    over the window is greater than ``THRESHOLD``, then the window moves
+    forward by one slot.
+
+    Sums are kept in per-key ``array`` ring buffers, and ticks only visit the
+    keys which changed. With ``USE_NUMPY``, they are kept in a single NumPy
+    matrix instead, whose updates are vectorized. ``TIME_WINDOW``,
+    ``THRESHOLD`` and ``USE_NUMPY`` can be overridden by the ``time_window``,
+    ``threshold`` and ``use_numpy`` component options, provided they are
+    listed in ``OPTIONS``.
+
+    .. note::
+       ``tick_freq_secs`` must be set for the component in the topology
+       definition, and ``TIME_WINDOW`` must be a multiple of it.
+
+    :Example:
+     .. code-block:: python
+
+        class TrafficBolt(SlidingWindowBolt):
+
+            OUTPUT_FIELDS = ["ip_address", "traffic"]
+
+            def process_tuple(self, tup):
+                ip_address, size = tup.values
+                self.add(ip_address, size)
+    """
+
+    #: ``int`` or ``float`` window size in seconds.
+    TIME_WINDOW = 60
+
+    #: ``int`` or ``float`` total a key needs to exceed to be processed at
+    #: every tick.
+    THRESHOLD = 0
+
+    #: ``bool`` whether to store the window in a NumPy matrix. Requires NumPy.
+    USE_NUMPY = False
+
+    #: ``str`` ``array`` typecode, or NumPy dtype, of window values.
+    TYPECODE = 'l'
+
+    #: :class:`~.ArrayWindow` or :class:`~.NumpyWindow` holding the sums.
+    window = None
+
+    def setup_component(self):
+        """Create the window after Storm configuration is loaded."""
+        super(SlidingWindowBolt, self).setup_component()
+
+        options = self.options or {}
+        time_window = options.get("time_window", self.TIME_WINDOW)
+        self._threshold = options.get("threshold", self.THRESHOLD)
+        use_numpy = options.get("use_numpy", self.USE_NUMPY)
+
+        tick_freq = self.conf.tick_tuple_freq
+        if not tick_freq:
+            raise ValueError("SlidingWindowBolt requires tick_freq_secs")
+        num_slots = time_window / tick_freq
+        if num_slots != int(num_slots) or num_slots < 1:
+            raise ValueError("Time window must be a multiple of"
+                             " tick_freq_secs")
+
+        window_cls = NumpyWindow if use_numpy else ArrayWindow
+        self.window = window_cls(
+            int(num_slots), self.TYPECODE, threshold=self._threshold)
+
+    def add(self, key, value=1):
+        """Add value to the current slot of key.
+
+        :param key: key of the sum, must be hashable
+        :param value: value to be added, default ``1``
+        """
+        self.window.add(key, value)
+
+    def total(self, key):
+        """Return the sum of the values of key over the window."""
+        return self.window.total(key)
+
+    def process_window_total(self, key, total):
+        """Called at every tick for each key whose total over the window is
+        greater than ``THRESHOLD``. Default behaviour is to emit
+        ``(key, total)``.
+
+        .. note:: Implement in subclass if needed.
+        """
+        self.emit((key, total))
+
+    def process_tick(self):
+        """Process the totals over the window, then advance it.
+
+        .. note::
+           If overridden, call ``super().process_tick()``, or the window never
+           moves.
+        """
+        for key, total in self.window.totals():
+            self.process_window_total(key, total)
+        self.window.advance()
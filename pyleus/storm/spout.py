@@ -1,7 +1,12 @@
 """Module containing the implementation of the Spout component."""
 from __future__ import absolute_import
 
+import heapq
+import itertools
 import logging
+import time
+
+import six
 
 from pyleus.storm import StormWentAwayError
 from pyleus.storm.component import Component
@@ -9,6 +14,18 @@ from pyleus.storm.component import Component
 log = logging.getLogger(__name__)
 
 
+def _id_key(tup_id):
+    """Return the key of pending tuples tracked by tup_id.
+
+    Depending on the serializer, Storm sends the ids of acked and failed
+    tuples back either as emitted or converted to strings, like the msgpack
+    and binary ones do: both are tracked by their string form.
+    """
+    if isinstance(tup_id, six.string_types):
+        return tup_id
+    return str(tup_id)
+
+
 class Spout(Component):
     """Spout component class. Inherit from
     :class:`~pyleus.storm.component.Component`.
@@ -71,7 +88,7 @@ class Spout(Component):
     def emit(
             self, values,
             stream=None, tup_id=None,
-            direct_task=None, need_task_ids=True):
+            direct_task=None, need_task_ids=None):
         """Build and send an output tuple command dict and return the ids of
         the tasks to which the tuple was sent by Storm.
 
@@ -90,8 +107,14 @@ class Spout(Component):
         :type direct_task: ``int``
         :param need_task_ids:
          whether emit should return the ids of the task the message has been
-         sent to, default ``True``
+         sent to, default ``None``, meaning the topology level
+         ``need_task_ids`` setting, itself ``True`` if not specified
         :type need_task_ids: ``bool``
+        :return:
+         the list of the ids of the tasks the message has been sent to, if
+         ``need_task_ids`` is ``True``. With topology level ``lazy_task_ids``
+         enabled, a :class:`~pyleus.storm.component.TaskIdsFuture` behaving
+         like that list, but not waiting for Storm until accessed
 
         .. note:: ``tup_id`` should be JSON-serializable.
 
@@ -110,6 +133,55 @@ class Spout(Component):
            ``direct_task`` is not yet supported.
 
         """
+        need_task_ids = self._default_need_task_ids(need_task_ids)
+        command_dict = self._build_emit_command_dict(
+            values, stream, tup_id, direct_task, need_task_ids)
+
+        self.send_command('emit', command_dict)
+
+        if need_task_ids:
+            return self._emit_task_ids()
+
+    def emit_many(
+            self, values_list,
+            stream=None, tup_ids=None,
+            direct_task=None, need_task_ids=None):
+        """Like :meth:`~.emit`, but emit a whole list of output tuples sharing
+        the same stream and options. All the messages are written to the
+        output stream at once and, if requested, task ids are read only after
+        that, so that there is no round trip with Storm for every tuple.
+
+        :param values_list: list of pyleus tuple values to be emitted
+        :type values_list: ``list`` of ``tuple`` or ``list``
+        :param tup_ids:
+         list of tuple identifiers, one for each element of ``values_list``.
+         Default ``None``
+        :type tup_ids: ``list``
+        :return:
+         list containing the ids of the tasks each tuple has been sent to,
+         if ``need_task_ids`` is ``True``
+        :rtype: ``list`` of ``list``
+
+        .. seealso:: :meth:`~.emit` for the other parameters.
+        """
+        if tup_ids is None:
+            tup_ids = [None] * len(values_list)
+        assert len(tup_ids) == len(values_list)
+
+        need_task_ids = self._default_need_task_ids(need_task_ids)
+        command_dicts = [
+            self._build_emit_command_dict(
+                values, stream, tup_id, direct_task, need_task_ids)
+            for values, tup_id in zip(values_list, tup_ids)]
+
+        self.send_commands('emit', command_dicts)
+
+        if need_task_ids:
+            return [self._emit_task_ids() for _ in command_dicts]
+
+    def _build_emit_command_dict(
+            self, values, stream, tup_id, direct_task, need_task_ids):
+        """Build the options dict of an emit command."""
         assert isinstance(values, list) or isinstance(values, tuple)
 
         command_dict = {
@@ -134,7 +206,355 @@ class Spout(Component):
         if not need_task_ids:
             command_dict['need_task_ids'] = False
 
-        self.send_command('emit', command_dict)
+        return command_dict
 
-        if need_task_ids:
-            return self.read_taskid()
+
+class BatchingSpout(Spout):
+    """A Spout calling next_tuple() several times for every next command
+    received from Storm, so that many tuples are emitted for each round trip.
+
+    The number of calls, :attr:`~.batch_size`, adapts to the topology
+    behavior: it grows by one after every batch which was not cut short, and
+    halves whenever a tuple fails or the average ack latency exceeds
+    ``TARGET_ACK_LATENCY_MS``. A batch is cut short as soon as next_tuple()
+    does not emit anything, and never brings the number of pending tuples
+    over ``MAX_PENDING_RATIO`` of ``topology.max.spout.pending``.
+
+    Only tuples emitted with a ``tup_id`` are tracked as pending.
+    ``MAX_BATCH_SIZE`` and ``TARGET_ACK_LATENCY_MS`` can be overridden by the
+    ``max_batch_size`` and ``target_ack_latency_ms`` component options,
+    provided they are listed in ``OPTIONS``.
+
+    .. tip::
+       Enable ``output_buffering`` in the topology definition, so that all
+       the tuples of a batch are written at once.
+    """
+
+    #: ``int`` minimum number of next_tuple() calls per next command.
+    MIN_BATCH_SIZE = 1
+
+    #: ``int`` maximum number of next_tuple() calls per next command.
+    MAX_BATCH_SIZE = 100
+
+    #: ``int`` or ``float`` ack latency in milliseconds above which batches
+    #: shrink. Latency is not taken into account if ``None``.
+    TARGET_ACK_LATENCY_MS = 1000
+
+    #: ``float`` fraction of ``topology.max.spout.pending`` the number of
+    #: pending tuples should not exceed.
+    MAX_PENDING_RATIO = 0.9
+
+    #: ``float`` weight of the last ack in the ack latency moving average.
+    ACK_LATENCY_WEIGHT = 0.2
+
+    def __init__(self, *args, **kwargs):
+        super(BatchingSpout, self).__init__(*args, **kwargs)
+
+        #: ``int`` current number of next_tuple() calls per next command.
+        self.batch_size = self.MIN_BATCH_SIZE
+        #: ``float`` moving average of the ack latency in seconds, ``None``
+        #: until the first ack.
+        self.ack_latency = None
+
+        self._max_batch_size = self.MAX_BATCH_SIZE
+        self._target_ack_latency = None
+        self._max_pending = None
+        # Emit timestamp of pending tuples, by tup_id
+        self._in_flight = {}
+        self._emitted = 0
+        self._failed = False
+        self._last_batch_full = False
+
+    @property
+    def pending_count(self):
+        """``int`` number of tuples emitted with a ``tup_id`` which have not
+        been acked or failed yet.
+        """
+        return len(self._in_flight)
+
+    def setup_component(self):
+        """Configure batching after Storm configuration is loaded."""
+        super(BatchingSpout, self).setup_component()
+
+        options = self.options or {}
+        self._max_batch_size = options.get(
+            "max_batch_size", self.MAX_BATCH_SIZE)
+        target_ack_latency = options.get(
+            "target_ack_latency_ms", self.TARGET_ACK_LATENCY_MS)
+        if target_ack_latency is not None:
+            self._target_ack_latency = target_ack_latency / 1000.0
+        max_spout_pending = self.conf.get("topology.max.spout.pending")
+        if max_spout_pending:
+            self._max_pending = max(
+                1, int(max_spout_pending * self.MAX_PENDING_RATIO))
+
+    def emit(
+            self, values,
+            stream=None, tup_id=None,
+            direct_task=None, need_task_ids=None):
+        """Track the tuple as pending if ``tup_id`` is given.
+
+        .. seealso:: :meth:`.Spout.emit`
+        """
+        self._emitted += 1
+        if tup_id is not None:
+            self._in_flight[_id_key(tup_id)] = time.time()
+        return super(BatchingSpout, self).emit(
+            values, stream, tup_id, direct_task, need_task_ids)
+
+    def emit_many(
+            self, values_list,
+            stream=None, tup_ids=None,
+            direct_task=None, need_task_ids=None):
+        """Track the tuples given a ``tup_id`` as pending.
+
+        .. seealso:: :meth:`.Spout.emit_many`
+        """
+        self._emitted += len(values_list)
+        if tup_ids is not None:
+            now = time.time()
+            for tup_id in tup_ids:
+                if tup_id is not None:
+                    self._in_flight[_id_key(tup_id)] = now
+        return super(BatchingSpout, self).emit_many(
+            values_list, stream, tup_ids, direct_task, need_task_ids)
+
+    def _tuple_acked(self, tup_id):
+        emitted_at = self._in_flight.pop(_id_key(tup_id), None)
+        if emitted_at is None:
+            return
+        latency = time.time() - emitted_at
+        if self.ack_latency is None:
+            self.ack_latency = latency
+        else:
+            self.ack_latency += self.ACK_LATENCY_WEIGHT * (
+                latency - self.ack_latency)
+
+    def _tuple_failed(self, tup_id):
+        self._in_flight.pop(_id_key(tup_id), None)
+        self._failed = True
+
+    def _adjust_batch_size(self):
+        """Additive increase, multiplicative decrease of the batch size."""
+        if self._failed or (
+                self._target_ack_latency is not None and
+                self.ack_latency is not None and
+                self.ack_latency > self._target_ack_latency):
+            self.batch_size = max(self.MIN_BATCH_SIZE, self.batch_size // 2)
+            self._failed = False
+        elif self._last_batch_full:
+            self.batch_size = min(self._max_batch_size, self.batch_size + 1)
+
+    def _next_batch(self):
+        """Call next_tuple() up to batch_size times."""
+        self._adjust_batch_size()
+
+        limit = self.batch_size
+        if self._max_pending is not None:
+            limit = min(limit, self._max_pending - len(self._in_flight))
+
+        calls = 0
+        drained = False
+        while calls < limit:
+            emitted = self._emitted
+            self.next_tuple()
+            calls += 1
+            if self._emitted == emitted:
+                # Nothing to emit for now
+                drained = True
+                break
+
+        self._last_batch_full = not drained and calls == self.batch_size
+
+    def _handle_command(self, msg):
+        """Switch on the type of command, keeping track of pending tuples."""
+        command = msg['command']
+
+        if command == 'next':
+            self._next_batch()
+        elif command == 'ack':
+            self._tuple_acked(msg['id'])
+            self.ack(msg['id'])
+        elif command == 'fail':
+            self._tuple_failed(msg['id'])
+            self.fail(msg['id'])
+
+
+class _PendingTuple(object):
+    """Values and emit options of a tuple waiting to be acked."""
+
+    __slots__ = ('tup_id', 'values', 'stream', 'retries')
+
+    def __init__(self, tup_id, values, stream):
+        self.tup_id = tup_id
+        self.values = values
+        self.stream = stream
+        self.retries = 0
+
+
+class ReliableSpout(Spout):
+    """A Spout keeping track of the tuples it emits with a ``tup_id`` until
+    they are acked, and replaying them automatically when they fail.
+
+    Failed tuples are emitted again, with the same values, stream and
+    ``tup_id``, after a delay starting at ``REPLAY_BACKOFF_MS`` and doubling
+    at every retry up to ``REPLAY_MAX_BACKOFF_MS``. Tuples due for replay
+    take precedence over new ones: every next command Storm sends replays one
+    of them, if any, instead of calling next_tuple().
+
+    ack() is called once a tuple is acked, while fail() is called only once
+    a tuple failed ``MAX_RETRIES`` times and is given up. ``MAX_RETRIES``,
+    ``REPLAY_BACKOFF_MS`` and ``REPLAY_MAX_BACKOFF_MS`` can be overridden by
+    the ``max_retries``, ``replay_backoff_ms`` and ``replay_max_backoff_ms``
+    component options, provided they are listed in ``OPTIONS``.
+
+    .. note::
+       ``tup_id`` must be hashable, and only one tuple with the same
+       ``tup_id`` should be pending at any time.
+    """
+
+    #: ``int`` number of times a failed tuple is replayed before being given
+    #: up. Tuples are replayed forever if ``None``.
+    MAX_RETRIES = 3
+
+    #: ``int`` or ``float`` milliseconds a tuple waits before its first
+    #: replay.
+    REPLAY_BACKOFF_MS = 100
+
+    #: ``int`` or ``float`` maximum milliseconds a tuple waits before being
+    #: replayed.
+    REPLAY_MAX_BACKOFF_MS = 60000
+
+    # Bound the exponent of the backoff, so that tuples replayed forever do
+    # not overflow it
+    _MAX_BACKOFF_EXPONENT = 32
+
+    def __init__(self, *args, **kwargs):
+        super(ReliableSpout, self).__init__(*args, **kwargs)
+
+        #: ``int`` number of tuples given up after ``MAX_RETRIES`` replays.
+        self.dropped_count = 0
+
+        self._max_retries = self.MAX_RETRIES
+        self._replay_backoff = self.REPLAY_BACKOFF_MS / 1000.0
+        self._replay_max_backoff = self.REPLAY_MAX_BACKOFF_MS / 1000.0
+        # _PendingTuple objects, by string form of their tup_id, including
+        # the ones waiting for replay
+        self._pending = {}
+        # Heap of (replay time, sequence number, _pending key). The sequence
+        # number keeps ordering stable and avoids comparing keys.
+        self._replay_queue = []
+        self._replay_seq = itertools.count()
+
+    @property
+    def pending_count(self):
+        """``int`` number of tuples emitted and neither acked nor failed
+        yet.
+        """
+        return len(self._pending) - len(self._replay_queue)
+
+    @property
+    def replay_count(self):
+        """``int`` number of failed tuples waiting to be replayed."""
+        return len(self._replay_queue)
+
+    def setup_component(self):
+        """Configure replays after Storm configuration is loaded."""
+        super(ReliableSpout, self).setup_component()
+
+        options = self.options or {}
+        self._max_retries = options.get("max_retries", self.MAX_RETRIES)
+        self._replay_backoff = options.get(
+            "replay_backoff_ms", self.REPLAY_BACKOFF_MS) / 1000.0
+        self._replay_max_backoff = options.get(
+            "replay_max_backoff_ms", self.REPLAY_MAX_BACKOFF_MS) / 1000.0
+
+    def emit(
+            self, values,
+            stream=None, tup_id=None,
+            direct_task=None, need_task_ids=None):
+        """Keep track of the tuple until it is acked, if ``tup_id`` is
+        given.
+
+        .. seealso:: :meth:`.Spout.emit`
+        """
+        if tup_id is not None:
+            self._pending[_id_key(tup_id)] = _PendingTuple(
+                tup_id, values, stream)
+        return super(ReliableSpout, self).emit(
+            values, stream, tup_id, direct_task, need_task_ids)
+
+    def emit_many(
+            self, values_list,
+            stream=None, tup_ids=None,
+            direct_task=None, need_task_ids=None):
+        """Keep track of the tuples given a ``tup_id`` until they are acked.
+
+        .. seealso:: :meth:`.Spout.emit_many`
+        """
+        if tup_ids is not None:
+            for values, tup_id in zip(values_list, tup_ids):
+                if tup_id is not None:
+                    self._pending[_id_key(tup_id)] = _PendingTuple(
+                        tup_id, values, stream)
+        return super(ReliableSpout, self).emit_many(
+            values_list, stream, tup_ids, direct_task, need_task_ids)
+
+    def _tuple_failed(self, tup_id):
+        """Schedule the replay of a failed tuple. Return ``False`` if it has
+        been given up instead.
+        """
+        key = _id_key(tup_id)
+        entry = self._pending.get(key)
+        if entry is None:
+            return False
+
+        if self._max_retries is not None and (
+                entry.retries >= self._max_retries):
+            del self._pending[key]
+            self.dropped_count += 1
+            return False
+
+        delay = min(
+            self._replay_max_backoff,
+            self._replay_backoff * 2 ** min(
+                entry.retries, self._MAX_BACKOFF_EXPONENT))
+        entry.retries += 1
+        heapq.heappush(
+            self._replay_queue,
+            (time.time() + delay, next(self._replay_seq), key))
+        return True
+
+    def _replay_next(self):
+        """Emit again the first tuple due for replay, if any. Return whether
+        a tuple has been replayed.
+        """
+        queue = self._replay_queue
+        now = time.time()
+        while queue and queue[0][0] <= now:
+            _, _, key = heapq.heappop(queue)
+            entry = self._pending.get(key)
+            if entry is None:
+                # The tup_id has been reused and acked in the meantime
+                continue
+            # Bypass emit(), the tuple is already tracked
+            super(ReliableSpout, self).emit(
+                entry.values, entry.stream, entry.tup_id, need_task_ids=False)
+            return True
+        return False
+
+    def _handle_command(self, msg):
+        """Switch on the type of command, replaying failed tuples before
+        asking for new ones.
+        """
+        command = msg['command']
+
+        if command == 'next':
+            if not self._replay_next():
+                self.next_tuple()
+        elif command == 'ack':
+            self._pending.pop(_id_key(msg['id']), None)
+            self.ack(msg['id'])
+        elif command == 'fail':
+            if not self._tuple_failed(msg['id']):
+                self.fail(msg['id'])
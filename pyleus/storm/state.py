@@ -0,0 +1,353 @@
+"""Module containing the persistent key-value stores backing the ``state``
+of pyleus components.
+
+Keys and values must be serializable by msgpack. Updates are kept in memory
+and written to disk only by :meth:`~.State.checkpoint`, which components call
+on every tick tuple, so that per-tuple updates never touch the disk. After a
+restart, the state is the one of the last checkpoint.
+"""
+from __future__ import absolute_import
+
+import logging
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+import msgpack
+from six.moves.collections_abc import MutableMapping
+
+log = logging.getLogger(__name__)
+
+LOG_STATE_BACKEND = "log"
+SQLITE_STATE_BACKEND = "sqlite"
+DEFAULT_STATE_BACKEND = LOG_STATE_BACKEND
+
+
+class State(MutableMapping):
+    """Base class of persistent key-value stores, behaving like a ``dict``.
+
+    Values are encoded when assigned and read from the store as copies:
+    mutating them does not change the store unless they are assigned back.
+    Access is thread-safe.
+
+    .. note::
+       Keys are stored msgpack encoded, so tuples are iterated as lists. Use
+       strings, numbers or bytes as keys.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # Encoded values updated since the last checkpoint, by encoded key.
+        # Deleted keys map to None, as in _write()
+        self._dirty = {}
+
+    def _read(self, packed_key):
+        """Return the encoded value of packed_key on disk, or ``None``.
+
+        .. note:: Implement in subclass.
+        """
+        raise NotImplementedError
+
+    def _persisted_keys(self):
+        """Return the encoded keys on disk.
+
+        .. note:: Implement in subclass.
+        """
+        raise NotImplementedError
+
+    def _write(self, records):
+        """Write ``(packed_key, packed_value)`` records on disk at once. A
+        ``None`` value deletes the key.
+
+        .. note:: Implement in subclass.
+        """
+        raise NotImplementedError
+
+    def _close(self):
+        pass
+
+    def _has(self, packed_key):
+        return self._read(packed_key) is not None
+
+    def __getitem__(self, key):
+        packed_key = msgpack.packb(key)
+        with self._lock:
+            data = self._dirty.get(packed_key, self)
+            if data is self:
+                data = self._read(packed_key)
+        if data is None:
+            raise KeyError(key)
+        # Updated values are kept encoded too, so that every read returns a
+        # copy whether the key was checkpointed or not
+        return msgpack.unpackb(data)
+
+    def __setitem__(self, key, value):
+        packed_key = msgpack.packb(key)
+        packed_value = msgpack.packb(value)
+        with self._lock:
+            self._dirty[packed_key] = packed_value
+
+    def __delitem__(self, key):
+        with self._lock:
+            if key not in self:
+                raise KeyError(key)
+            self._dirty[msgpack.packb(key)] = None
+
+    def __contains__(self, key):
+        packed_key = msgpack.packb(key)
+        with self._lock:
+            data = self._dirty.get(packed_key, self)
+            if data is self:
+                return self._has(packed_key)
+            return data is not None
+
+    def _packed_keys(self):
+        with self._lock:
+            keys = set(self._persisted_keys())
+            for packed_key, packed_value in self._dirty.items():
+                if packed_value is None:
+                    keys.discard(packed_key)
+                else:
+                    keys.add(packed_key)
+        return keys
+
+    def __iter__(self):
+        return (msgpack.unpackb(packed_key)
+                for packed_key in self._packed_keys())
+
+    def __len__(self):
+        return len(self._packed_keys())
+
+    def checkpoint(self):
+        """Write to disk all the updates since the last checkpoint."""
+        with self._lock:
+            if not self._dirty:
+                return
+            self._write(list(self._dirty.items()))
+            self._dirty = {}
+
+    def close(self):
+        """Checkpoint and release the underlying resources."""
+        with self._lock:
+            self.checkpoint()
+            self._close()
+
+
+class LogState(State):
+    """State stored in an append-only log file, read through a memory map,
+    with an in-memory index of the position of every value.
+
+    Every checkpoint appends the updated records with a single write, then
+    syncs the file. On start, the log is scanned to rebuild the index, and a
+    partially written last record is discarded. The log is compacted when it
+    grows over ``COMPACTION_RATIO`` times the size of the live records.
+
+    :param path: path of the log file
+    :type path: ``str``
+    """
+
+    # Key length, value length (-1 for deletions), CRC32 of key and value
+    HEADER = struct.Struct("<IiI")
+
+    #: ``int`` or ``float`` ratio of the log size to the live records size
+    #: triggering compaction.
+    COMPACTION_RATIO = 2
+
+    #: ``int`` minimum log size in bytes before compaction is considered.
+    COMPACTION_MIN_SIZE = 1024 ** 2
+
+    def __init__(self, path):
+        super(LogState, self).__init__()
+        self._path = path
+        # Offset and length of every value in the log, by encoded key
+        self._index = {}
+        self._live_size = 0
+        self._open()
+        self._recover()
+
+    def _open(self):
+        self._file = open(self._path, "ab")
+        self._size = os.fstat(self._file.fileno()).st_size
+        self._remap()
+
+    def _remap(self):
+        self._mmap = None
+        if self._size:
+            with open(self._path, "rb") as f:
+                self._mmap = mmap.mmap(
+                    f.fileno(), self._size, access=mmap.ACCESS_READ)
+
+    def _record_size(self, key_len, value_len):
+        return self.HEADER.size + key_len + max(value_len, 0)
+
+    def _index_record(self, packed_key, value_offset, value_len):
+        old = self._index.pop(packed_key, None)
+        if old is not None:
+            self._live_size -= self._record_size(len(packed_key), old[1])
+        if value_len >= 0:
+            self._index[packed_key] = (value_offset, value_len)
+            self._live_size += self._record_size(len(packed_key), value_len)
+
+    def _recover(self):
+        """Rebuild the index from the log, truncating any torn record."""
+        data = self._mmap
+        offset = 0
+        header = self.HEADER
+        while offset + header.size <= self._size:
+            key_len, value_len, crc = header.unpack_from(data, offset)
+            key_offset = offset + header.size
+            end = key_offset + key_len + max(value_len, 0)
+            if end > self._size or zlib.crc32(
+                    data[key_offset:end]) & 0xffffffff != crc:
+                break
+            self._index_record(
+                data[key_offset:key_offset + key_len],
+                key_offset + key_len, value_len)
+            offset = end
+
+        if offset < self._size:
+            log.warning("Discarding {0} bytes at the end of {1}".format(
+                self._size - offset, self._path))
+            self._file.truncate(offset)
+            self._size = offset
+            self._remap()
+
+    def _read(self, packed_key):
+        entry = self._index.get(packed_key)
+        if entry is None:
+            return None
+        offset, length = entry
+        return self._mmap[offset:offset + length]
+
+    def _has(self, packed_key):
+        return packed_key in self._index
+
+    def _persisted_keys(self):
+        return self._index.keys()
+
+    def _encode_record(self, packed_key, packed_value):
+        if packed_value is None:
+            return self.HEADER.pack(
+                len(packed_key), -1,
+                zlib.crc32(packed_key) & 0xffffffff) + packed_key
+        crc = zlib.crc32(packed_value, zlib.crc32(packed_key)) & 0xffffffff
+        return b"".join((
+            self.HEADER.pack(len(packed_key), len(packed_value), crc),
+            packed_key, packed_value))
+
+    def _write(self, records):
+        chunks = []
+        offset = self._size
+        for packed_key, packed_value in records:
+            if packed_value is None and packed_key not in self._index:
+                continue
+            record = self._encode_record(packed_key, packed_value)
+            value_len = -1 if packed_value is None else len(packed_value)
+            self._index_record(
+                packed_key, offset + len(record) - max(value_len, 0),
+                value_len)
+            chunks.append(record)
+            offset += len(record)
+
+        self._file.write(b"".join(chunks))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._size = offset
+        self._remap()
+
+        if (self._size >= self.COMPACTION_MIN_SIZE and
+                self._size > self.COMPACTION_RATIO * self._live_size):
+            self._compact()
+
+    def _compact(self):
+        """Rewrite the live records to a new log replacing the current one."""
+        tmp_path = self._path + ".compact"
+        index = {}
+        offset = 0
+        with open(tmp_path, "wb") as f:
+            for packed_key, (value_offset, value_len) in self._index.items():
+                record = self._encode_record(
+                    packed_key,
+                    self._mmap[value_offset:value_offset + value_len])
+                index[packed_key] = (offset + len(record) - value_len,
+                                     value_len)
+                f.write(record)
+                offset += len(record)
+            f.flush()
+            os.fsync(f.fileno())
+
+        self._file.close()
+        os.rename(tmp_path, self._path)
+        self._index = index
+        self._live_size = offset
+        self._open()
+
+    def _close(self):
+        self._file.close()
+        self._mmap = None
+
+
+class SqliteState(State):
+    """State stored in a SQLite database, in WAL mode.
+
+    :param path: path of the database file
+    :type path: ``str``
+
+    :raise: ImportError if the ``sqlite3`` module is not available
+    """
+
+    def __init__(self, path):
+        import sqlite3
+        super(SqliteState, self).__init__()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS state"
+            " (key BLOB PRIMARY KEY, value BLOB NOT NULL)")
+        self._db.commit()
+
+    def _read(self, packed_key):
+        row = self._db.execute(
+            "SELECT value FROM state WHERE key = ?", (packed_key,)).fetchone()
+        return None if row is None else bytes(row[0])
+
+    def _persisted_keys(self):
+        return [bytes(row[0]) for row in
+                self._db.execute("SELECT key FROM state")]
+
+    def _write(self, records):
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)",
+                [r for r in records if r[1] is not None])
+            self._db.executemany(
+                "DELETE FROM state WHERE key = ?",
+                [(r[0],) for r in records if r[1] is None])
+
+    def _close(self):
+        self._db.close()
+
+
+STATE_BACKENDS = {
+    LOG_STATE_BACKEND: LogState,
+    SQLITE_STATE_BACKEND: SqliteState,
+}
+
+
+def open_state(path, backend=DEFAULT_STATE_BACKEND):
+    """Open the state stored at path, creating it if needed.
+
+    :param path: path of the file holding the state
+    :type path: ``str``
+    :param backend: name of the backend, ``"log"`` or ``"sqlite"``
+    :type backend: ``str``
+    :return: the state
+    :rtype: :class:`~.State`
+
+    :raise: ValueError if the backend is unknown
+    """
+    if backend not in STATE_BACKENDS:
+        raise ValueError("Unknown state backend: {0}".format(backend))
+    return STATE_BACKENDS[backend](path)
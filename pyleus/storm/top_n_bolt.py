@@ -0,0 +1,341 @@
+"""Module containing the implementation of TopNBolt and TopNMergeBolt, Bolt
+components tracking the most frequent keys of a stream over a sliding time
+window with bounded memory, regardless of the number of distinct keys.
+"""
+from __future__ import absolute_import
+
+from array import array
+from collections import defaultdict
+import heapq
+from operator import itemgetter
+
+from pyleus.storm.bolt import SimpleBolt
+
+_HASH_MASK = (1 << 64) - 1
+# Odd 64 bits constant (golden ratio) used to scatter hash values
+_HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+
+
+class CountMinSketch(object):
+    """Count-Min sketch over a sliding window of buckets.
+
+    Counts are added to the current bucket and to a running total, which
+    always holds the sum of all the buckets. Advancing the window subtracts
+    the oldest bucket from the total and reuses it as the current one.
+    Estimates never underestimate the actual count of a key in the window.
+
+    :param width: number of counters per row
+    :type width: ``int``
+    :param depth: number of rows, i.e. of hash functions
+    :type depth: ``int``
+    :param num_buckets:
+     number of buckets in the window, default ``None``, meaning that counts
+     never expire
+    :type num_buckets: ``int``
+    """
+
+    def __init__(self, width, depth, num_buckets=None):
+        self._width = width
+        self._depth = depth
+        self._empty = array('l', [0]) * (width * depth)
+        self._total = array('l', self._empty)
+        # Without a window, the total is all there is
+        self._buckets = [
+            array('l', self._empty) for _ in range(num_buckets or 0)]
+        self._current = 0
+
+    def _indexes(self, key):
+        """Return the index of the counter of key in every row. Rows use
+        double hashing from a single hash of key.
+        """
+        h = (hash(key) * _HASH_MULTIPLIER) & _HASH_MASK
+        h1 = h & 0xFFFFFFFF
+        h2 = (h >> 32) | 1
+        width = self._width
+        return [
+            row * width + (h1 + row * h2) % width
+            for row in range(self._depth)]
+
+    def add(self, key, count=1):
+        """Add count to key and return the new estimate of its count."""
+        total = self._total
+        indexes = self._indexes(key)
+        if self._buckets:
+            bucket = self._buckets[self._current]
+            for index in indexes:
+                bucket[index] += count
+        for index in indexes:
+            total[index] += count
+        return min(total[index] for index in indexes)
+
+    def estimate(self, key):
+        """Return the estimated count of key over the window."""
+        total = self._total
+        return min(total[index] for index in self._indexes(key))
+
+    def advance(self):
+        """Move the window forward by one bucket."""
+        if not self._buckets:
+            return
+        self._current = (self._current + 1) % len(self._buckets)
+        oldest = self._buckets[self._current]
+        total = self._total
+        for index, count in enumerate(oldest):
+            if count:
+                total[index] -= count
+        oldest[:] = self._empty
+
+
+class TopHeap(object):
+    """Min-heap of at most ``size`` ``(count, key)`` pairs, indexed by key, so
+    that the count of a key can be updated in O(log size).
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._counts = []
+        self._keys = []
+        self._positions = {}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return key in self._positions
+
+    def items(self):
+        """Return the list of ``(key, count)`` pairs, by decreasing count."""
+        return sorted(
+            zip(self._keys, self._counts), key=itemgetter(1), reverse=True)
+
+    def _swap(self, i, j):
+        counts, keys = self._counts, self._keys
+        counts[i], counts[j] = counts[j], counts[i]
+        keys[i], keys[j] = keys[j], keys[i]
+        self._positions[keys[i]] = i
+        self._positions[keys[j]] = j
+
+    def _sift_up(self, i):
+        counts = self._counts
+        while i > 0:
+            parent = (i - 1) >> 1
+            if counts[parent] <= counts[i]:
+                break
+            self._swap(i, parent)
+            i = parent
+
+    def _sift_down(self, i):
+        counts = self._counts
+        length = len(counts)
+        while True:
+            smallest = i
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < length and counts[child] < counts[smallest]:
+                    smallest = child
+            if smallest == i:
+                break
+            self._swap(i, smallest)
+            i = smallest
+
+    def offer(self, key, count):
+        """Set the count of key if it is in the heap. Otherwise add it, if the
+        heap is not full or count is greater than the smallest one, which is
+        evicted.
+        """
+        position = self._positions.get(key)
+        if position is not None:
+            old_count = self._counts[position]
+            self._counts[position] = count
+            if count > old_count:
+                self._sift_down(position)
+            else:
+                self._sift_up(position)
+        elif len(self._keys) < self.size:
+            self._counts.append(count)
+            self._keys.append(key)
+            self._positions[key] = len(self._keys) - 1
+            self._sift_up(len(self._keys) - 1)
+        elif self._keys and count > self._counts[0]:
+            del self._positions[self._keys[0]]
+            self._counts[0] = count
+            self._keys[0] = key
+            self._positions[key] = 0
+            self._sift_down(0)
+
+    def rebuild(self, items):
+        """Replace the content of the heap with ``(key, count)`` pairs."""
+        items = heapq.nlargest(self.size, items, key=itemgetter(1))
+        self._counts = [count for _, count in items]
+        self._keys = [key for key, _ in items]
+        # Sorted by decreasing count, reversed it is a valid min-heap
+        self._counts.reverse()
+        self._keys.reverse()
+        self._positions = dict(
+            (key, position) for position, key in enumerate(self._keys))
+
+
+class TopNBolt(SimpleBolt):
+    """A Bolt keeping track of the ``N`` most frequent keys over a sliding
+    window of ``TIME_WINDOW`` seconds, split into buckets of
+    ``tick_freq_secs`` seconds, or since the beginning if ``TIME_WINDOW`` is
+    ``None``.
+
+    Call :meth:`~.add` from process_tuple() to count a key. At every tick,
+    :meth:`~.process_top` is called with the ranking of the keys counted at
+    least ``MIN_COUNT`` times, then the window moves forward by one bucket.
+
+    Counts are estimated by a Count-Min sketch of ``SKETCH_WIDTH`` by
+    ``SKETCH_DEPTH`` counters per bucket, and the top keys are kept in a
+    min-heap of ``N`` entries. Memory does not depend on the number of
+    distinct keys, and counting a key costs O(``SKETCH_DEPTH`` + log ``N``).
+    Estimates may be higher than actual counts, by at most
+    e / ``SKETCH_WIDTH`` of the window total with probability
+    1 - exp(-``SKETCH_DEPTH``).
+
+    ``N``, ``TIME_WINDOW`` and ``MIN_COUNT`` can be overridden by the ``N``,
+    ``time_window`` and ``min_count`` component options, provided they are
+    listed in ``OPTIONS``. Rankings from many tasks can be merged by a
+    :class:`~.TopNMergeBolt`.
+    """
+
+    #: ``int`` number of keys in the ranking.
+    N = 10
+
+    #: ``int`` or ``float`` window size in seconds, a multiple of
+    #: ``tick_freq_secs``. Counts never expire if ``None``.
+    TIME_WINDOW = None
+
+    #: ``int`` minimum count of a key to appear in the ranking.
+    MIN_COUNT = 1
+
+    #: ``int`` number of counters per row of the Count-Min sketch.
+    SKETCH_WIDTH = 2048
+
+    #: ``int`` number of rows of the Count-Min sketch.
+    SKETCH_DEPTH = 4
+
+    #: :class:`~.CountMinSketch` estimating the counts over the window.
+    sketch = None
+
+    #: :class:`~.TopHeap` of the keys with the highest estimated counts.
+    top = None
+
+    def setup_component(self):
+        """Create the sketch after Storm configuration is loaded."""
+        super(TopNBolt, self).setup_component()
+
+        options = self.options or {}
+        self._min_count = options.get("min_count", self.MIN_COUNT)
+        time_window = options.get("time_window", self.TIME_WINDOW)
+
+        num_buckets = None
+        if time_window is not None:
+            tick_freq = self.conf.tick_tuple_freq
+            if not tick_freq:
+                raise ValueError("TopNBolt time window requires"
+                                 " tick_freq_secs")
+            num_buckets = time_window / tick_freq
+            if num_buckets != int(num_buckets) or num_buckets < 1:
+                raise ValueError("Time window must be a multiple of"
+                                 " tick_freq_secs")
+            num_buckets = int(num_buckets)
+
+        self.sketch = CountMinSketch(
+            self.SKETCH_WIDTH, self.SKETCH_DEPTH, num_buckets)
+        self.top = TopHeap(options.get("N", self.N))
+
+    def add(self, key, count=1):
+        """Count key.
+
+        :param key: key to be counted, must be hashable
+        :param count: number of occurrences, default ``1``
+        :type count: ``int``
+        """
+        self.top.offer(key, self.sketch.add(key, count))
+
+    def ranking(self):
+        """Return the list of the top ``(key, count)`` pairs by decreasing
+        count, leaving out keys counted less than ``MIN_COUNT`` times.
+        """
+        return [
+            (key, count) for key, count in self.top.items()
+            if count >= self._min_count]
+
+    def process_top(self, ranking):
+        """Called at every tick with the current ranking. Default behaviour is
+        to emit ``(ranking,)``.
+
+        :param ranking: top ``(key, count)`` pairs by decreasing count
+        :type ranking: ``list``
+
+        .. note:: Implement in subclass if needed.
+        """
+        self.emit((ranking,))
+
+    def process_tick(self):
+        """Process the ranking, then advance the window and update the
+        counts of the top keys accordingly.
+
+        .. note::
+           If overridden, call ``super().process_tick()``, or the window never
+           moves.
+        """
+        self.process_top(self.ranking())
+
+        self.sketch.advance()
+        estimates = (
+            (key, self.sketch.estimate(key)) for key, _ in self.top.items())
+        self.top.rebuild(
+            [(key, count) for key, count in estimates if count > 0])
+
+
+class TopNMergeBolt(SimpleBolt):
+    """A Bolt merging the rankings emitted by many :class:`~.TopNBolt` tasks
+    into a global one.
+
+    The last ranking received from every task is kept, counts of the same key
+    are summed, and :meth:`~.process_top` is called at every tick with the
+    ``N`` top keys. ``N`` can be overridden by the ``N`` component option,
+    provided it is listed in ``OPTIONS``.
+    """
+
+    #: ``int`` number of keys in the ranking.
+    N = 10
+
+    def setup_component(self):
+        """Read the size of the ranking from the options."""
+        super(TopNMergeBolt, self).setup_component()
+
+        self._n = (self.options or {}).get("N", self.N)
+        self._rankings = {}
+
+    def process_tuple(self, tup):
+        """Store the last ranking of the emitting task.
+
+        .. note::
+           If overridden, call ``super().process_tuple(tup)``.
+        """
+        ranking, = tup.values
+        self._rankings[tup.task] = ranking
+
+    def ranking(self):
+        """Return the merged list of the top ``(key, count)`` pairs by
+        decreasing count.
+        """
+        counts = defaultdict(int)
+        for ranking in self._rankings.values():
+            for key, count in ranking:
+                counts[key] += count
+        return heapq.nlargest(self._n, counts.items(), key=itemgetter(1))
+
+    def process_top(self, ranking):
+        """Called at every tick with the merged ranking. Default behaviour is
+        to emit ``(ranking,)``.
+
+        .. note:: Implement in subclass if needed.
+        """
+        self.emit((ranking,))
+
+    def process_tick(self):
+        """Process the merged ranking."""
+        self.process_top(self.ranking())
@@ -0,0 +1,257 @@
+"""Module containing the implementation of WindowedBolt, a Bolt component
+processing tuples in count-based or time-based, tumbling or sliding windows.
+"""
+from __future__ import absolute_import
+
+from array import array
+from bisect import bisect_left
+from collections import deque
+import time
+
+from pyleus.storm import is_heartbeat, is_tick
+from pyleus.storm.bolt import SimpleBolt
+
+
+class _Chunk(object):
+    """Fixed size block of buffered tuples and their arrival times."""
+
+    __slots__ = ('tuples', 'times')
+
+    def __init__(self):
+        self.tuples = []
+        self.times = array('d')
+
+
+class TupleBuffer(object):
+    """Tuples in arrival order, numbered by a sequence number, and stored in a
+    deque of fixed size chunks. Arrival times are packed in an ``array`` per
+    chunk and sequence numbers are implicit, so that bookkeeping does not
+    allocate a Python object per tuple.
+
+    :param chunk_size: number of tuples per chunk
+    :type chunk_size: ``int``
+    """
+
+    def __init__(self, chunk_size=1024):
+        self._chunk_size = chunk_size
+        self._chunks = deque()
+        # Index of the first tuple still buffered in the first chunk
+        self._head = 0
+        #: ``int`` sequence number of the first tuple still buffered.
+        self.start = 0
+        #: ``int`` sequence number of the next tuple to be appended.
+        self.end = 0
+
+    def __len__(self):
+        return self.end - self.start
+
+    def append(self, tup, timestamp):
+        """Append a tuple received at timestamp, which must not be lower than
+        the one of any tuple already buffered.
+        """
+        chunks = self._chunks
+        if not chunks or len(chunks[-1].tuples) == self._chunk_size:
+            chunks.append(_Chunk())
+        chunk = chunks[-1]
+        chunk.tuples.append(tup)
+        chunk.times.append(timestamp)
+        self.end += 1
+
+    def slice(self, lo, hi):
+        """Return the list of the buffered tuples whose sequence number is in
+        [lo, hi).
+        """
+        lo = max(lo, self.start)
+        hi = min(hi, self.end)
+        result = []
+        if lo >= hi:
+            return result
+
+        # All chunks but the last one are full, so their position is known
+        index, offset = divmod(
+            lo - (self.start - self._head), self._chunk_size)
+        remaining = hi - lo
+        while remaining > 0:
+            tuples = self._chunks[index].tuples
+            part = tuples[offset:offset + remaining]
+            result.extend(part)
+            remaining -= len(part)
+            index += 1
+            offset = 0
+        return result
+
+    def seq_at(self, timestamp):
+        """Return the sequence number of the first buffered tuple received at
+        or after timestamp, or :attr:`~.end` if there is none.
+        """
+        seq = self.start - self._head
+        for chunk in self._chunks:
+            times = chunk.times
+            if times[-1] >= timestamp:
+                return max(self.start, seq + bisect_left(times, timestamp))
+            seq += len(times)
+        return self.end
+
+    def pop_before(self, seq):
+        """Remove the tuples whose sequence number is lower than seq and
+        return them in order.
+        """
+        result = []
+        chunks = self._chunks
+        while self.start < min(seq, self.end):
+            tuples = chunks[0].tuples
+            count = min(len(tuples) - self._head, seq - self.start)
+            result.extend(tuples[self._head:self._head + count])
+            self._head += count
+            self.start += count
+            if self._head == self._chunk_size:
+                chunks.popleft()
+                self._head = 0
+        return result
+
+
+class WindowedBolt(SimpleBolt):
+    """A Bolt buffering tuples into windows and calling process_window() every
+    time a window closes.
+
+    Windows last ``WINDOW_LENGTH`` and a new one closes every
+    ``SLIDING_INTERVAL``, counted in tuples, or in seconds if ``TIME_BASED``.
+    Windows are tumbling, i.e. do not overlap, if ``SLIDING_INTERVAL`` is
+    ``None``. Time-based windows close on tick tuples, so ``tick_freq_secs``
+    must be set for the component in the topology definition, preferably to a
+    fraction of ``SLIDING_INTERVAL``. Time-based windows without any tuple
+    are skipped.
+
+    Tuples are acked once the last window they belong to has been processed.
+    If process_window() raises an exception, all the buffered tuples are
+    failed and the bolt terminates, like a
+    :class:`~pyleus.storm.bolt.SimpleBolt` would.
+
+    ``WINDOW_LENGTH``, ``SLIDING_INTERVAL`` and ``TIME_BASED`` can be
+    overridden by the ``window_length``, ``sliding_interval`` and
+    ``time_based`` component options, provided they are listed in
+    ``OPTIONS``.
+
+    .. warning::
+       Tuples are not acked until their last window closes. Windows lasting
+       longer than ``topology.message.timeout.secs`` make Storm replay their
+       tuples.
+    """
+
+    #: ``int`` or ``float`` length of windows, in tuples or seconds.
+    WINDOW_LENGTH = 100
+
+    #: ``int`` or ``float`` interval between two windows closing, in tuples
+    #: or seconds. Windows are tumbling if ``None``.
+    SLIDING_INTERVAL = None
+
+    #: ``bool`` whether windows are measured in seconds instead of tuples.
+    TIME_BASED = False
+
+    #: ``int`` number of tuples per chunk of the buffer.
+    CHUNK_SIZE = 1024
+
+    def setup_component(self):
+        """Configure windows after Storm configuration is loaded."""
+        super(WindowedBolt, self).setup_component()
+
+        options = self.options or {}
+        self._window_length = options.get("window_length", self.WINDOW_LENGTH)
+        sliding_interval = options.get(
+            "sliding_interval", self.SLIDING_INTERVAL)
+        if sliding_interval is None:
+            sliding_interval = self._window_length
+        self._sliding_interval = sliding_interval
+        self._time_based = options.get("time_based", self.TIME_BASED)
+
+        if self._window_length <= 0 or self._sliding_interval <= 0:
+            raise ValueError("Window length and sliding interval must be"
+                             " positive")
+        if self._time_based and not self.conf.tick_tuple_freq:
+            raise ValueError("Time-based windows require tick_freq_secs")
+
+        self._buffer = TupleBuffer(self.CHUNK_SIZE)
+        if self._time_based:
+            self._next_window_end = time.time() + self._sliding_interval
+        else:
+            self._next_window_end = self._sliding_interval
+
+    def process_window(self, tuples, window_start, window_end):
+        """Process the tuples of a window.
+
+        :param tuples: tuples of the window, in arrival order
+        :type tuples: ``list`` of :class:`~pyleus.storm.StormTuple`
+        :param window_start:
+         sequence number of the first tuple of the window, counting from 0,
+         or, for time-based windows, timestamp of its beginning
+        :param window_end:
+         sequence number of the tuple following the window, or timestamp of
+         its end for time-based windows
+
+        .. note:: Implement in subclass.
+        """
+        pass
+
+    def _ack_tuples(self, tuples):
+        if tuples:
+            self.send_commands('ack', [{'id': tup.id} for tup in tuples])
+
+    def _fail_buffered(self):
+        tuples = self._buffer.pop_before(self._buffer.end)
+        if tuples:
+            self.send_commands('fail', [{'id': tup.id} for tup in tuples])
+
+    def _process_window(self, lo, hi, window_start, window_end):
+        """Process the tuples with sequence number in [lo, hi)."""
+        try:
+            self.process_window(
+                self._buffer.slice(lo, hi), window_start, window_end)
+        except Exception:
+            self._fail_buffered()
+            raise
+
+    def _close_count_windows(self):
+        buf = self._buffer
+        while buf.end >= self._next_window_end:
+            end = self._next_window_end
+            start = max(0, end - self._window_length)
+            self._process_window(start, end, start, end)
+            self._next_window_end += self._sliding_interval
+        # Also acks right away tuples falling between two windows
+        self._ack_tuples(buf.pop_before(
+            self._next_window_end - self._window_length))
+
+    def _close_time_windows(self, now):
+        buf = self._buffer
+        while now >= self._next_window_end:
+            if not buf:
+                # Skip empty windows at once after an idle period
+                intervals = (now - self._next_window_end) // (
+                    self._sliding_interval)
+                self._next_window_end += (
+                    (intervals + 1) * self._sliding_interval)
+                break
+
+            end = self._next_window_end
+            start = end - self._window_length
+            lo = buf.seq_at(start)
+            hi = buf.seq_at(end)
+            if lo < hi:
+                self._process_window(lo, hi, start, end)
+            self._next_window_end += self._sliding_interval
+            self._ack_tuples(buf.pop_before(buf.seq_at(
+                self._next_window_end - self._window_length)))
+
+    def _process_tuple(self, tup):
+        """WindowedBolt middleware level tuple processing."""
+        if is_heartbeat(tup):
+            self.sync()
+        elif is_tick(tup):
+            if self._time_based:
+                self._close_time_windows(time.time())
+            self.process_tick()
+            self.ack(tup)
+        else:
+            self._buffer.append(tup, time.time())
+            if not self._time_based:
+                self._close_count_windows()
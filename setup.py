@@ -6,6 +6,7 @@ import subprocess
 import sys
 
 from setuptools import setup
+from setuptools.command.build_py import build_py as _build_py
 from setuptools.command.sdist import sdist as _sdist
 
 from pyleus import __version__
@@ -60,6 +61,19 @@ class sdist(_sdist):
         _sdist.run(self)
 
 
+class build_py(_build_py):
+
+    def find_package_modules(self, package, package_dir):
+        modules = _build_py.find_package_modules(self, package, package_dir)
+        if sys.version_info < (3, 5):
+            # pyleus.storm.aio uses async/await syntax, which would not even
+            # byte-compile
+            modules = [
+                module for module in modules
+                if module[:2] != ("pyleus.storm", "aio")]
+        return modules
+
+
 def readme():
     with open("README.rst") as f:
         return f.read()
@@ -69,6 +83,9 @@ extra_install_requires = []
 if sys.version_info < (2, 7):
     # argparse is in the standard library of Python >= 2.7
     extra_install_requires.append("argparse")
+if sys.version_info < (3, 2):
+    # concurrent.futures is in the standard library of Python >= 3.2
+    extra_install_requires.append("futures")
 
 
 setup(
@@ -104,6 +121,7 @@ setup(
     package_data={'pyleus': [BASE_JAR]},
     cmdclass={
         'build_java': build_java,
+        'build_py': build_py,
         'bdist': bdist,
         'sdist': sdist,
     },
@@ -4,6 +4,7 @@ import shutil
 import zipfile
 
 import pytest
+import six
 
 from pyleus import __version__
 from pyleus import exception
@@ -72,13 +73,9 @@ class TestBuild(object):
             pypi_index_url="http://pypi-ninja.ninjacorp.com/simple",
             python_interpreter="python2.7",
             verbose=False)
-        expected_install = [
-            mock.call("pyleus=={0}".format(__version__)),
-            mock.call("fruit"),
-            mock.call("ninja==7.7.7")
-        ]
-        venv.install_package.assert_has_calls(expected_install)
-        venv.install_from_requirements.assert_called_once_with("baz.txt")
+        venv.install.assert_called_once_with(
+            ["pyleus=={0}".format(__version__), "fruit", "ninja==7.7.7"],
+            "baz.txt")
         mock_remove_base_jar.assert_called_once_with(venv)
 
     @mock.patch.object(build, '_remove_pyleus_base_jar', autospec=True)
@@ -95,15 +92,55 @@ class TestBuild(object):
             pypi_index_url="http://pypi-ninja.ninjacorp.com/simple",
             python_interpreter="python2.7",
             verbose=False)
-        expected_install = [
-            mock.call("pyleus=={0}".format(__version__)),
-            mock.call("fruit"),
-            mock.call("ninja==7.7.7")
-        ]
-        venv.install_package.assert_has_calls(expected_install)
-        assert venv.install_from_requirements.call_count == 0
+        venv.install.assert_called_once_with(
+            ["pyleus=={0}".format(__version__), "fruit", "ninja==7.7.7"],
+            None)
         mock_remove_base_jar.assert_called_once_with(venv)
 
+    @mock.patch.object(build, '_remove_pyleus_base_jar', autospec=True)
+    @mock.patch.object(build, 'VirtualenvProxy', autospec=True)
+    def test__set_up_virtualenv_cache_hit(self, mock_venv,
+                                          mock_remove_base_jar):
+        venv_cache = mock.Mock()
+        venv_cache.fetch.return_value = True
+        build._set_up_virtualenv(
+            venv_name="foo",
+            tmp_dir="bar",
+            req=None,
+            include_packages=["fruit"],
+            system_site_packages=False,
+            pypi_index_url=None,
+            python_interpreter=None,
+            verbose=False,
+            venv_cache=venv_cache)
+
+        mock_venv.assert_called_once_with(
+            "bar/foo", verbose=False, create=False)
+        assert mock_venv.return_value.install.call_count == 0
+        assert mock_remove_base_jar.call_count == 0
+        assert venv_cache.store.call_count == 0
+
+    @mock.patch.object(build, '_remove_pyleus_base_jar', autospec=True)
+    @mock.patch.object(build, 'VirtualenvProxy', autospec=True)
+    def test__set_up_virtualenv_cache_miss(self, mock_venv,
+                                           mock_remove_base_jar):
+        venv_cache = mock.Mock()
+        venv_cache.fetch.return_value = False
+        build._set_up_virtualenv(
+            venv_name="foo",
+            tmp_dir="bar",
+            req=None,
+            include_packages=["fruit"],
+            system_site_packages=False,
+            pypi_index_url=None,
+            python_interpreter=None,
+            verbose=False,
+            venv_cache=venv_cache)
+
+        key = venv_cache.fetch.call_args[0][0]
+        mock_remove_base_jar.assert_called_once_with(mock_venv.return_value)
+        venv_cache.store.assert_called_once_with(key, "bar/foo")
+
     @mock.patch.object(glob, 'glob', autospec=True)
     def test__content_to_copy(self, mock_glob):
         mock_glob.return_value = ["foo/good1.mkv", "foo/good2.bat",
@@ -177,3 +214,173 @@ class TestBuild(object):
             build._remove_pyleus_base_jar(mock_venv)
 
         assert not mock_remove.called
+
+    def test__describe_modules(self):
+        venv = mock.Mock()
+        venv.execute_module.return_value = '{"foo": {"options": null}}'
+        descriptions = build._describe_modules(["foo"], lambda: venv, "bar")
+        assert descriptions == {"foo": {"options": None}}
+        venv.execute_module.assert_called_once_with(
+            module="pyleus._describe", args=["foo"], cwd="bar")
+
+    def test__describe_modules_fallback(self):
+        venv = mock.Mock()
+        venv.execute_module.side_effect = [
+            exception.VirtualenvError("No module named pyleus._describe"),
+            '{"options": null}',
+        ]
+        descriptions = build._describe_modules(["foo"], lambda: venv, "bar")
+        assert descriptions == {"foo": {"options": None}}
+        venv.execute_module.assert_called_with(
+            module="foo", args=["--describe"], cwd="bar")
+
+
+class TestIncrementalBuild(object):
+
+    @pytest.fixture
+    def topology_dir(self, tmpdir):
+        topology_dir = tmpdir.mkdir("topology")
+        topology_dir.join("bolt.py").write("a = 1\n")
+        topology_dir.join("removed.py").write("b = 1\n")
+        base_jar = tmpdir.join("base.jar")
+        with zipfile.ZipFile(str(base_jar), "w") as zf:
+            zf.writestr("META-INF/MANIFEST.MF", "Manifest-Version: 1.0\n")
+        return topology_dir
+
+    def _create_jar(self, topology_dir, venv_cache):
+        tmp_dir = topology_dir.dirpath().mkdtemp()
+        with zipfile.ZipFile(str(topology_dir.dirpath("base.jar"))) as zf:
+            build._create_pyleus_jar(
+                original_topology_spec=mock.Mock(
+                    requirements_filename=None, python_interpreter=None),
+                topology_dir=str(topology_dir),
+                base_jar=str(topology_dir.dirpath("base.jar")),
+                output_jar=str(topology_dir.dirpath("out.jar")),
+                zip_file=zf,
+                tmp_dir=str(tmp_dir),
+                include_packages=None,
+                system_site_packages=False,
+                pypi_index_url=None,
+                verbose=False,
+                venv_cache=venv_cache)
+
+    def _jar_content(self, topology_dir):
+        with zipfile.ZipFile(str(topology_dir.dirpath("out.jar"))) as zf:
+            assert zf.testzip() is None
+            return dict((name, zf.read(name)) for name in zf.namelist())
+
+    @mock.patch.object(build, '_assemble_full_topology_yaml', autospec=True)
+    @mock.patch.object(build, '_set_up_virtualenv', autospec=True)
+    def test__create_pyleus_jar_incremental(
+            self, mock_set_up_venv, mock_assemble, topology_dir):
+        def set_up_venv(venv_name, tmp_dir, **kwargs):
+            os.makedirs(os.path.join(tmp_dir, venv_name))
+            with open(os.path.join(tmp_dir, venv_name, "lib.py"), "w") as f:
+                f.write("venv = True\n")
+        mock_set_up_venv.side_effect = set_up_venv
+        mock_assemble.return_value = "name: topology\n"
+
+        self._create_jar(topology_dir, venv_cache=mock.Mock())
+        assert mock_set_up_venv.call_count == 1
+
+        topology_dir.join("bolt.py").write("a = 2\n")
+        topology_dir.join("removed.py").remove()
+        topology_dir.join("added.py").write("c = 1\n")
+        self._create_jar(topology_dir, venv_cache=mock.Mock())
+        # Not needed to describe the components, nor to rebuild the jar
+        assert mock_set_up_venv.call_count == 1
+
+        content = self._jar_content(topology_dir)
+        assert sorted(content) == [
+            "META-INF/MANIFEST.MF",
+            build.BUILD_INFO_PATH,
+            "resources/added.py",
+            "resources/bolt.py",
+            "resources/pyleus_topology.yaml",
+            "resources/pyleus_venv/lib.py",
+        ]
+        assert content["resources/bolt.py"] == b"a = 2\n"
+        assert content["resources/pyleus_venv/lib.py"] == b"venv = True\n"
+
+        # Without cache, the jar is built from scratch
+        self._create_jar(topology_dir, venv_cache=None)
+        assert mock_set_up_venv.call_count == 2
+        assert self._jar_content(topology_dir) == content
+
+    def test__read_build_info(self, tmpdir):
+        jar = str(tmpdir.join("out.jar"))
+        assert build._read_build_info(jar) is None
+
+        with zipfile.ZipFile(jar, "w") as zf:
+            zf.writestr("META-INF/MANIFEST.MF", "Manifest-Version: 1.0\n")
+        assert build._read_build_info(jar) is None
+
+        with zipfile.ZipFile(jar, "a") as zf:
+            zf.writestr(build.BUILD_INFO_PATH, '{"pyleus": "0.1"}')
+        assert build._read_build_info(jar) == {"pyleus": "0.1"}
+
+    @pytest.mark.parametrize("data_descriptors", [
+        False,
+        pytest.param(True, marks=pytest.mark.skipif(
+            six.PY2, reason="zipfile writes to seekable files only")),
+    ])
+    def test__repack_jar(self, tmpdir, data_descriptors):
+        class Unseekable(object):
+            # Makes zipfile write data descriptors, like maven does
+            def __init__(self, f):
+                self.write, self.flush = f.write, f.flush
+
+        previous_jar = str(tmpdir.join("previous.jar"))
+        with open(previous_jar, "wb") as f:
+            out = Unseekable(f) if data_descriptors else f
+            with zipfile.ZipFile(out, "w") as zf:
+                # jar tools mark the first entry with the 0xcafe extra field
+                info = zipfile.ZipInfo("META-INF/MANIFEST.MF")
+                info.extra = b"\xfe\xca\x00\x00"
+                zf.writestr(info, "Manifest-Version: 1.0\n")
+                zf.writestr(
+                    "resources/pyleus_venv/lib.py", "venv = True\n" * 100,
+                    zipfile.ZIP_DEFLATED)
+                zf.writestr("resources/bolt.py", "a = 1\n")
+                zf.writestr("resources/removed.py", "b = 1\n")
+        with zipfile.ZipFile(previous_jar) as zf:
+            assert all(
+                bool(info.flag_bits & 0x08) == data_descriptors
+                for info in zf.infolist())
+            previous_infos = dict(
+                (info.filename, info) for info in zf.infolist())
+
+        tmp_dir = tmpdir.mkdir("jar")
+        tmp_dir.mkdir("resources").join("bolt.py").write("a = 2\n")
+        output_jar = str(tmpdir.join("out.jar"))
+        # Entries are copied raw, never opened to be decompressed
+        zip_open = zipfile.ZipFile.open
+
+        def open_for_writing(zf, name, mode="r", *args, **kwargs):
+            assert mode == "w"
+            return zip_open(zf, name, mode, *args, **kwargs)
+
+        with mock.patch.object(zipfile.ZipFile, 'open', open_for_writing):
+            build._repack_jar(str(tmp_dir), previous_jar, output_jar)
+
+        with zipfile.ZipFile(output_jar) as zf:
+            assert zf.testzip() is None
+            assert sorted(zf.namelist()) == [
+                "META-INF/MANIFEST.MF",
+                "resources/bolt.py",
+                "resources/pyleus_venv/lib.py",
+            ]
+            assert zf.read("resources/bolt.py") == b"a = 2\n"
+            assert zf.read("resources/pyleus_venv/lib.py") == (
+                b"venv = True\n" * 100)
+            assert zf.getinfo("resources/pyleus_venv/lib.py").compress_type == (
+                zipfile.ZIP_DEFLATED)
+            assert zf.getinfo("META-INF/MANIFEST.MF").compress_type == (
+                zipfile.ZIP_STORED)
+            for name in ("META-INF/MANIFEST.MF",
+                         "resources/pyleus_venv/lib.py"):
+                info = zf.getinfo(name)
+                previous = previous_infos[name]
+                assert not info.flag_bits & 0x08
+                assert (info.CRC, info.compress_size, info.file_size) == (
+                    previous.CRC, previous.compress_size, previous.file_size)
@@ -0,0 +1,161 @@
+import os
+import textwrap
+
+import pytest
+
+import pyleus
+from pyleus.cli.local_runner import Grouping
+from pyleus.cli.local_runner import LocalRunner
+from pyleus.cli.topology_spec import TopologySpec
+
+SPOUT = """
+from pyleus.storm import Spout
+
+
+class NumberSpout(Spout):
+
+    OUTPUT_FIELDS = ["number"]
+    OPTIONS = ["count"]
+
+    def initialize(self):
+        self.numbers = iter(range(self.options["count"]))
+
+    def next_tuple(self):
+        number = next(self.numbers, None)
+        if number is not None:
+            self.emit((number,), tup_id=number)
+
+
+if __name__ == '__main__':
+    NumberSpout().run()
+"""
+
+PARITY_BOLT = """
+from pyleus.storm import Bolt
+
+
+class ParityBolt(Bolt):
+
+    OUTPUT_FIELDS = ["parity", "number"]
+
+    def process_tuple(self, tup):
+        number, = tup.values
+        if number % 10 == 0:
+            self.fail(tup)
+            return
+        self.emit((number % 2, number), anchors=[tup])
+        self.ack(tup)
+
+
+if __name__ == '__main__':
+    ParityBolt().run()
+"""
+
+SINK_BOLT = """
+from pyleus.storm import SimpleBolt
+
+
+class SinkBolt(SimpleBolt):
+
+    def process_tuple(self, tup):
+        pass
+
+
+if __name__ == '__main__':
+    SinkBolt().run()
+"""
+
+TOPOLOGY = """
+name: numbers
+serializer: {serializer}
+max_spout_pending: 10
+topology:
+    - spout:
+        name: numbers
+        module: sample.spout
+        options:
+            count: 100
+    - bolt:
+        name: parity
+        module: sample.parity_bolt
+        parallelism_hint: 2
+        groupings:
+            - shuffle_grouping: numbers
+    - bolt:
+        name: sink
+        module: sample.sink_bolt
+        parallelism_hint: 2
+        groupings:
+            - fields_grouping:
+                component: parity
+                fields:
+                    - parity
+            - all_grouping: parity
+"""
+
+
+class TestGrouping(object):
+
+    def test_shuffle(self):
+        grouping = Grouping("shuffle_grouping", [1, 2, 3])
+        assert [grouping.select(None) for _ in range(4)] == [
+            [1], [2], [3], [1]]
+
+    def test_global_all(self):
+        assert Grouping("global_grouping", [1, 2]).select(None) == [1]
+        assert Grouping("all_grouping", [1, 2]).select(None) == [1, 2]
+
+    def test_fields(self):
+        grouping = Grouping("fields_grouping", [1, 2, 3], field_indexes=[1])
+        selected = grouping.select(["a", "key", 1])
+        assert len(selected) == 1
+        assert grouping.select(["b", "key", 2]) == selected
+
+
+class TestLocalRunner(object):
+
+    @pytest.fixture
+    def topology_dir(self, tmpdir, monkeypatch):
+        # Components run in subprocesses, which must import pyleus
+        monkeypatch.setenv("PYTHONPATH", os.path.dirname(
+            os.path.dirname(os.path.abspath(pyleus.__file__))))
+
+        package = tmpdir.mkdir("sample")
+        package.join("__init__.py").write("")
+        package.join("spout.py").write(SPOUT)
+        package.join("parity_bolt.py").write(PARITY_BOLT)
+        package.join("sink_bolt.py").write(SINK_BOLT)
+        return tmpdir
+
+    @pytest.mark.parametrize("serializer", ["msgpack", "binary"])
+    def test_run(self, topology_dir, serializer):
+        import yaml
+        spec = TopologySpec(yaml.safe_load(
+            textwrap.dedent(TOPOLOGY).format(serializer=serializer)))
+
+        runner = LocalRunner(spec, str(topology_dir))
+        runner.run(duration=1)
+
+        stats = runner.stats
+        assert stats["numbers"]["emitted"] == 100
+        assert stats["numbers"]["acked"] == 90
+        assert stats["numbers"]["failed"] == 10
+        assert stats["parity"]["emitted"] == 90
+        # Every tuple goes to one sink task by parity, and to all of them
+        assert stats["sink"]["executed"] == 3 * stats["parity"]["emitted"]
+
+
+@pytest.mark.parametrize("serializer, expected", [
+    ("msgpack", "42"),
+    ("binary", "42"),
+    ("json", 42),
+])
+def test_spout_msg_id(serializer, expected):
+    """Like the Java serializers, ids are sent back as strings but by JSON."""
+    import yaml
+    spec = TopologySpec(yaml.safe_load(
+        textwrap.dedent(TOPOLOGY).format(serializer=serializer)))
+    runner = LocalRunner(spec, ".")
+
+    assert runner._spout_msg_id(42) == expected
+    assert runner._spout_msg_id("foo") == "foo"
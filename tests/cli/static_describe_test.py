@@ -0,0 +1,318 @@
+import pytest
+
+from pyleus.cli import static_describe
+from pyleus.cli.static_describe import describe_module
+
+
+MAIN = """
+if __name__ == '__main__':
+    {0}().run()
+"""
+
+
+@pytest.fixture
+def topology_dir(tmpdir):
+    def write(module, source, main_class=None):
+        path = tmpdir.join(*module.split("."))
+        source_path = path.new(ext="py")
+        source_path.dirpath().ensure(dir=True)
+        if main_class is not None:
+            source += MAIN.format(main_class)
+        source_path.write(source)
+    write.path = str(tmpdir)
+    return write
+
+
+def test_describe_module_literals(topology_dir):
+    topology_dir("sample_bolt", """
+from pyleus.storm import SimpleBolt
+
+class SampleBolt(SimpleBolt):
+    OUTPUT_FIELDS = ["word", "count"]
+    OPTIONS = ("limit",)
+""", main_class="SampleBolt")
+    assert describe_module("sample_bolt", topology_dir.path) == {
+        "component_type": "bolt",
+        "output_fields": {"default": ["word", "count"]},
+        "options": ["limit"],
+    }
+
+
+def test_describe_module_namedtuples(topology_dir):
+    topology_dir("sample_spout", """
+from collections import namedtuple
+import typing
+
+import pyleus.storm
+
+Line = namedtuple("Line", "line, number")
+
+class Word(typing.NamedTuple):
+    word: str
+
+class Count(namedtuple("Count", ["word", "count"])):
+    pass
+
+class SampleSpout(pyleus.storm.Spout):
+    OUTPUT_FIELDS = {
+        "default": Line,
+        "words": Word,
+        "counts": Count,
+    }
+""", main_class="SampleSpout")
+    assert describe_module("sample_spout", topology_dir.path) == {
+        "component_type": "spout",
+        "output_fields": {
+            "default": ["line", "number"],
+            "words": ["word"],
+            "counts": ["word", "count"],
+        },
+        "options": None,
+    }
+
+
+def test_describe_module_topology_base_classes(topology_dir):
+    topology_dir("sample.__init__", "")
+    topology_dir("sample.fields", """
+from collections import namedtuple
+
+Fields = namedtuple("Fields", "word")
+""")
+    topology_dir("sample.base", """
+from pyleus.storm import SimpleBolt
+
+from .fields import Fields
+
+class Mixin(object):
+    OPTIONS = ["limit"]
+
+class BaseBolt(SimpleBolt):
+    OUTPUT_FIELDS = Fields
+    OPTIONS = ["ignored"]
+""")
+    topology_dir("sample.bolt", """
+from sample import base
+
+class SampleBolt(base.Mixin, base.BaseBolt):
+    pass
+""", main_class="SampleBolt")
+    assert describe_module("sample.bolt", topology_dir.path) == {
+        "component_type": "bolt",
+        "output_fields": {"default": ["word"]},
+        "options": ["limit"],
+    }
+
+
+@pytest.mark.parametrize("source", [
+    # Computed at import time
+    """
+from pyleus.storm import SimpleBolt
+
+class SampleBolt(SimpleBolt):
+    OPTIONS = sorted(["limit"])
+""",
+    # Bound conditionally
+    """
+from pyleus.storm import SimpleBolt
+
+class SampleBolt(SimpleBolt):
+    if True:
+        OPTIONS = ["limit"]
+""",
+    # Changed after the class definition
+    """
+from pyleus.storm import SimpleBolt
+
+class SampleBolt(SimpleBolt):
+    OPTIONS = ["limit"]
+
+SampleBolt.OPTIONS = ["other"]
+""",
+    # Changed in the main block
+    """
+from pyleus.storm import SimpleBolt
+
+class SampleBolt(SimpleBolt):
+    OPTIONS = ["limit"]
+
+if __name__ == '__main__':
+    SampleBolt.OPTIONS = ["other"]
+""",
+    # Mutated by a method call
+    """
+from pyleus.storm import SimpleBolt
+
+OPTIONS = ["limit"]
+OPTIONS.append("other")
+
+class SampleBolt(SimpleBolt):
+    OPTIONS = OPTIONS
+""",
+    # Mutated by a method call in the main block
+    """
+from pyleus.storm import SimpleBolt
+
+class SampleBolt(SimpleBolt):
+    OPTIONS = ["limit"]
+
+if __name__ == '__main__':
+    SampleBolt.OPTIONS.extend(["other"])
+""",
+    # Item stored
+    """
+from pyleus.storm import SimpleBolt
+
+OPTIONS = ["limit"]
+OPTIONS[0] = "other"
+
+class SampleBolt(SimpleBolt):
+    OPTIONS = OPTIONS
+""",
+    # Rebound by a function
+    """
+from pyleus.storm import SimpleBolt
+
+OPTIONS = ["limit"]
+
+def configure():
+    global OPTIONS
+    OPTIONS = ["other"]
+
+class SampleBolt(SimpleBolt):
+    OPTIONS = OPTIONS
+""",
+    # Attribute of a pyleus class changed
+    """
+from pyleus.storm import SimpleBolt
+
+SimpleBolt.OPTIONS = ["other"]
+
+class SampleBolt(SimpleBolt):
+    pass
+""",
+    # Inherited from a third-party module
+    """
+from third_party import BaseBolt
+
+class SampleBolt(BaseBolt):
+    OPTIONS = ["limit"]
+""",
+    # Overridden describe
+    """
+from pyleus.storm import SimpleBolt
+
+class SampleBolt(SimpleBolt):
+    def describe(self):
+        pass
+""",
+    # Set on the instance
+    """
+from pyleus.storm import SimpleBolt
+
+class SampleBolt(SimpleBolt):
+    OUTPUT_FIELDS = ["a"]
+
+    def __init__(self):
+        super(SampleBolt, self).__init__()
+        self.OUTPUT_FIELDS = ["a", "b"]
+""",
+    # Overridden instance creation
+    """
+from pyleus.storm import SimpleBolt
+
+class BaseBolt(SimpleBolt):
+    def __new__(cls):
+        instance = super(BaseBolt, cls).__new__(cls)
+        instance.OUTPUT_FIELDS = ["a", "b"]
+        return instance
+
+class SampleBolt(BaseBolt):
+    OUTPUT_FIELDS = ["a"]
+""",
+    # Invalid syntax
+    """
+class SampleBolt(
+""",
+])
+def test_describe_module_unresolvable(topology_dir, source):
+    topology_dir("sample_bolt", source, main_class="SampleBolt")
+    assert describe_module("sample_bolt", topology_dir.path) is None
+
+
+def test_describe_module_mutated_by_other_module(topology_dir):
+    topology_dir("base", """
+from pyleus.storm import SimpleBolt
+
+OPTIONS = ["limit"]
+
+class BaseBolt(SimpleBolt):
+    OPTIONS = OPTIONS
+""")
+    topology_dir("sample_bolt", """
+from base import BaseBolt
+from base import OPTIONS
+
+OPTIONS.append("other")
+
+class SampleBolt(BaseBolt):
+    pass
+""", main_class="SampleBolt")
+    assert describe_module("sample_bolt", topology_dir.path) is None
+
+    topology_dir("sample_bolt", """
+import base
+
+base.OPTIONS[0] = "other"
+
+class SampleBolt(base.BaseBolt):
+    pass
+""", main_class="SampleBolt")
+    assert describe_module("sample_bolt", topology_dir.path) is None
+
+
+def test_describe_module_unrelated_calls(topology_dir):
+    topology_dir("sample_bolt", """
+import logging
+import os.path
+
+from pyleus.storm import SimpleBolt
+
+log = logging.getLogger(__name__)
+PATH = os.path.join("a", "b")
+
+class SampleBolt(SimpleBolt):
+    OPTIONS = ["limit"]
+
+    def process_tuple(self, tup):
+        self.count = tup.values.count(None)
+        log.info(PATH)
+
+if __name__ == '__main__':
+    logging.basicConfig()
+""", main_class="SampleBolt")
+    assert describe_module("sample_bolt", topology_dir.path) == {
+        "component_type": "bolt",
+        "output_fields": {"default": None},
+        "options": ["limit"],
+    }
+
+
+def test_describe_module_without_main(topology_dir):
+    topology_dir("sample_bolt", """
+from pyleus.storm import SimpleBolt
+
+class SampleBolt(SimpleBolt):
+    OPTIONS = ["limit"]
+""")
+    assert describe_module("sample_bolt", topology_dir.path) is None
+    assert describe_module("missing_bolt", topology_dir.path) is None
+
+
+def test__c3_merge():
+    # class A(object), class B(object), class C(A, B)
+    merged = static_describe._c3_merge(
+        [["A", "object"], ["B", "object"], ["A", "B"]])
+    assert merged == ["A", "B", "object"]
+
+    with pytest.raises(static_describe._Unresolvable):
+        static_describe._c3_merge([["A", "B"], ["B", "A"]])
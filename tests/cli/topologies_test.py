@@ -2,6 +2,7 @@ import pytest
 
 from pyleus.configuration import Configuration, DEFAULTS
 import pyleus.cli.topologies
+from pyleus.cli.topologies import emulate_topology
 from pyleus.cli.topologies import kill_topology
 from pyleus.cli.topologies import list_topologies
 from pyleus.cli.topologies import submit_topology
@@ -78,3 +79,20 @@ def test_list_topologies(configs):
     )
 
     mock_storm_cluster.list.assert_called_once_with()
+
+
+def test_emulate_topology(configs):
+    configs = configs._replace(
+        topology_path="/topology/pyleus_topology.yaml", run_time="2.5")
+    mock_runner = mock.Mock(stats={})
+    mock_runner.run.return_value = 2.5
+
+    with mock.patch.object(pyleus.cli.topologies, 'LocalRunner',
+            return_value=mock_runner, autospec=True) as mock_ctr:
+        with mock.patch.object(pyleus.cli.topologies,
+                'parse_original_topology', autospec=True) as mock_parse:
+            emulate_topology(configs)
+
+    mock_parse.assert_called_once_with("/topology/pyleus_topology.yaml")
+    mock_ctr.assert_called_once_with(mock_parse.return_value, "/topology")
+    mock_runner.run.assert_called_once_with(2.5)
@@ -0,0 +1,52 @@
+import os
+
+from pyleus.cli.venv_cache import venv_cache_key
+from pyleus.cli.venv_cache import VirtualenvCache
+
+
+def _make_venv(path):
+    path.ensure("bin", "python-real").write("#!")
+    path.join("bin", "python").mksymlinkto("python-real")
+    path.ensure("lib", "site-packages", "foo.py").write("x" * 100)
+    return path
+
+
+def test_venv_cache_key(tmpdir):
+    req = tmpdir.join("requirements.txt")
+    req.write("foo==1.0")
+    key = venv_cache_key(str(req), ["bar"], None, False, None)
+
+    assert venv_cache_key(str(req), ["bar"], None, False, None) == key
+    assert venv_cache_key(str(req), ["bar"], None, True, None) != key
+    assert venv_cache_key(None, ["bar"], None, False, None) != key
+
+    req.write("foo==2.0")
+    assert venv_cache_key(str(req), ["bar"], None, False, None) != key
+
+
+def test_fetch_store(tmpdir):
+    cache = VirtualenvCache(str(tmpdir.join("cache")))
+    venv = _make_venv(tmpdir.join("venv"))
+    copy = tmpdir.join("copy")
+
+    assert not cache.fetch("key", str(copy))
+    cache.store("key", str(venv))
+    assert cache.fetch("key", str(copy))
+
+    assert copy.join("lib", "site-packages", "foo.py").read() == "x" * 100
+    assert os.readlink(str(copy.join("bin", "python"))) == "python-real"
+
+
+def test_evict_least_recently_used(tmpdir):
+    cache = VirtualenvCache(str(tmpdir.join("cache")))
+    venv = _make_venv(tmpdir.join("venv"))
+    for key in ["a", "b", "c"]:
+        cache.store(key, str(venv))
+    entry_size = cache._entries()[0][1]
+
+    for key, mtime in [("a", 3), ("b", 1), ("c", 2)]:
+        os.utime(str(tmpdir.join("cache", key)), (mtime, mtime))
+    cache.max_size = 2 * entry_size
+    cache.evict()
+
+    assert sorted(os.listdir(str(tmpdir.join("cache")))) == ["a", "c"]
@@ -132,3 +132,67 @@ class TestVirtualenvProxyMethods(object):
             stderr=self.venv._err_stream,
             err_msg=mock.ANY
         )
+
+    @mock.patch.object(virtualenv_proxy, '_exec_shell_cmd', autospec=True)
+    def test_install(self, mock_cmd):
+        self.venv.install(["Ninja==7.7.7", "fruit"], "foo.txt")
+        mock_cmd.assert_called_once_with(
+            [
+                "{0}/bin/pip".format(VENV_PATH), "install",
+                "Ninja==7.7.7", "fruit", "-r", "foo.txt",
+                "-i", PYPI_URL,
+                '--use-wheel',
+            ],
+            stdout=self.venv._out_stream,
+            stderr=self.venv._err_stream,
+            err_msg=mock.ANY
+        )
+
+    @mock.patch.object(virtualenv_proxy, '_exec_shell_cmd', autospec=True)
+    def test_install_wheelhouse(self, mock_cmd):
+        self.venv._wheelhouse = "/wheels"
+        self.venv.install(["Ninja==7.7.7"])
+        assert mock_cmd.call_args_list == [
+            mock.call(
+                [
+                    "{0}/bin/pip".format(VENV_PATH), "wheel",
+                    "--wheel-dir", "/wheels", "Ninja==7.7.7",
+                    "-i", PYPI_URL,
+                    "--find-links", "/wheels",
+                    '--use-wheel',
+                ],
+                stdout=self.venv._out_stream,
+                stderr=self.venv._err_stream,
+                err_msg=mock.ANY
+            ),
+            mock.call(
+                [
+                    "{0}/bin/pip".format(VENV_PATH), "install",
+                    "Ninja==7.7.7",
+                    "--no-index",
+                    "--find-links", "/wheels",
+                    '--use-wheel',
+                ],
+                stdout=self.venv._out_stream,
+                stderr=self.venv._err_stream,
+                err_msg=mock.ANY
+            ),
+        ]
+
+    @mock.patch.object(virtualenv_proxy, '_exec_shell_cmd', autospec=True)
+    def test_install_offline(self, mock_cmd):
+        self.venv._wheelhouse = "/wheels"
+        self.venv._offline = True
+        self.venv.install(["Ninja==7.7.7"])
+        mock_cmd.assert_called_once_with(
+            [
+                "{0}/bin/pip".format(VENV_PATH), "install",
+                "Ninja==7.7.7",
+                "--no-index",
+                "--find-links", "/wheels",
+                '--use-wheel',
+            ],
+            stdout=self.venv._out_stream,
+            stderr=self.venv._err_stream,
+            err_msg=mock.ANY
+        )
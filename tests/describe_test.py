@@ -0,0 +1,72 @@
+import json
+import sys
+
+import pytest
+
+from pyleus import _describe
+
+
+COMPONENT_MODULE = """
+from pyleus.storm import SimpleBolt
+
+class SampleBolt(SimpleBolt):
+    OUTPUT_FIELDS = ["word"]
+    OPTIONS = ["limit"]
+
+if __name__ == '__main__':
+    SampleBolt().run()
+"""
+
+
+SHARING_MODULE = """
+from pyleus.storm import SimpleBolt
+
+import helper
+{0}
+
+class SampleBolt(SimpleBolt):
+    OPTIONS = helper.OPTIONS
+
+if __name__ == '__main__':
+    SampleBolt().run()
+"""
+
+
+@pytest.fixture
+def modules_dir(tmpdir, monkeypatch):
+    tmpdir.join("sample_bolt.py").write(COMPONENT_MODULE)
+    tmpdir.join("broken_bolt.py").write("import not_a_module\n")
+    tmpdir.join("helper.py").write('OPTIONS = ["limit"]\n')
+    tmpdir.join("mutating_bolt.py").write(
+        SHARING_MODULE.format('helper.OPTIONS.append("other")'))
+    tmpdir.join("sharing_bolt.py").write(SHARING_MODULE.format(""))
+    monkeypatch.syspath_prepend(str(tmpdir))
+    return tmpdir
+
+
+def test_describe(modules_dir):
+    assert _describe.describe("sample_bolt") == {
+        "component_type": "bolt",
+        "output_fields": {"default": ["word"]},
+        "options": ["limit"],
+    }
+
+
+def test_describe_failure(modules_dir):
+    assert _describe.describe("broken_bolt") is None
+    assert _describe.describe("missing_bolt") is None
+
+
+def test_describe_shared_module(modules_dir):
+    assert _describe.describe("mutating_bolt")["options"] == [
+        "limit", "other"]
+    # As if described on its own
+    assert _describe.describe("sharing_bolt")["options"] == ["limit"]
+    assert "helper" not in sys.modules
+
+
+def test_main(modules_dir, capsys):
+    _describe.main(["sample_bolt", "broken_bolt"])
+    descriptions = json.loads(capsys.readouterr()[0])
+    assert descriptions["broken_bolt"] is None
+    assert descriptions["sample_bolt"]["options"] == ["limit"]
@@ -0,0 +1,203 @@
+import asyncio
+import os
+
+import msgpack
+import pytest
+
+from pyleus.compat import BytesIO
+from pyleus.storm import AsyncBolt
+from pyleus.storm import AsyncSpout
+from pyleus.storm import aio
+from pyleus.storm.serializers.msgpack_serializer import MsgpackSerializer
+from pyleus.testing import mock
+
+
+def _tuple_msg(tup_id, values, stream="default"):
+    return {
+        'id': tup_id, 'comp': "comp", 'stream': stream, 'task': 1,
+        'tuple': values,
+    }
+
+
+HEARTBEAT_MSG = {
+    'id': None, 'comp': None, 'stream': '__heartbeat', 'task': -1,
+    'tuple': [],
+}
+
+
+class AsyncComponentTestCase(object):
+
+    INSTANCE_CLS = None
+
+    @pytest.fixture(autouse=True)
+    def pipe_fixture(self, request):
+        read_fd, self.write_fd = os.pipe()
+        self.output = BytesIO()
+        input_stream = mock.Mock()
+        input_stream.fileno.return_value = read_fd
+
+        self.instance = self.INSTANCE_CLS(
+            input_stream=input_stream, output_stream=self.output)
+        self.instance._serializer = MsgpackSerializer(
+            input_stream, self.output)
+        self.instance.options = {}
+
+        def close_pipe():
+            os.close(read_fd)
+            if self.write_fd is not None:
+                os.close(self.write_fd)
+
+        request.addfinalizer(close_pipe)
+
+    def _send(self, *msgs):
+        os.write(self.write_fd, b"".join(msgpack.packb(m) for m in msgs))
+
+    def _close(self):
+        os.close(self.write_fd)
+        self.write_fd = None
+
+    def _sent(self):
+        unpacker = msgpack.Unpacker()
+        unpacker.feed(self.output.getvalue())
+        return list(unpacker)
+
+    def _run(self):
+        with mock.patch.object(
+                self.instance, '_init_component', return_value=({}, {})):
+            self.instance.setup_component()
+        self.instance.run_component()
+
+
+class TestAsyncBolt(AsyncComponentTestCase):
+
+    class INSTANCE_CLS(AsyncBolt):
+
+        def initialize(self):
+            self.processed = []
+            self.emitted = 0
+            self.second_started = asyncio.Event()
+
+        async def process_tuple(self, tup):
+            if tup.id == "t2":
+                self.second_started.set()
+            else:
+                # The first tuple is still in flight when the second starts
+                await self.second_started.wait()
+
+            task_ids = self.emit(tup.values, anchors=[tup])
+            # Storm answers with the task ids
+            self.test_case._send([self.emitted])
+            self.emitted += 1
+            self.processed.append((tup.id, await task_ids))
+
+            if len(self.processed) == 2:
+                self.test_case._close()
+
+    def test_run(self):
+        self.instance.test_case = self
+        self._send(HEARTBEAT_MSG, _tuple_msg("t1", [1]), _tuple_msg("t2", [2]))
+
+        self._run()
+
+        assert sorted(self.instance.processed) == [("t1", [1]), ("t2", [0])]
+        sent = self._sent()
+        assert sent[0] == {'command': 'sync'}
+        assert [m['id'] for m in sent if m['command'] == 'ack'] == ["t2", "t1"]
+        assert [m['tuple'] for m in sent if m['command'] == 'emit'] == [
+            [2], [1]]
+
+    def test_max_pending(self):
+        self.instance.options = {'max_pending': 3}
+        self._send(_tuple_msg("t1", [1]))
+        self._close()
+
+        self._run()
+
+        assert self.instance._max_pending == 3
+
+    def test_max_pending_across_timeout(self):
+        self.instance.options = {'max_pending': 1}
+        in_flight = []
+        processed = []
+
+        async def process_tuple(tup):
+            in_flight.append(len(self.instance._tasks))
+            if tup.id == "t1":
+                # Long enough for the reader to time out several times
+                await asyncio.sleep(0.1)
+            processed.append(tup.id)
+            if len(processed) == 3:
+                self._close()
+
+        self._send(
+            _tuple_msg("t1", [1]), _tuple_msg("t2", [2]), HEARTBEAT_MSG,
+            _tuple_msg("t3", [3]))
+
+        with mock.patch.object(aio, 'PENDING_WAIT_TIMEOUT', 0.01):
+            with mock.patch.object(
+                    self.instance, 'process_tuple', side_effect=process_tuple):
+                self._run()
+
+        assert in_flight == [1, 1, 1]
+        assert processed == ["t1", "t2", "t3"]
+        sent = self._sent()
+        assert {'command': 'sync'} in sent
+        assert [m['id'] for m in sent if m['command'] == 'ack'] == [
+            "t1", "t2", "t3"]
+
+    def test_exception(self):
+        class MyException(Exception): pass
+
+        with mock.patch.object(
+                self.instance, 'process_tuple', side_effect=MyException()):
+            self._send(_tuple_msg("t1", [1]))
+
+            with pytest.raises(MyException):
+                self._run()
+
+        assert self._sent() == [{'command': 'fail', 'id': "t1"}]
+
+
+class TestAsyncSpout(AsyncComponentTestCase):
+
+    class INSTANCE_CLS(AsyncSpout):
+
+        def initialize(self):
+            self.acked = []
+
+        async def next_tuple(self):
+            task_ids = self.emit((1,), tup_id="t1")
+            self.test_case._send([7])
+            self.task_ids = await task_ids
+
+        async def ack(self, tup_id):
+            self.acked.append(tup_id)
+            self.test_case._close()
+
+    def test_run(self):
+        self.instance.test_case = self
+        self._send({'command': 'next'}, {'command': 'ack', 'id': "t1"})
+
+        self._run()
+
+        assert self.instance.task_ids == [7]
+        assert self.instance.acked == ["t1"]
+        assert self._sent() == [
+            {'command': 'emit', 'tuple': [1], 'id': "t1"},
+            {'command': 'sync'},
+            {'command': 'sync'},
+        ]
+
+    def test_emit_no_task_ids(self):
+        async def next_tuple():
+            assert await self.instance.emit((1,), need_task_ids=False) is None
+            assert await self.instance.emit_many(
+                [(1,), (2,)], need_task_ids=False) is None
+            self._close()
+
+        with mock.patch.object(
+                self.instance, 'next_tuple', side_effect=next_tuple):
+            self._send({'command': 'next'})
+            self._run()
+
+        assert self._sent()[-1] == {'command': 'sync'}
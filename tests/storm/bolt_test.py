@@ -1,9 +1,12 @@
 from collections import namedtuple
 import contextlib
 
+import msgpack
 import pytest
 
-from pyleus.storm import StormTuple, Bolt, SimpleBolt
+from pyleus.storm import StormTuple, Bolt, SimpleBolt, BatchBolt, LazyValues
+from pyleus.storm import StormWentAwayError
+from pyleus.storm.serializers.serializer import Serializer
 from pyleus.testing import ComponentTestCase, mock
 
 
@@ -26,11 +29,13 @@ class TestBolt(ComponentTestCase):
         with mock.patch.multiple(self.instance,
                 process_tuple=mock.DEFAULT,
                 ack=mock.DEFAULT,
-                send_command=mock.DEFAULT) as values:
+                send_command=mock.DEFAULT,
+                flush=mock.DEFAULT) as values:
 
             self.instance._process_tuple(heartbeat)
 
             values['send_command'].assert_called_once_with('sync')
+            values['flush'].assert_called_once_with()
             assert not values['process_tuple'].called
             assert not values['ack'].called
 
@@ -110,6 +115,32 @@ class TestBolt(ComponentTestCase):
         _, command_dict = mock_send_command.call_args[0]
         assert command_dict['tuple'].__class__ == tuple
 
+    def test_emit_with_lazy_values(self):
+        values = LazyValues(msgpack.packb([1, 2, 3]))
+
+        expected_command_dict = {
+            'anchors': [],
+            'tuple': values,
+        }
+
+        with self._test_emit_helper(expected_command_dict) as mock_send_command:
+            self.instance.emit(values)
+
+        _, command_dict = mock_send_command.call_args[0]
+        assert command_dict['tuple'] is values
+        assert not values.is_decoded
+
+    def test_emit_topology_default_no_taskid(self):
+        self.instance._need_task_ids = False
+        expected_command_dict = {
+            'anchors': [],
+            'tuple': (1, 2, 3),
+            'need_task_ids': False,
+        }
+
+        with self._test_emit_helper_no_taskid(expected_command_dict):
+            self.instance.emit((1, 2, 3))
+
     def test_emit_with_stream(self):
         expected_command_dict = {
             'anchors': [],
@@ -145,6 +176,39 @@ class TestBolt(ComponentTestCase):
         with pytest.raises(AssertionError):
             self.instance.emit("not-a-list-or-tuple")
 
+    def test_emit_many(self):
+        anchors = [mock.Mock(id=i) for i in (4, 5)]
+
+        with mock.patch.object(self.instance, 'read_taskid', autospec=True) as mock_read_taskid:
+            with mock.patch.object(self.instance, 'send_commands', autospec=True) as mock_send_commands:
+                mock_read_taskid.side_effect = [[1], [2]]
+                task_ids = self.instance.emit_many(
+                    [(1, 2), [3, 4]], stream=mock.sentinel.stream,
+                    anchors=anchors)
+
+        mock_send_commands.assert_called_once_with('emit', [
+            {'anchors': [4, 5], 'stream': mock.sentinel.stream, 'tuple': (1, 2)},
+            {'anchors': [4, 5], 'stream': mock.sentinel.stream, 'tuple': (3, 4)},
+        ])
+        assert task_ids == [[1], [2]]
+
+    def test_emit_many_no_taskid(self):
+        with mock.patch.object(self.instance, 'read_taskid', autospec=True) as mock_read_taskid:
+            with mock.patch.object(self.instance, 'send_commands', autospec=True) as mock_send_commands:
+                task_ids = self.instance.emit_many(
+                    [(1, 2), (3, 4)], need_task_ids=False)
+
+        mock_send_commands.assert_called_once_with('emit', [
+            {'anchors': [], 'tuple': (1, 2), 'need_task_ids': False},
+            {'anchors': [], 'tuple': (3, 4), 'need_task_ids': False},
+        ])
+        assert mock_read_taskid.call_count == 0
+        assert task_ids is None
+
+    def test_emit_many_with_bad_values(self):
+        with pytest.raises(AssertionError):
+            self.instance.emit_many([(1, 2), "not-a-list-or-tuple"])
+
 
 class TestSimpleBolt(ComponentTestCase):
 
@@ -205,3 +269,186 @@ class TestSimpleBolt(ComponentTestCase):
 
         with pytest.raises(MyException):
             self.instance._process_tuple(self.TUPLE)
+
+
+class TestSimpleBoltAckCoalescing(ComponentTestCase):
+
+    INSTANCE_CLS = SimpleBolt
+
+    @pytest.fixture(autouse=True)
+    def setup_mocks(self, request):
+        patches = [
+            mock.patch.object(
+                self.instance, '_serializer', autospec=Serializer),
+            mock.patch.object(
+                self.instance, '_init_component', return_value=({}, {})),
+            mock.patch('time.time', return_value=0),
+        ]
+        for patch in patches:
+            patch.start()
+            request.addfinalizer(patch.stop)
+
+        self.instance.options = {}
+
+    def _send_msgs_calls(self):
+        return self.instance._serializer.send_msgs.call_args_list
+
+    def test_disabled_by_default(self):
+        self.instance.setup_component()
+
+        self.instance.ack(mock.Mock(id=1))
+
+        self.instance._serializer.send_msg.assert_called_once_with(
+            {'command': 'ack', 'id': 1})
+        assert not self.instance._serializer.send_msgs.called
+
+    def test_batch_size(self):
+        self.instance.options = {'ack_batch_size': 3}
+        self.instance.setup_component()
+
+        self.instance.ack(mock.Mock(id=1))
+        self.instance.fail(mock.Mock(id=2))
+        assert not self.instance._serializer.send_msgs.called
+
+        self.instance.ack(mock.Mock(id=3))
+        self.instance._serializer.send_msgs.assert_called_once_with([
+            {'command': 'ack', 'id': 1},
+            {'command': 'fail', 'id': 2},
+            {'command': 'ack', 'id': 3},
+        ])
+        assert not self.instance._serializer.send_msg.called
+
+    def test_max_delay(self):
+        self.instance.ACK_BATCH_SIZE = 100
+        self.instance.ACK_MAX_DELAY_MS = 10
+        self.instance.setup_component()
+
+        self.instance.ack(mock.Mock(id=1))
+        assert not self.instance._serializer.send_msgs.called
+
+        with mock.patch('time.time', return_value=0.01):
+            self.instance.ack(mock.Mock(id=2))
+
+        self.instance._serializer.send_msgs.assert_called_once_with([
+            {'command': 'ack', 'id': 1},
+            {'command': 'ack', 'id': 2},
+        ])
+
+    def test_flush(self):
+        self.instance.ACK_BATCH_SIZE = 100
+        self.instance.setup_component()
+
+        self.instance.ack(mock.Mock(id=1))
+        self.instance.flush()
+
+        assert self.instance._serializer.method_calls == [
+            mock.call.send_msgs([{'command': 'ack', 'id': 1}]),
+            mock.call.flush(),
+        ]
+
+
+class TestBatchBolt(ComponentTestCase):
+
+    INSTANCE_CLS = BatchBolt
+
+    TICK = StormTuple(None, '__system', '__tick', None, None)
+    HEARTBEAT = StormTuple(None, None, '__heartbeat', -1, [])
+
+    @pytest.fixture(autouse=True)
+    def setup_mocks(self, request):
+        patches = mock.patch.multiple(
+            self.instance, process_batch=mock.DEFAULT,
+            process_tick=mock.DEFAULT, read_tuple=mock.DEFAULT,
+            command_available=mock.DEFAULT, send_commands=mock.DEFAULT,
+            ack=mock.DEFAULT, sync=mock.DEFAULT)
+
+        request.addfinalizer(lambda: patches.__exit__(None, None, None))
+        self.mocks = patches.__enter__()
+        self.mocks['process_batch'].return_value = None
+
+        self.instance._batch_size = 3
+
+    def _tuple(self, tup_id):
+        return StormTuple(tup_id, "comp", "stream", 1, [tup_id])
+
+    def test_setup_component_options(self):
+        self.instance.options = {'batch_size': 7, 'batch_max_wait_ms': 20}
+        with mock.patch.object(
+                self.instance, '_init_component', return_value=({}, {})):
+            self.instance.setup_component()
+
+        assert self.instance._batch_size == 7
+        assert self.instance._batch_max_wait == 0.02
+
+    def test_read_batch_full(self):
+        tuples = [self._tuple(i) for i in range(4)]
+        self.mocks['read_tuple'].side_effect = tuples
+        self.mocks['command_available'].return_value = True
+
+        assert self.instance._read_batch() == (tuples[:3], None)
+
+    def test_read_batch_no_more_tuples(self):
+        tup = self._tuple(1)
+        self.mocks['read_tuple'].side_effect = [tup]
+        self.mocks['command_available'].return_value = False
+
+        assert self.instance._read_batch() == ([tup], None)
+        self.mocks['command_available'].assert_called_once_with(0)
+
+    def test_read_batch_heartbeat(self):
+        tup = self._tuple(1)
+        self.mocks['read_tuple'].side_effect = [self.HEARTBEAT, tup]
+        self.mocks['command_available'].return_value = False
+
+        assert self.instance._read_batch() == ([tup], None)
+        self.mocks['sync'].assert_called_once_with()
+
+    def test_read_batch_tick(self):
+        tup = self._tuple(1)
+        self.mocks['read_tuple'].side_effect = [tup, self.TICK]
+        self.mocks['command_available'].return_value = True
+
+        assert self.instance._read_batch() == ([tup], self.TICK)
+
+    def test_process_batch_ack(self):
+        tuples = [self._tuple(i) for i in range(3)]
+
+        self.instance._process_batch(tuples)
+
+        self.mocks['process_batch'].assert_called_once_with(tuples)
+        self.mocks['send_commands'].assert_called_once_with(
+            'ack', [{'id': 0}, {'id': 1}, {'id': 2}])
+
+    def test_process_batch_fail_some(self):
+        tuples = [self._tuple(i) for i in range(3)]
+        self.mocks['process_batch'].return_value = [tuples[1]]
+
+        self.instance._process_batch(tuples)
+
+        assert self.mocks['send_commands'].call_args_list == [
+            mock.call('ack', [{'id': 0}, {'id': 2}]),
+            mock.call('fail', [{'id': 1}]),
+        ]
+
+    def test_process_batch_exception(self):
+        class MyException(Exception): pass
+        tuples = [self._tuple(i) for i in range(2)]
+        self.mocks['process_batch'].side_effect = MyException()
+
+        with pytest.raises(MyException):
+            self.instance._process_batch(tuples)
+
+        self.mocks['send_commands'].assert_called_once_with(
+            'fail', [{'id': 0}, {'id': 1}])
+
+    def test_run_component(self):
+        tup = self._tuple(1)
+        self.mocks['read_tuple'].side_effect = [
+            tup, self.TICK, StormWentAwayError()]
+        self.mocks['command_available'].return_value = True
+
+        self.instance.run_component()
+
+        self.mocks['process_batch'].assert_called_once_with([tup])
+        self.mocks['process_tick'].assert_called_once_with()
+        self.mocks['ack'].assert_called_once_with(self.TICK)
@@ -1,8 +1,14 @@
 import logging.config
+import os
 import os.path
+import threading
+
+import msgpack
 
 from pyleus.storm import StormTuple
 from pyleus.storm.component import DEFAULT_LOGGING_CONFIG_PATH
+from pyleus.storm.component import TaskIdsFuture
+from pyleus.storm.serializers.msgpack_serializer import MsgpackSerializer
 from pyleus.storm.serializers.serializer import Serializer
 from pyleus.testing import ComponentTestCase, mock, builtins
 
@@ -14,6 +20,8 @@ class TestComponent(ComponentTestCase):
         taskid_msg = ["this", "is", "a", "taskid", "list"]
 
         assert self.instance._msg_is_command(command_msg)
+        assert self.instance._msg_is_command(
+            StormTuple("id", "comp", "stream", "task", "tuple"))
         assert not self.instance._msg_is_command(taskid_msg)
 
     def test__msg_is_taskid(self):
@@ -87,6 +95,87 @@ class TestComponent(ComponentTestCase):
         assert self.instance.read_taskid() == next_taskid
         assert len(self.instance._pending_taskids) == 2
 
+    def test_command_available_pending(self):
+        self.instance._pending_commands.append({})
+        with mock.patch.object(
+                self.instance, '_serializer', autospec=Serializer):
+            assert self.instance.command_available()
+            assert not self.instance._serializer.input_available.called
+
+    def test_command_available(self):
+        with mock.patch.object(
+                self.instance, '_serializer', autospec=Serializer):
+            self.instance._serializer.input_available.return_value = False
+            assert not self.instance.command_available(0.5)
+            self.instance._serializer.input_available.assert_called_once_with(
+                0.5)
+
+    def test_initialize_task_ids(self):
+        pyleus_config = {'need_task_ids': False, 'lazy_task_ids': True}
+        with mock.patch.object(self.instance, 'pyleus_config', pyleus_config):
+            self.instance.initialize_task_ids()
+
+        assert self.instance._default_need_task_ids(None) is False
+        assert self.instance._default_need_task_ids(True) is True
+        assert self.instance._lazy_task_ids
+
+    def test_initialize_task_ids_default(self):
+        with mock.patch.object(self.instance, 'pyleus_config', {}):
+            self.instance.initialize_task_ids()
+
+        assert self.instance._default_need_task_ids(None) is True
+        assert not self.instance._lazy_task_ids
+
+    def test_emit_task_ids_lazy(self):
+        self.instance._lazy_task_ids = True
+        with mock.patch.object(
+                self.instance, '_serializer', autospec=Serializer):
+            self.instance._serializer.has_buffered_msgs.return_value = True
+            self.instance._serializer.read_msg.side_effect = [[1], [2]]
+
+            first = self.instance._emit_task_ids()
+            second = self.instance._emit_task_ids()
+            assert isinstance(first, TaskIdsFuture)
+            assert not self.instance._serializer.read_msg.called
+
+            # Resolving a future resolves all the previous ones
+            assert second == [2]
+            assert first.done()
+            assert list(first) == [1]
+            assert len(first) == 1
+            assert first[0] == 1
+
+    def test_emit_task_ids_not_lazy(self):
+        with mock.patch.object(
+                self.instance, 'read_taskid', return_value=[1]):
+            assert self.instance._emit_task_ids() == [1]
+
+    def test_read_command_resolves_task_ids_futures(self):
+        self.instance._lazy_task_ids = True
+        with mock.patch.object(
+                self.instance, '_serializer', autospec=Serializer):
+            self.instance._serializer.has_buffered_msgs.return_value = True
+            self.instance._serializer.read_msg.side_effect = [
+                [1], [2], {'command': "next"}]
+
+            future = self.instance._emit_task_ids()
+            assert self.instance.read_command() == {'command': "next"}
+
+        assert future.result() == [1]
+        assert list(self.instance._pending_taskids) == [[2]]
+
+    def test_read_taskid_resolves_task_ids_futures(self):
+        self.instance._lazy_task_ids = True
+        with mock.patch.object(
+                self.instance, '_serializer', autospec=Serializer):
+            self.instance._serializer.has_buffered_msgs.return_value = True
+            self.instance._serializer.read_msg.side_effect = [[1], [2]]
+
+            future = self.instance._emit_task_ids()
+            assert self.instance.read_taskid() == [2]
+
+        assert future.result() == [1]
+
     def test_read_tuple(self):
         command_dict = {
             'id': "id",
@@ -106,6 +195,13 @@ class TestComponent(ComponentTestCase):
         assert isinstance(storm_tuple, StormTuple)
         assert storm_tuple == expected_storm_tuple
 
+    def test_read_tuple_already_built(self):
+        storm_tuple = StormTuple("id", "comp", "stream", "task", "tuple")
+
+        with mock.patch.object(
+                self.instance, 'read_command', return_value=storm_tuple):
+            assert self.instance.read_tuple() is storm_tuple
+
     def test__create_pidfile(self):
         with mock.patch.object(builtins, 'open', autospec=True) as mock_open:
             self.instance._create_pidfile("pid_dir", "pid")
@@ -166,6 +262,147 @@ class TestComponent(ComponentTestCase):
                 'command': "test",
             })
 
+    def test_send_commands(self):
+        with mock.patch.object(
+                self.instance, '_serializer', autospec=Serializer):
+            self.instance.send_commands('test', [{'a': 1}, {'a': 2}])
+
+            self.instance._serializer.send_msgs.assert_called_once_with([
+                {'command': "test", 'a': 1},
+                {'command': "test", 'a': 2},
+            ])
+
+    def test_flush(self):
+        with mock.patch.object(
+                self.instance, '_serializer', autospec=Serializer):
+            self.instance.flush()
+
+            self.instance._serializer.flush.assert_called_once_with()
+
+    def test_read_command_flushes_output(self):
+        with mock.patch.object(
+                self.instance, '_serializer', autospec=Serializer):
+            self.instance._serializer.has_buffered_msgs.return_value = False
+            self.instance._serializer.read_msg.return_value = {}
+            self.instance.read_command()
+
+            self.instance._serializer.flush.assert_called_once_with()
+
+    def test_read_command_buffered_no_flush(self):
+        with mock.patch.object(
+                self.instance, '_serializer', autospec=Serializer):
+            self.instance._serializer.has_buffered_msgs.return_value = True
+            self.instance._serializer.read_msg.return_value = {}
+            self.instance.read_command()
+
+            assert not self.instance._serializer.flush.called
+
+    def test_read_taskid_flushes_output(self):
+        with mock.patch.object(
+                self.instance, '_serializer', autospec=Serializer):
+            self.instance._serializer.has_buffered_msgs.return_value = False
+            self.instance._serializer.read_msg.return_value = []
+            self.instance.read_taskid()
+
+            self.instance._serializer.flush.assert_called_once_with()
+
+    def test_read_taskid_buffered_no_flush(self):
+        with mock.patch.object(
+                self.instance, '_serializer', autospec=Serializer):
+            self.instance._serializer.has_buffered_msgs.return_value = True
+            self.instance._serializer.read_msg.return_value = []
+            self.instance.read_taskid()
+
+            assert not self.instance._serializer.flush.called
+
+    def _storm_pipe_serializer(self, request):
+        """Use a msgpack serializer with output buffering on a pipe, Storm
+        answering every emit with task ids once it sees it written.
+        """
+        read_fd, write_fd = os.pipe()
+        request.addfinalizer(lambda: (os.close(read_fd), os.close(write_fd)))
+        self.mock_input_stream.fileno.return_value = read_fd
+
+        def write(data):
+            unpacker = msgpack.Unpacker(raw=False)
+            unpacker.feed(data)
+            for msg in unpacker:
+                if msg["command"] == "emit":
+                    os.write(write_fd, msgpack.packb([42]))
+        self.mock_output_stream.write.side_effect = write
+
+        self.instance._serializer = MsgpackSerializer(
+            self.mock_input_stream, self.mock_output_stream)
+        self.instance._serializer.enable_output_buffering(1024)
+        return write_fd
+
+    def _run_with_timeout(self, func):
+        result = []
+        thread = threading.Thread(target=lambda: result.append(func()))
+        thread.daemon = True
+        thread.start()
+        thread.join(5)
+        assert result, "Deadlock: blocked reading with buffered output"
+        return result[0]
+
+    def test_read_taskid_several_commands_per_read(self, request):
+        write_fd = self._storm_pipe_serializer(request)
+        commands = [{"id": str(i), "tuple": [i]} for i in range(3)]
+        os.write(write_fd, b"".join(msgpack.packb(c) for c in commands))
+
+        assert self.instance.read_command() == commands[0]
+        self.instance.send_command("emit", {"tuple": [0]})
+        assert self._run_with_timeout(self.instance.read_taskid) == [42]
+        assert list(self.instance._pending_commands) == commands[1:]
+
+    def test_read_command_several_taskids_per_read(self, request):
+        write_fd = self._storm_pipe_serializer(request)
+        first = {"id": "0", "tuple": [0]}
+        os.write(write_fd, msgpack.packb(first) + msgpack.packb([1]) +
+                 msgpack.packb([2]))
+        assert self.instance.read_command() == first
+        self.instance.send_command("emit", {"tuple": [0]})
+
+        # Task ids are queued, then the emit must be flushed before blocking
+        command = {"id": "3", "tuple": [3]}
+        self.mock_output_stream.flush.side_effect = lambda: os.write(
+            write_fd, msgpack.packb(command))
+        assert self._run_with_timeout(self.instance.read_command) == command
+        assert list(self.instance._pending_taskids) == [[1], [2], [42]]
+
+    def test_initialize_serializer_read_buffer_size(self):
+        pyleus_config = {
+            'serializer': "json",
+            'read_buffer_size': 4096,
+        }
+        with mock.patch.object(self.instance, 'pyleus_config', pyleus_config):
+            self.instance.initialize_serializer()
+
+        assert self.instance._serializer._read_buffer_size == 4096
+
+    def test_initialize_output_buffering(self):
+        pyleus_config = {
+            'output_buffering': True,
+            'output_buffer_size': 1024,
+            'output_buffer_max_messages': 42,
+        }
+        with mock.patch.object(
+                self.instance, '_serializer', autospec=Serializer):
+            with mock.patch.object(
+                    self.instance, 'pyleus_config', pyleus_config):
+                self.instance.initialize_output_buffering()
+
+            self.instance._serializer.enable_output_buffering.\
+                assert_called_once_with(1024, 42)
+
+    def test_initialize_output_buffering_disabled(self):
+        with mock.patch.object(
+                self.instance, '_serializer', autospec=Serializer):
+            with mock.patch.object(self.instance, 'pyleus_config', {}):
+                self.instance.initialize_output_buffering()
+
+            assert not self.instance._serializer.enable_output_buffering.called
+
     @mock.patch.object(logging.config, 'fileConfig')
     def test_initialize_logging(self, fileConfig):
         pyleus_config = {
@@ -190,3 +427,27 @@ class TestComponent(ComponentTestCase):
                 self.instance.initialize_logging()
 
         assert not fileConfig.called
+
+    def test_state(self, tmpdir):
+        pyleus_config = {'state_dir': str(tmpdir), 'state_backend': 'sqlite'}
+        context = {'task->component': {'3': "counter"}, 'taskid': 3}
+        with mock.patch.multiple(
+                self.instance, pyleus_config=pyleus_config,
+                conf={'topology.name': "topo"}, context=context):
+            self.instance.state["a"] = 1
+            self.instance.close_state()
+
+            assert tmpdir.join("topo", "counter-3.sqlite").check()
+            assert self.instance.state["a"] == 1
+            self.instance.close_state()
+
+    def test_read_tuple_tick_checkpoints_state(self):
+        tick = StormTuple(None, '__system', '__tick', None, None)
+        state = mock.Mock()
+
+        with mock.patch.object(self.instance, '_state', state):
+            with mock.patch.object(
+                    self.instance, 'read_command', return_value=tick):
+                self.instance.read_tuple()
+
+            state.checkpoint.assert_called_once_with()
@@ -0,0 +1,219 @@
+from concurrent.futures import Future
+import threading
+import time
+
+import pytest
+
+from pyleus.storm import ConcurrentBolt
+from pyleus.storm import StormTuple
+from pyleus.storm import StormWentAwayError
+from pyleus.storm import concurrent_bolt
+from pyleus.storm.concurrent_bolt import DEFAULT_MAX_PENDING
+from pyleus.storm.serializers.serializer import Serializer
+from pyleus.testing import ComponentTestCase, mock
+
+
+class TestConcurrentBolt(ComponentTestCase):
+
+    INSTANCE_CLS = ConcurrentBolt
+
+    HEARTBEAT = StormTuple(None, None, '__heartbeat', -1, [])
+    TICK = StormTuple(None, '__system', '__tick', None, None)
+
+    @pytest.fixture(autouse=True)
+    def setup_mocks(self, request):
+        patch = mock.patch.object(
+            self.instance, '_serializer', autospec=Serializer)
+        patch.start()
+        request.addfinalizer(patch.stop)
+
+        self.instance.options = {}
+
+    def _tuple(self, tup_id):
+        return StormTuple(tup_id, "comp", "stream", 1, [tup_id])
+
+    def _sent_msgs(self):
+        return [c[1][0] for c in self.instance._serializer.send_msg.mock_calls]
+
+    def _setup(self, conf):
+        with mock.patch.object(
+                self.instance, '_init_component', return_value=(conf, {})):
+            self.instance.setup_component()
+
+    def test_setup_component_default_max_pending(self):
+        self._setup({})
+        assert self.instance._max_pending == DEFAULT_MAX_PENDING
+
+    def test_setup_component_conf_max_pending(self):
+        self._setup({'topology.shellbolt.max.pending': 42})
+        assert self.instance._max_pending == 42
+
+    def test_setup_component_options(self):
+        self.instance.options = {'max_workers': 3, 'max_pending': 7}
+        self._setup({'topology.shellbolt.max.pending': 42})
+        assert self.instance._max_workers == 3
+        assert self.instance._max_pending == 7
+
+    def test_emit_not_concurrent(self):
+        self.instance._serializer.has_buffered_msgs.return_value = False
+        self.instance._serializer.read_msg.return_value = [3]
+
+        assert self.instance.emit((1,)) == [3]
+        assert not self.instance._taskid_waiters
+
+    def test_emit_taskids_routing(self):
+        self.instance._concurrent = True
+
+        self.instance.send_command('emit', {'tuple': (1,)})
+        self.instance.send_command(
+            'emit', {'tuple': (2,), 'need_task_ids': False})
+        self.instance.send_commands('emit', [{'tuple': (3,)}])
+        assert len(self.instance._taskid_waiters) == 2
+
+        self.instance._resolve_taskids([4])
+        self.instance._resolve_taskids([5])
+
+        assert self.instance.read_taskid() == [4]
+        assert self.instance.read_taskid() == [5]
+        assert not self.instance._taskid_waiters
+
+    def test_cancel_taskid_waiters(self):
+        self.instance._concurrent = True
+        self.instance.send_command('emit', {'tuple': (1,)})
+
+        self.instance._cancel_taskid_waiters()
+
+        with pytest.raises(StormWentAwayError):
+            self.instance.read_taskid()
+
+    def test_tuple_done_in_order(self):
+        futures = [Future(), Future()]
+        tuples = [self._tuple(1), self._tuple(2)]
+        self.instance._in_flight.extend(zip(tuples, futures))
+
+        futures[1].set_result(None)
+        self.instance._tuple_done(futures[1])
+        assert not self.instance._serializer.send_msg.called
+
+        futures[0].set_result(None)
+        self.instance._tuple_done(futures[0])
+        assert self._sent_msgs() == [
+            {'command': 'ack', 'id': 1},
+            {'command': 'ack', 'id': 2},
+        ]
+        assert not self.instance._in_flight
+
+    def test_tuple_done_unordered(self):
+        self.instance._ordered = False
+        futures = [Future(), Future()]
+        tuples = [self._tuple(1), self._tuple(2)]
+        self.instance._in_flight.extend(zip(tuples, futures))
+
+        futures[1].set_result(None)
+        self.instance._tuple_done(futures[1])
+        assert self._sent_msgs() == [{'command': 'ack', 'id': 2}]
+        assert list(self.instance._in_flight) == [(tuples[0], futures[0])]
+
+    def test_tuple_done_exception(self):
+        class MyException(Exception): pass
+        future = Future()
+        self.instance._in_flight.append((self._tuple(1), future))
+
+        future.set_exception(MyException())
+        self.instance._tuple_done(future)
+
+        assert self._sent_msgs() == [{'command': 'fail', 'id': 1}]
+        with pytest.raises(MyException):
+            self.instance._check_failure()
+
+    def test_run_component(self):
+        tuples = [self._tuple(1), self._tuple(2)]
+        self.instance._serializer.read_msg.side_effect = [
+            tuples[0], self.HEARTBEAT, self.TICK, tuples[1],
+            StormWentAwayError()]
+
+        with mock.patch.multiple(
+                self.instance, process_tuple=mock.DEFAULT,
+                process_tick=mock.DEFAULT) as values:
+            self.instance.run_component()
+            self.instance._executor.shutdown(wait=True)
+
+        assert values['process_tuple'].call_count == 2
+        values['process_tick'].assert_called_once_with()
+        acks = [msg['id'] for msg in self._sent_msgs()
+                if msg['command'] == 'ack']
+        assert acks == [1, None, 2]
+        assert {'command': 'sync'} in self._sent_msgs()
+
+    def test_run_component_emit_from_worker(self):
+        def process_tuple(tup):
+            self.instance.emit(tup.values)
+
+        msgs = iter([self._tuple(1), [7]])
+
+        def read_msg():
+            msg = next(msgs, None)
+            if msg is None:
+                raise StormWentAwayError()
+            if msg == [7]:
+                # Storm sends task ids only after receiving the emit
+                deadline = time.time() + 5
+                while not self.instance._taskid_waiters:
+                    assert time.time() < deadline
+                    time.sleep(0.001)
+            return msg
+
+        self.instance._serializer.read_msg.side_effect = read_msg
+
+        with mock.patch.object(
+                self.instance, 'process_tuple', side_effect=process_tuple):
+            self.instance.run_component()
+            self.instance._executor.shutdown(wait=True)
+
+        assert self._sent_msgs()[-1] == {'command': 'ack', 'id': 1}
+
+    def test_run_component_max_pending_across_timeout(self):
+        self.instance._max_pending = 1
+        release = threading.Event()
+        processed = []
+
+        def process_tuple(tup):
+            release.wait(5)
+            processed.append(tup.id)
+
+        msgs = iter([
+            self._tuple(1), self._tuple(2), self.HEARTBEAT, self._tuple(3)])
+        in_flight = []
+
+        def read_msg():
+            # Every read after the first one follows a wait timeout
+            in_flight.append(len(self.instance._in_flight))
+            msg = next(msgs, None)
+            if msg is None:
+                release.set()
+                deadline = time.time() + 5
+                while len(processed) < 3:
+                    assert time.time() < deadline
+                    time.sleep(0.001)
+                raise StormWentAwayError()
+            return msg
+
+        self.instance._serializer.read_msg.side_effect = read_msg
+
+        try:
+            with mock.patch.object(
+                    concurrent_bolt, 'PENDING_WAIT_TIMEOUT', 0.01):
+                with mock.patch.object(
+                        self.instance, 'process_tuple',
+                        side_effect=process_tuple):
+                    self.instance.run_component()
+                    self.instance._executor.shutdown(wait=True)
+        finally:
+            release.set()
+
+        assert max(in_flight) == 1
+        assert processed == [1, 2, 3]
+        assert {'command': 'sync'} in self._sent_msgs()
+        acks = [msg['id'] for msg in self._sent_msgs()
+                if msg['command'] == 'ack']
+        assert acks == [1, 2, 3]
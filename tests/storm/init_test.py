@@ -1,4 +1,8 @@
-from pyleus.storm import StormTuple, is_tick
+import msgpack
+import pytest
+
+from pyleus.storm import LazyValues, StormTuple, is_tick
+from pyleus.testing import mock
 
 
 class TestStormUtilFunctions(object):
@@ -12,3 +16,48 @@ class TestStormUtilFunctions(object):
         assert not is_tick(tup)
         tup = StormTuple(None, None, '__tick', None, None)
         assert not is_tick(tup)
+
+
+class TestLazyValues(object):
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.values = LazyValues(msgpack.packb([1, "foo", [2, 3]]))
+
+    def test_not_decoded_on_creation(self):
+        assert not self.values.is_decoded
+
+    def test_getitem_decodes_once(self):
+        assert self.values[1] == "foo"
+        assert self.values.is_decoded
+
+        with mock.patch.object(msgpack, 'unpackb') as mock_unpackb:
+            assert self.values[-1] == [2, 3]
+            assert self.values[0] == 1
+        assert not mock_unpackb.called
+
+    def test_getitem_out_of_range(self):
+        with pytest.raises(IndexError):
+            self.values[3]
+        with pytest.raises(IndexError):
+            self.values[-4]
+
+    def test_getitem_slice(self):
+        assert self.values[:2] == [1, "foo"]
+        assert self.values.is_decoded
+
+    def test_sequence_protocol(self):
+        first, second, third = self.values
+        assert (first, second, third) == (1, "foo", [2, 3])
+        assert len(self.values) == 3
+        assert self.values.is_decoded
+
+    def test_eq(self):
+        assert self.values == [1, "foo", [2, 3]]
+        assert self.values == (1, "foo", [2, 3])
+        assert self.values == LazyValues(msgpack.packb([1, "foo", [2, 3]]))
+        assert self.values != [1, "foo"]
+
+    def test_storm_tuple(self):
+        tup = StormTuple("id", "comp", "stream", 3, self.values)
+        assert tup == ("id", "comp", "stream", 3, [1, "foo", [2, 3]])
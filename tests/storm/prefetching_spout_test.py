@@ -0,0 +1,94 @@
+import time
+
+import pytest
+
+from pyleus.storm import PrefetchingSpout
+from pyleus.testing import ComponentTestCase, mock
+
+
+class MyException(Exception):
+    pass
+
+
+class TestPrefetchingSpout(ComponentTestCase):
+
+    INSTANCE_CLS = PrefetchingSpout
+
+    @pytest.fixture(autouse=True)
+    def setup_mocks(self, request):
+        patches = mock.patch.multiple(
+            self.instance, emit=mock.DEFAULT, generate_items=mock.DEFAULT,
+            _init_component=mock.DEFAULT)
+
+        request.addfinalizer(lambda: patches.__exit__(None, None, None))
+        self.mocks = patches.__enter__()
+        self.mocks['_init_component'].return_value = ({}, {})
+
+        self.instance.options = {}
+
+    def _start(self, items, **options):
+        self.instance.options = options
+        self.mocks['generate_items'].return_value = items
+        self.instance.setup_component()
+
+    def _emitted(self):
+        return [c[0][0] for c in self.mocks['emit'].call_args_list]
+
+    def test_next_tuple(self):
+        self._start([(1,), (2,)])
+        self.instance._reader.join()
+
+        for _ in range(3):
+            self.instance.next_tuple()
+
+        assert self._emitted() == [(1,), (2,)]
+
+    def test_process_item(self):
+        self._start(["a"])
+        self.instance._reader.join()
+
+        with mock.patch.object(
+                self.instance, 'process_item') as mock_process_item:
+            self.instance.next_tuple()
+
+        mock_process_item.assert_called_once_with("a")
+
+    def test_block_policy(self):
+        self._start([(i,) for i in range(5)], queue_size=2)
+
+        deadline = time.time() + 5
+        while len(self._emitted()) < 5 and time.time() < deadline:
+            self.instance.next_tuple()
+
+        self.instance._reader.join()
+        assert self._emitted() == [(i,) for i in range(5)]
+        assert self.instance.dropped_count == 0
+
+    def test_drop_policy(self):
+        self._start(
+            [(i,) for i in range(5)], queue_size=2, queue_policy="drop")
+        self.instance._reader.join()
+
+        for _ in range(5):
+            self.instance.next_tuple()
+
+        assert self._emitted() == [(0,), (1,)]
+        assert self.instance.dropped_count == 3
+
+    def test_unknown_policy(self):
+        with pytest.raises(ValueError):
+            self._start([], queue_policy="wait")
+
+    def test_generate_items_exception(self):
+        def generate_items():
+            yield (1,)
+            raise MyException()
+
+        self._start(generate_items())
+        self.instance._reader.join()
+
+        self.instance.next_tuple()
+        with pytest.raises(MyException):
+            self.instance.next_tuple()
+
+        assert self._emitted() == [(1,)]
@@ -0,0 +1,109 @@
+import os
+import time
+
+import pytest
+
+from pyleus.storm import ProcessPoolBolt
+from pyleus.storm import StormTuple
+from pyleus.storm import StormWentAwayError
+from pyleus.storm.process_pool_bolt import _run_in_worker
+from pyleus.storm.serializers.serializer import Serializer
+from pyleus.testing import ComponentTestCase, mock
+
+
+class DoublingBolt(ProcessPoolBolt):
+
+    def process_tuple(self, tup):
+        self.log("pid {0}".format(os.getpid()))
+        assert self.emit((tup.values[0] * 2,), anchors=[tup]) is None
+
+    def process_tick(self):
+        self.emit_many([(0,), (1,)], stream="ticks")
+
+
+class TestProcessPoolBolt(ComponentTestCase):
+
+    INSTANCE_CLS = DoublingBolt
+
+    TICK = StormTuple(None, '__system', '__tick', None, None)
+
+    @pytest.fixture(autouse=True)
+    def setup_mocks(self, request):
+        patch = mock.patch.object(
+            self.instance, '_serializer', autospec=Serializer)
+        patch.start()
+        request.addfinalizer(patch.stop)
+
+        self.instance.options = {}
+
+    def _tuple(self, tup_id):
+        return StormTuple(tup_id, "comp", "stream", 1, [tup_id])
+
+    def _sent_msgs(self):
+        msgs = []
+        for name, args, _ in self.instance._serializer.mock_calls:
+            if name == 'send_msg':
+                msgs.append(args[0])
+            elif name == 'send_msgs':
+                msgs.extend(args[0])
+        return msgs
+
+    def test_setup_component_max_workers(self):
+        with mock.patch.object(
+                self.instance, '_init_component', return_value=({}, {})):
+            with mock.patch('multiprocessing.cpu_count', return_value=3):
+                self.instance.setup_component()
+
+        assert self.instance._max_workers == 3
+
+    def test_run_in_worker(self):
+        with mock.patch(
+                'pyleus.storm.process_pool_bolt._worker_bolt', self.instance):
+            commands = _run_in_worker(self._tuple(2))
+
+        assert commands[1] == {
+            'command': 'emit',
+            'anchors': [2],
+            'tuple': (4,),
+            'need_task_ids': False,
+        }
+        assert commands[0]['command'] == 'log'
+        assert self.instance._worker_commands is None
+        assert not self.instance._serializer.send_msg.called
+
+    def test_run_in_worker_tick(self):
+        with mock.patch(
+                'pyleus.storm.process_pool_bolt._worker_bolt', self.instance):
+            commands = _run_in_worker(self.TICK)
+
+        assert [c['tuple'] for c in commands] == [(0,), (1,)]
+        assert all(c['stream'] == "ticks" for c in commands)
+
+    def test_run_component(self):
+        self.instance._max_workers = 2
+        self.instance._serializer.read_msg.side_effect = [
+            self._tuple(i) for i in range(5)] + [StormWentAwayError()]
+
+        self.instance.run_component()
+
+        deadline = time.time() + 10
+        while self.instance._in_flight:
+            assert time.time() < deadline
+            time.sleep(0.01)
+
+        msgs = [m for m in self._sent_msgs() if m['command'] != 'log']
+        # Emits come right before the ack of their tuple, in order
+        expected = []
+        for i in range(5):
+            expected.append({
+                'command': 'emit',
+                'anchors': [i],
+                'tuple': (i * 2,),
+                'need_task_ids': False,
+            })
+            expected.append({'command': 'ack', 'id': i})
+        assert msgs == expected
+
+        pids = set(m['msg'] for m in self._sent_msgs()
+                   if m['command'] == 'log')
+        assert "pid {0}".format(os.getpid()) not in pids
@@ -0,0 +1,167 @@
+import os
+
+import msgpack
+import pytest
+
+from pyleus.compat import BytesIO
+from pyleus.storm import LazyValues
+from pyleus.storm import StormTuple
+from pyleus.testing import mock
+from pyleus.storm.serializers import binary_serializer
+from pyleus.storm.serializers.binary_serializer import BinarySerializer
+from testing.serializer import SerializerTestCase
+
+
+def _frame(header, values=None):
+    header = msgpack.packb(header)
+    values = b"" if values is None else msgpack.packb(values)
+    return b"".join((
+        binary_serializer.FRAME_HEADER.pack(
+            len(header) + len(values), len(header)),
+        header,
+        values))
+
+
+def _unframe(data):
+    frame_len, header_len = binary_serializer.FRAME_HEADER.unpack_from(data)
+    start = binary_serializer.FRAME_HEADER.size
+    header = msgpack.unpackb(data[start:start + header_len])
+    values = data[start + header_len:start + frame_len]
+    return header, msgpack.unpackb(values) if values else None
+
+
+class TestBinarySerializer(SerializerTestCase):
+
+    INSTANCE_CLS = BinarySerializer
+
+    @pytest.fixture(autouse=True)
+    def pipe_fixture(self, request):
+        read_fd, self.write_fd = os.pipe()
+        self.mock_input_stream.fileno.return_value = read_fd
+        self.instance = BinarySerializer(
+            self.mock_input_stream, self.mock_output_stream,
+            output_fields={'default': ["a"], 'errors': ["b"]})
+
+        def close_pipe():
+            os.close(read_fd)
+            os.close(self.write_fd)
+
+        request.addfinalizer(close_pipe)
+
+    def _send(self, msg_dict):
+        with mock.patch.object(
+                self.instance, '_output_stream', BytesIO()) as sio:
+            self.instance.send_msg(msg_dict)
+        return _unframe(sio.getvalue())
+
+    def test_read_msg_setup(self):
+        setup_info = {'pidDir': "/tmp", 'conf': {}, 'context': {}}
+        os.write(self.write_fd, _frame([binary_serializer.SETUP, setup_info]))
+
+        assert self.instance.read_msg() == setup_info
+
+    def test_read_msg_bolt_tuple(self):
+        os.write(self.write_fd, _frame(
+            [binary_serializer.BOLT_TUPLE, "id", "comp", "stream", 3],
+            [1, "foo"]))
+
+        tup = self.instance.read_msg()
+
+        assert isinstance(tup, StormTuple)
+        assert not tup.values.is_decoded
+        assert tup == StormTuple("id", "comp", "stream", 3, [1, "foo"])
+
+    def test_read_msg_spout_command(self):
+        os.write(self.write_fd, _frame(
+            [binary_serializer.SPOUT_COMMAND, binary_serializer.ACK, "id"]))
+
+        assert self.instance.read_msg() == {'command': "ack", 'id': "id"}
+
+    def test_read_msg_task_ids(self):
+        os.write(self.write_fd, _frame([binary_serializer.TASK_IDS, [4, 5]]))
+
+        assert self.instance.read_msg() == [4, 5]
+
+    def test_read_msg_split_across_reads(self):
+        self.instance = BinarySerializer(
+            self.mock_input_stream, self.mock_output_stream,
+            read_buffer_size=3)
+        os.write(self.write_fd, _frame([binary_serializer.TASK_IDS, [4]]) +
+                 _frame([binary_serializer.TASK_IDS, [5]]))
+
+        assert self.instance.read_msg() == [4]
+        assert self.instance.read_msg() == [5]
+
+    def test_send_msg_pid(self):
+        assert self._send({'pid': 1234}) == (
+            [binary_serializer.PID, 1234], None)
+
+    def test_send_msg_emit(self):
+        header, values = self._send({
+            'command': "emit",
+            'anchors': ["foo"],
+            'stream': "errors",
+            'tuple': (1, 2),
+        })
+
+        # Streams are sent as indexes of the sorted declared streams
+        assert header == [binary_serializer.EMIT, 1, None, ["foo"], None, True]
+        assert values == [1, 2]
+
+    def test_send_msg_emit_lazy_values(self):
+        values = LazyValues(msgpack.packb([1, 2]))
+
+        with mock.patch.object(
+                self.instance, '_packer',
+                wraps=self.instance._packer) as mock_packer:
+            header, sent_values = self._send({
+                'command': "emit",
+                'tuple': values,
+            })
+
+        # Forwarded values are written as they are
+        mock_packer.pack.assert_called_once_with(header)
+        assert sent_values == [1, 2]
+        assert not values.is_decoded
+
+    def test_send_msg_emit_default_stream(self):
+        header, values = self._send({
+            'command': "emit",
+            'id': 7,
+            'tuple': (1, 2),
+            'need_task_ids': False,
+        })
+
+        assert header == [binary_serializer.EMIT, None, 7, None, None, False]
+
+    def test_send_msg_emit_undeclared_stream(self):
+        header, _ = self._send({
+            'command': "emit",
+            'stream': "foo",
+            'tuple': (),
+        })
+
+        assert header[1] == "foo"
+
+    def test_send_msg_ack(self):
+        assert self._send({'command': "ack", 'id': "foo"}) == (
+            [binary_serializer.ACK, "foo"], None)
+
+    def test_send_msg_log(self):
+        assert self._send({'command': "log", 'msg': "foo", 'level': 2}) == (
+            [binary_serializer.LOG, "foo", 2], None)
+
+    def test_send_msg_unknown(self):
+        with pytest.raises(ValueError):
+            self._send({'command': "foo"})
+
+    def test_send_msgs(self):
+        msg_dicts = [{'command': "sync"}, {'command': "ack", 'id': "foo"}]
+
+        with mock.patch.object(
+                self.instance, '_output_stream', BytesIO()) as sio:
+            self.instance.send_msgs(msg_dicts)
+
+        assert sio.getvalue() == (
+            _frame([binary_serializer.SYNC]) +
+            _frame([binary_serializer.ACK, "foo"]))
@@ -4,8 +4,14 @@ try:
 except ImportError:
     import json
 
-from pyleus.compat import StringIO
+import os
+
+import pytest
+
+from pyleus.compat import BytesIO
+from pyleus.storm import StormWentAwayError
 from pyleus.testing import mock
+from pyleus.storm.serializers import json_serializer
 from pyleus.storm.serializers.json_serializer import JSONSerializer
 from testing.serializer import SerializerTestCase
 
@@ -14,37 +20,147 @@ class TestJSONSerializer(SerializerTestCase):
 
     INSTANCE_CLS = JSONSerializer
 
+    @pytest.fixture(autouse=True)
+    def pipe_fixture(self, request):
+        read_fd, self.write_fd = os.pipe()
+        self.mock_input_stream.fileno.return_value = read_fd
+        # Output format depends on the backend, use the standard library one
+        self.instance = JSONSerializer(
+            self.mock_input_stream, self.mock_output_stream,
+            json_backend="json")
+
+        def close_pipe():
+            os.close(read_fd)
+            os.close(self.write_fd)
+
+        request.addfinalizer(close_pipe)
+
+    def _write_msg(self, msg):
+        os.write(self.write_fd, (json.dumps(msg) + "\nend\n").encode("utf-8"))
+
     def test_read_msg_dict(self):
         msg_dict = {
             'hello': "world",
         }
 
-        self.mock_input_stream.readline.side_effect = [
-            json.dumps(msg_dict),
-            "end",
-        ]
+        self._write_msg(msg_dict)
 
         assert self.instance.read_msg() == msg_dict
 
     def test_read_msg_list(self):
         msg_list = [3, 4, 5]
 
-        self.mock_input_stream.readline.side_effect = [
-            json.dumps(msg_list),
-            "end",
-        ]
+        self._write_msg(msg_list)
 
         assert self.instance.read_msg() == msg_list
 
+    def test_read_msg_many(self):
+        msgs = [{'hello': "world"}, [3, 4, 5], {'hello': "moon"}]
+
+        for msg in msgs:
+            self._write_msg(msg)
+
+        assert [self.instance.read_msg() for _ in msgs] == msgs
+
+    def test_read_msg_split_across_reads(self):
+        self.instance = JSONSerializer(
+            self.mock_input_stream, self.mock_output_stream,
+            json_backend="json", read_buffer_size=3)
+        msgs = [{'hello': "world"}, [3, 4, 5]]
+
+        for msg in msgs:
+            self._write_msg(msg)
+
+        assert self.instance.read_msg() == msgs[0]
+        assert self.instance.read_msg() == msgs[1]
+
+    def test_read_msg_one_byte_reads(self):
+        # The terminator is split at every possible position
+        self.instance = JSONSerializer(
+            self.mock_input_stream, self.mock_output_stream,
+            json_backend="json", read_buffer_size=1)
+        msgs = [{'hello': "world"}, "end", [3, 4, 5]]
+
+        for msg in msgs:
+            self._write_msg(msg)
+
+        assert [self.instance.read_msg() for _ in msgs] == msgs
+
+    def test_read_msg_eof(self):
+        os.close(self.write_fd)
+        self.write_fd = os.open(os.devnull, os.O_RDONLY)
+
+        with pytest.raises(StormWentAwayError):
+            self.instance.read_msg()
+
     def test_send_msg(self):
         msg_dict = {
             'hello': "world",
         }
 
-        expected_output = """{"hello": "world"}\nend\n"""
+        expected_output = b"""{"hello": "world"}\nend\n"""
 
         with mock.patch.object(
-                self.instance, '_output_stream', StringIO()) as sio:
+                self.instance, '_output_stream', BytesIO()) as sio:
             self.instance.send_msg(msg_dict)
 
         assert sio.getvalue() == expected_output
+
+    def test_send_msgs(self):
+        msg_dicts = [{'hello': "world"}, {'hello': "moon"}]
+
+        expected_output = (
+            b"""{"hello": "world"}\nend\n{"hello": "moon"}\nend\n""")
+
+        with mock.patch.object(
+                self.instance, '_output_stream', BytesIO()) as sio:
+            self.instance.send_msgs(msg_dicts)
+
+        assert sio.getvalue() == expected_output
+
+
+class TestJSONBackends(object):
+
+    def test_get_json_backend(self):
+        backend = json_serializer.get_json_backend("json")
+
+        assert backend.name == "json"
+        assert backend.loads(bytearray(backend.dumps([1, "a"]))) == [1, "a"]
+
+    def test_get_json_backend_unknown(self):
+        with pytest.raises(ValueError):
+            json_serializer.get_json_backend("foo")
+
+    def test_get_json_backend_fallback(self):
+        def unavailable():
+            raise ImportError()
+
+        with mock.patch.dict(json_serializer.JSON_BACKENDS, {
+                'orjson': unavailable,
+                'rapidjson': unavailable,
+                'ujson': unavailable,
+                'simplejson': unavailable}):
+            assert json_serializer.get_json_backend().name == "json"
+
+    def test_get_json_backend_default_not_fast(self):
+        fast = json_serializer.JSONBackend("fast", None, None)
+
+        with mock.patch.dict(json_serializer.JSON_BACKENDS, {
+                'orjson': lambda: fast,
+                'rapidjson': lambda: fast,
+                'ujson': lambda: fast}):
+            assert json_serializer.get_json_backend().name in (
+                "simplejson", "json")
+            assert json_serializer.get_json_backend("orjson") is fast
+
+    def test_register_json_backend(self):
+        backend = json_serializer.JSONBackend("foo", None, None)
+
+        with mock.patch.dict(json_serializer.JSON_BACKENDS):
+            with mock.patch.object(
+                    json_serializer, 'JSON_BACKENDS_PREFERENCE', ["json"]):
+                json_serializer.register_json_backend(
+                    "foo", lambda: backend, preferred=True)
+
+                assert json_serializer.get_json_backend() is backend
+                assert json_serializer.get_json_backend("foo") is backend
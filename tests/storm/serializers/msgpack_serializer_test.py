@@ -1,8 +1,10 @@
 import os
 
 import msgpack
+import pytest
 
 from pyleus.compat import BytesIO
+from pyleus.storm import StormWentAwayError
 from pyleus.testing import mock
 from pyleus.storm.serializers.msgpack_serializer import MsgpackSerializer
 from testing.serializer import SerializerTestCase
@@ -12,27 +14,70 @@ class TestMsgpackSerializer(SerializerTestCase):
 
     INSTANCE_CLS = MsgpackSerializer
 
+    @pytest.fixture(autouse=True)
+    def pipe_fixture(self, request):
+        read_fd, self.write_fd = os.pipe()
+        self.mock_input_stream.fileno.return_value = read_fd
+
+        def close_pipe():
+            os.close(read_fd)
+            os.close(self.write_fd)
+
+        request.addfinalizer(close_pipe)
+
     def test_read_msg_dict(self):
         msg_dict = {
             b'hello': b"world",
         }
 
-        encoded_msg = msgpack.packb(msg_dict)
+        os.write(self.write_fd, msgpack.packb(msg_dict))
 
-        with mock.patch.object(
-                os, 'read', return_value=encoded_msg, autospec=True):
-
-            assert self.instance.read_msg() == msg_dict
+        assert self.instance.read_msg() == msg_dict
 
     def test_read_msg_list(self):
         msg_list = [3, 4, 5]
 
-        encoded_msg = msgpack.packb(msg_list)
+        os.write(self.write_fd, msgpack.packb(msg_list))
 
-        with mock.patch.object(
-                os, 'read', return_value=encoded_msg, autospec=True):
+        assert self.instance.read_msg() == msg_list
+
+    def test_read_msg_split_across_reads(self):
+        self.instance = MsgpackSerializer(
+            self.mock_input_stream, self.mock_output_stream,
+            read_buffer_size=4)
+        msgs = [{'hello': "world"}, [3, 4, 5]]
+
+        os.write(self.write_fd, b''.join(msgpack.packb(m) for m in msgs))
+
+        assert self.instance.read_msg() == msgs[0]
+        assert self.instance.read_msg() == msgs[1]
+
+    def test_has_buffered_msgs(self):
+        msgs = [{'hello': "world"}, [3, 4, 5]]
+        os.write(self.write_fd, b''.join(msgpack.packb(m) for m in msgs))
+
+        assert not self.instance.has_buffered_msgs()
+        assert self.instance.read_msg() == msgs[0]
+        assert self.instance.has_buffered_msgs()
+        assert self.instance.read_msg() == msgs[1]
+        assert not self.instance.has_buffered_msgs()
 
-            assert self.instance.read_msg() == msg_list
+    def test_input_available(self):
+        assert not self.instance.input_available()
+
+        os.write(self.write_fd, msgpack.packb([1]) + msgpack.packb([2]))
+        assert self.instance.input_available()
+
+        self.instance.read_msg()
+        assert self.instance.input_available()
+        self.instance.read_msg()
+        assert not self.instance.input_available()
+
+    def test_read_msg_eof(self):
+        with mock.patch.object(os, 'readv', return_value=0, create=True):
+            with mock.patch.object(os, 'read', return_value=b""):
+                with pytest.raises(StormWentAwayError):
+                    self.instance.read_msg()
 
     def test_send_msg(self):
         msg_dict = {
@@ -46,3 +91,14 @@ class TestMsgpackSerializer(SerializerTestCase):
             self.instance.send_msg(msg_dict)
 
         assert sio.getvalue() == expected_output
+
+    def test_send_msgs(self):
+        msg_dicts = [{'hello': "world"}, {'hello': "moon"}]
+
+        expected_output = b''.join(msgpack.packb(m) for m in msg_dicts)
+
+        with mock.patch.object(
+                self.instance, '_output_stream', BytesIO()) as sio:
+            self.instance.send_msgs(msg_dicts)
+
+        assert sio.getvalue() == expected_output
@@ -0,0 +1,48 @@
+from pyleus.compat import StringIO
+from pyleus.testing import mock
+from testing.serializer import SerializerTestCase
+
+
+class TestSerializer(SerializerTestCase):
+
+    def test__write_unbuffered(self):
+        self.instance._write("foo")
+
+        self.mock_output_stream.write.assert_called_once_with("foo")
+        self.mock_output_stream.flush.assert_called_once_with()
+
+    def test__write_buffered(self):
+        self.instance.enable_output_buffering(10)
+
+        with mock.patch.object(
+                self.instance, '_output_stream', StringIO()) as sio:
+            self.instance._write("foo")
+            self.instance._write("bar")
+            assert sio.getvalue() == ""
+
+            self.instance._write("quux")
+            assert sio.getvalue() == "foobarquux"
+
+    def test__write_buffered_max_messages(self):
+        self.instance.enable_output_buffering(1024, max_messages=3)
+
+        with mock.patch.object(
+                self.instance, '_output_stream', StringIO()) as sio:
+            self.instance._write("foo")
+            assert sio.getvalue() == ""
+
+            self.instance._write("barbaz", num_messages=2)
+            assert sio.getvalue() == "foobarbaz"
+
+    def test_flush(self):
+        self.instance.enable_output_buffering(1024)
+
+        self.instance._write("foo")
+        self.instance._write("bar")
+        assert not self.mock_output_stream.write.called
+
+        self.instance.flush()
+        self.instance.flush()
+
+        self.mock_output_stream.write.assert_called_once_with("foobar")
+        self.mock_output_stream.flush.assert_called_once_with()
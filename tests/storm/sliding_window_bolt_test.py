@@ -0,0 +1,177 @@
+import pytest
+
+from pyleus.storm import SlidingWindowBolt
+from pyleus.storm.component import StormConfig
+from pyleus.storm.sliding_window_bolt import ArrayWindow
+from pyleus.storm.sliding_window_bolt import NumpyWindow
+from pyleus.testing import ComponentTestCase, mock
+
+
+def _numpy_window(num_slots, **kwargs):
+    pytest.importorskip("numpy")
+    return NumpyWindow(num_slots, capacity=2, **kwargs)
+
+
+@pytest.fixture(params=[ArrayWindow, _numpy_window])
+def window_cls(request):
+    return request.param
+
+
+@pytest.fixture
+def window(window_cls):
+    return window_cls(3)
+
+
+class TestWindow(object):
+
+    def test_add(self, window):
+        window.add("a")
+        window.add("a", 2)
+        window.add("b", 5)
+
+        assert window.total("a") == 3
+        assert window.total("b") == 5
+        assert window.total("c") == 0
+        assert sorted(window.totals()) == [("a", 3), ("b", 5)]
+        assert window.totals(above=3) == [("b", 5)]
+
+    def test_advance(self, window):
+        window.add("a", 1)
+        window.advance()
+        window.add("a", 2)
+        window.advance()
+        window.add("a", 4)
+        assert window.total("a") == 7
+
+        window.advance()
+        assert window.total("a") == 6
+        window.add("a", 8)
+
+        window.advance()
+        assert window.total("a") == 12
+
+    def test_advance_whole_window(self, window):
+        window.add("a", 1)
+        window.add("b", 1)
+        for _ in range(5):
+            window.advance()
+        window.add("b", 2)
+
+        assert window.total("a") == 0
+        assert window.totals() == [("b", 2)]
+
+    def test_forget_expired_keys(self, window):
+        window.add("a", 1)
+        window.add("b", 1)
+        window.add("c", 1)
+        for _ in range(3):
+            window.advance()
+        window.add("c", 1)
+
+        assert window.totals() == [("c", 1)]
+        assert len(window) == 1
+
+        # Rows are reused
+        window.add("d", 1)
+        window.add("e", 1)
+        assert sorted(window.totals()) == [("c", 1), ("d", 1), ("e", 1)]
+
+    def test_threshold(self, window_cls):
+        window = window_cls(2, threshold=2)
+        window.add("a", 3)
+        window.add("b", 1)
+        assert window.totals() == [("a", 3)]
+
+        window.advance()
+        window.add("b", 2)
+        assert sorted(window.totals()) == [("a", 3), ("b", 3)]
+
+        window.advance()
+        assert window.totals() == []
+        assert window.totals(above=1) == [("b", 2)]
+
+        window.advance()
+        assert window.totals(above=0) == []
+        assert len(window) == 0
+
+    def test_advance_visits_changed_keys_only(self):
+        window = ArrayWindow(3)
+        for key in range(100):
+            window.add(key)
+        window.advance()
+        window.add("b")
+        window.advance()
+        window.add("b")
+
+        with mock.patch.object(
+                window, '_update_above',
+                wraps=window._update_above) as update_above:
+            # Clears the first slot, forgetting its keys
+            window.advance()
+            assert update_above.call_count == 0
+            assert len(window) == 1
+
+            window.advance()
+            assert update_above.call_args_list == [mock.call("b", 1)]
+
+        assert window.totals() == [("b", 1)]
+
+
+class TestSlidingWindowBolt(ComponentTestCase):
+
+    INSTANCE_CLS = SlidingWindowBolt
+
+    @pytest.fixture(autouse=True)
+    def setup_mocks(self, request):
+        patches = mock.patch.multiple(
+            self.instance, emit=mock.DEFAULT, _init_component=mock.DEFAULT)
+
+        request.addfinalizer(lambda: patches.__exit__(None, None, None))
+        self.mocks = patches.__enter__()
+
+        self.instance.options = {}
+
+    def _setup(self, tick_freq=2, **options):
+        self.instance.options = options
+        self.mocks['_init_component'].return_value = (
+            StormConfig({"topology.tick.tuple.freq.secs": tick_freq}), {})
+        self.instance.setup_component()
+
+    def test_setup_component(self):
+        self._setup(time_window=10)
+
+        assert isinstance(self.instance.window, ArrayWindow)
+        assert self.instance.window._num_slots == 5
+
+    def test_setup_component_numpy(self):
+        pytest.importorskip("numpy")
+        self._setup(time_window=10, use_numpy=True)
+
+        assert isinstance(self.instance.window, NumpyWindow)
+
+    def test_setup_component_no_tick(self):
+        with pytest.raises(ValueError):
+            self._setup(tick_freq=None)
+
+    def test_setup_component_not_multiple(self):
+        with pytest.raises(ValueError):
+            self._setup(tick_freq=3, time_window=10)
+
+    def test_process_tick(self):
+        self._setup(time_window=4, threshold=2)
+        emit = self.mocks['emit']
+
+        def process_tick():
+            emit.reset_mock()
+            self.instance.process_tick()
+            # Keys are processed in no particular order
+            return sorted(args[0] for args, _ in emit.call_args_list)
+
+        self.instance.add("a", 2)
+        self.instance.add("b", 3)
+        assert process_tick() == [("b", 3)]
+        self.instance.add("a", 1)
+        assert process_tick() == [("a", 3), ("b", 3)]
+        assert self.instance.total("a") == 1
+        assert self.instance.total("b") == 0
+        assert process_tick() == []
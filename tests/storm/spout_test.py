@@ -1,7 +1,9 @@
 from collections import namedtuple
 import contextlib
 
-from pyleus.storm import Spout
+import pytest
+
+from pyleus.storm import BatchingSpout, ReliableSpout, Spout
 from pyleus.testing import ComponentTestCase, mock
 
 
@@ -106,6 +108,30 @@ class TestSpout(ComponentTestCase):
         with self._test_emit_helper(expected_command_dict):
             self.instance.emit((1, 2, 3), direct_task=mock.sentinel.direct_task)
 
+    def test_emit_many(self):
+        with mock.patch.object(self.instance, 'read_taskid', autospec=True) as mock_read_taskid:
+            with mock.patch.object(self.instance, 'send_commands', autospec=True) as mock_send_commands:
+                mock_read_taskid.side_effect = [[1], [2]]
+                task_ids = self.instance.emit_many(
+                    [(1, 2), (3, 4)], tup_ids=[5, 6])
+
+        mock_send_commands.assert_called_once_with('emit', [
+            {'id': 5, 'tuple': (1, 2)},
+            {'id': 6, 'tuple': (3, 4)},
+        ])
+        assert task_ids == [[1], [2]]
+
+    def test_emit_many_no_taskid(self):
+        with mock.patch.object(self.instance, 'read_taskid', autospec=True) as mock_read_taskid:
+            with mock.patch.object(self.instance, 'send_commands', autospec=True) as mock_send_commands:
+                self.instance.emit_many([(1, 2), (3, 4)], need_task_ids=False)
+
+        mock_send_commands.assert_called_once_with('emit', [
+            {'tuple': (1, 2), 'need_task_ids': False},
+            {'tuple': (3, 4), 'need_task_ids': False},
+        ])
+        assert mock_read_taskid.call_count == 0
+
     def test__handle_command_next(self):
         msg = dict(command='next')
         with mock.patch.object(self.instance, 'next_tuple', autospec=True) as mock_next_tuple:
@@ -126,3 +152,285 @@ class TestSpout(ComponentTestCase):
             self.instance._handle_command(msg)
 
         mock_fail.assert_called_once_with(mock.sentinel.tuple_id)
+
+
+class TestBatchingSpout(ComponentTestCase):
+
+    INSTANCE_CLS = BatchingSpout
+
+    @pytest.fixture(autouse=True)
+    def setup_mocks(self, request):
+        patches = [
+            mock.patch.object(self.instance, 'send_command', autospec=True),
+            mock.patch.object(self.instance, 'send_commands', autospec=True),
+            mock.patch('time.time', return_value=0),
+        ]
+        for patch in patches:
+            patch.start()
+            request.addfinalizer(patch.stop)
+
+        self.instance.options = {}
+        self.conf = {}
+        self.next_tup_id = 0
+
+    def _setup(self, **options):
+        self.instance.options = options
+        with mock.patch.object(
+                self.instance, '_init_component',
+                return_value=(self.conf, {})):
+            self.instance.setup_component()
+
+    def _emit_next(self):
+        self.instance.emit((self.next_tup_id,), tup_id=self.next_tup_id,
+                           need_task_ids=False)
+        self.next_tup_id += 1
+
+    def _next(self, next_tuple=None):
+        with mock.patch.object(
+                self.instance, 'next_tuple',
+                side_effect=next_tuple or self._emit_next) as mock_next_tuple:
+            self.instance._handle_command(dict(command='next'))
+        return mock_next_tuple.call_count
+
+    def test_setup_component_options(self):
+        self.conf['topology.max.spout.pending'] = 100
+        self._setup(max_batch_size=7, target_ack_latency_ms=20)
+
+        assert self.instance._max_batch_size == 7
+        assert self.instance._target_ack_latency == 0.02
+        assert self.instance._max_pending == 90
+
+    def test_batch_size_grows(self):
+        self._setup(max_batch_size=3)
+
+        assert [self._next() for _ in range(4)] == [1, 2, 3, 3]
+        assert self.instance.pending_count == 9
+
+    def test_batch_stops_when_nothing_is_emitted(self):
+        self._setup()
+        self.instance.batch_size = 10
+        results = [self._emit_next, self._emit_next, lambda: None]
+
+        assert self._next(lambda: results.pop(0)()) == 3
+        # The batch was not fully used, so it does not grow
+        assert self._next(lambda: None) == 1
+        assert self.instance.batch_size == 10
+
+    def test_max_spout_pending(self):
+        self.conf['topology.max.spout.pending'] = 10
+        self._setup()
+        self.instance.batch_size = 20
+
+        assert self._next() == 9
+        assert self._next() == 0
+
+        self.instance._handle_command(dict(command='ack', id=0))
+        assert self._next() == 1
+
+    def test_fail_halves_batch_size(self):
+        self._setup()
+        self.instance.batch_size = 10
+        self._next()
+
+        with mock.patch.object(self.instance, 'fail') as mock_fail:
+            self.instance._handle_command(dict(command='fail', id=3))
+
+        mock_fail.assert_called_once_with(3)
+        assert self.instance.pending_count == 9
+        assert self._next() == 5
+        assert self._next() == 6
+
+    def test_ack_latency(self):
+        self._setup(target_ack_latency_ms=500)
+        self.instance.batch_size = 4
+        self._next()
+
+        with mock.patch.object(self.instance, 'ack') as mock_ack:
+            with mock.patch('time.time', return_value=1):
+                self.instance._handle_command(dict(command='ack', id=0))
+            with mock.patch('time.time', return_value=2):
+                self.instance._handle_command(dict(command='ack', id=1))
+
+        assert mock_ack.call_args_list == [mock.call(0), mock.call(1)]
+        assert self.instance.ack_latency == 1.2
+        assert self._next() == 2
+
+    def test_max_spout_pending_string_ids(self):
+        """The msgpack and binary serializers send back ids as strings."""
+        self.conf['topology.max.spout.pending'] = 10
+        self._setup()
+        self.instance.batch_size = 20
+
+        assert self._next() == 9
+        assert self._next() == 0
+
+        with mock.patch.object(self.instance, 'ack') as mock_ack:
+            self.instance._handle_command(dict(command='ack', id="0"))
+        mock_ack.assert_called_once_with("0")
+        self.instance._handle_command(dict(command='fail', id="1"))
+        assert self.instance.pending_count == 7
+        assert self._next() == 2
+
+    def test_unknown_ack(self):
+        self._setup()
+
+        with mock.patch.object(self.instance, 'ack') as mock_ack:
+            self.instance._handle_command(dict(command='ack', id=42))
+
+        mock_ack.assert_called_once_with(42)
+        assert self.instance.ack_latency is None
+
+    def test_emit_many_tracks_pending(self):
+        self._setup()
+
+        self.instance.emit_many(
+            [(1,), (2,), (3,)], tup_ids=[1, None, 3], need_task_ids=False)
+
+        assert self.instance.pending_count == 2
+        assert self.instance._emitted == 3
+
+
+class TestReliableSpout(ComponentTestCase):
+
+    INSTANCE_CLS = ReliableSpout
+
+    @pytest.fixture(autouse=True)
+    def setup_mocks(self, request):
+        patches = mock.patch.multiple(
+            self.instance, send_command=mock.DEFAULT,
+            send_commands=mock.DEFAULT, next_tuple=mock.DEFAULT,
+            ack=mock.DEFAULT, fail=mock.DEFAULT)
+
+        request.addfinalizer(lambda: patches.__exit__(None, None, None))
+        self.mocks = patches.__enter__()
+
+        self.instance._replay_backoff = 1
+        self.instance._replay_max_backoff = 3
+
+    def _handle(self, command, tup_id=None, now=0):
+        msg = dict(command=command)
+        if tup_id is not None:
+            msg['id'] = tup_id
+        with mock.patch('time.time', return_value=now):
+            self.instance._handle_command(msg)
+
+    def _emitted(self):
+        return [
+            (c[0][1]['id'], c[0][1]['tuple'])
+            for c in self.mocks['send_command'].call_args_list]
+
+    def test_setup_component_options(self):
+        self.instance.options = {
+            'max_retries': None,
+            'replay_backoff_ms': 20,
+            'replay_max_backoff_ms': 500,
+        }
+        with mock.patch.object(
+                self.instance, '_init_component', return_value=({}, {})):
+            self.instance.setup_component()
+
+        assert self.instance._max_retries is None
+        assert self.instance._replay_backoff == 0.02
+        assert self.instance._replay_max_backoff == 0.5
+
+    def test_ack(self):
+        self.instance.emit((1,), tup_id=1, need_task_ids=False)
+        self.instance.emit((2,), need_task_ids=False)
+        assert self.instance.pending_count == 1
+
+        self._handle('ack', 1)
+
+        assert self.instance.pending_count == 0
+        self.mocks['ack'].assert_called_once_with(1)
+
+    def test_ack_string_id(self):
+        """The msgpack and binary serializers send back ids as strings."""
+        self.instance.emit((1,), tup_id=1, need_task_ids=False)
+
+        self._handle('ack', "1")
+
+        assert self.instance.pending_count == 0
+        self.mocks['ack'].assert_called_once_with("1")
+
+    def test_replay_string_id(self):
+        self.instance.emit((1,), tup_id=1, need_task_ids=False)
+        self._handle('fail', "1")
+
+        assert not self.mocks['fail'].called
+        assert self.instance.replay_count == 1
+
+        self._handle('next', now=1)
+        # Replayed with the id it was emitted with
+        assert self._emitted() == [(1, (1,)), (1, (1,))]
+
+    def test_emit_many(self):
+        self.instance.emit_many(
+            [(1,), (2,)], stream='s', tup_ids=[1, 2], need_task_ids=False)
+
+        assert self.instance.pending_count == 2
+        assert self.instance._pending["2"].values == (2,)
+        assert self.instance._pending["2"].stream == 's'
+
+    def test_replay(self):
+        self.instance.emit((1,), stream='s', tup_id=1, need_task_ids=False)
+        self._handle('fail', 1)
+
+        assert self.instance.pending_count == 0
+        assert self.instance.replay_count == 1
+        assert not self.mocks['fail'].called
+
+        # Not due yet
+        self._handle('next', now=0.5)
+        assert self.mocks['next_tuple'].call_count == 1
+
+        self._handle('next', now=1)
+        assert self.mocks['next_tuple'].call_count == 1
+        self.mocks['send_command'].assert_called_with('emit', {
+            'id': 1, 'tuple': (1,), 'stream': 's', 'need_task_ids': False})
+        assert self.instance.pending_count == 1
+        assert self.instance.replay_count == 0
+
+    def test_replay_order_and_backoff(self):
+        self.instance.emit((1,), tup_id=1, need_task_ids=False)
+        self.instance.emit((2,), tup_id=2, need_task_ids=False)
+
+        self._handle('fail', 2)
+        self._handle('next', now=1)
+        # Second failure of tuple 2, due at 1 + 2
+        self._handle('fail', 2, now=1)
+        self._handle('fail', 1, now=1)
+
+        self._handle('next', now=2.5)
+        self._handle('next', now=2.5)
+        self._handle('next', now=3)
+
+        assert self._emitted() == [
+            (1, (1,)), (2, (2,)), (2, (2,)), (1, (1,)), (2, (2,))]
+        assert self.mocks['next_tuple'].call_count == 1
+
+    def test_max_backoff(self):
+        self.instance.emit((1,), tup_id=1, need_task_ids=False)
+        self.instance._pending["1"].retries = 2
+
+        self._handle('fail', 1)
+
+        assert self.instance._replay_queue[0][0] == 3
+
+    def test_max_retries(self):
+        self.instance._max_retries = 1
+        self.instance.emit((1,), tup_id=1, need_task_ids=False)
+
+        self._handle('fail', 1)
+        self._handle('next', now=1)
+        self._handle('fail', 1)
+
+        self.mocks['fail'].assert_called_once_with(1)
+        assert self.instance.pending_count == 0
+        assert self.instance.replay_count == 0
+        assert self.instance.dropped_count == 1
+
+    def test_fail_unknown_tuple(self):
+        self._handle('fail', 42)
+
+        self.mocks['fail'].assert_called_once_with(42)
+        assert self.instance.dropped_count == 0
@@ -0,0 +1,112 @@
+import os
+
+import pytest
+
+from pyleus.storm.state import LogState
+from pyleus.storm.state import open_state
+
+
+@pytest.fixture(params=["log", "sqlite"])
+def backend(request):
+    return request.param
+
+
+@pytest.fixture
+def path(tmpdir):
+    return str(tmpdir.join("state"))
+
+
+def test_open_state_unknown_backend(path):
+    with pytest.raises(ValueError):
+        open_state(path, "foo")
+
+
+def test_mapping(path, backend):
+    state = open_state(path, backend)
+    state["a"] = 1
+    state["b"] = [1, 2]
+    state.checkpoint()
+    state["c"] = {"d": "e"}
+    del state["a"]
+
+    assert "a" not in state
+    assert state.get("a") is None
+    assert state["b"] == [1, 2]
+    assert state["c"] == {"d": "e"}
+    assert sorted(state) == ["b", "c"]
+    assert len(state) == 2
+    with pytest.raises(KeyError):
+        del state["a"]
+    state.close()
+
+
+def test_values_are_copies(path, backend):
+    state = open_state(path, backend)
+    value = [1]
+    state["a"] = value
+    value.append(2)
+    state["a"].append(3)
+    assert state["a"] == [1]
+
+    state.checkpoint()
+    state["a"].append(3)
+    assert state["a"] == [1]
+    state.close()
+
+
+def test_recover(path, backend):
+    state = open_state(path, backend)
+    state["a"] = 1
+    state["b"] = 2
+    state.checkpoint()
+    del state["a"]
+    state["b"] = 3
+    state["c"] = 4
+    state.checkpoint()
+    # Lost, as never checkpointed
+    state["d"] = 5
+    state._close()
+
+    state = open_state(path, backend)
+    assert dict(state.items()) == {"b": 3, "c": 4}
+    state.close()
+
+
+def test_log_truncates_torn_tail(path):
+    state = LogState(path)
+    state["a"] = 1
+    state.close()
+    size = os.path.getsize(path)
+
+    with open(path, "ab") as f:
+        f.write(b"\x05\x00\x00")
+
+    state = LogState(path)
+    assert state["a"] == 1
+    assert os.path.getsize(path) == size
+    state["b"] = 2
+    state.close()
+
+    state = LogState(path)
+    assert dict(state.items()) == {"a": 1, "b": 2}
+    state.close()
+
+
+def test_log_compaction(path):
+    state = LogState(path)
+    state.COMPACTION_MIN_SIZE = 0
+    state["a"] = "x" * 100
+    state["b"] = 1
+    state.checkpoint()
+    size = os.path.getsize(path)
+    for value in ["y" * 100, "z" * 100]:
+        state["a"] = value
+        state.checkpoint()
+
+    assert os.path.getsize(path) == size
+    assert state["a"] == "z" * 100
+    state.close()
+
+    state = LogState(path)
+    assert dict(state.items()) == {"a": "z" * 100, "b": 1}
+    state.close()
@@ -0,0 +1,166 @@
+import random
+
+import pytest
+
+from pyleus.storm import StormTuple, TopNBolt, TopNMergeBolt
+from pyleus.storm.component import StormConfig
+from pyleus.storm.top_n_bolt import CountMinSketch
+from pyleus.storm.top_n_bolt import TopHeap
+from pyleus.testing import ComponentTestCase, mock
+
+
+class TestCountMinSketch(object):
+
+    def test_estimate(self):
+        sketch = CountMinSketch(64, 4)
+        # Integers hash the same in every process
+        counts = dict((i, i) for i in range(20))
+        for key, count in counts.items():
+            assert sketch.add(key, count) >= count
+
+        for key, count in counts.items():
+            assert sketch.estimate(key) >= count
+        assert sketch.estimate(19) == 19
+
+    def test_no_window(self):
+        sketch = CountMinSketch(64, 4)
+        sketch.add("a", 3)
+        sketch.advance()
+
+        assert sketch.estimate("a") == 3
+
+    def test_window(self):
+        sketch = CountMinSketch(64, 4, num_buckets=2)
+        sketch.add("a", 1)
+        sketch.advance()
+        sketch.add("a", 2)
+        assert sketch.estimate("a") == 3
+
+        sketch.advance()
+        assert sketch.estimate("a") == 2
+        sketch.advance()
+        assert sketch.estimate("a") == 0
+
+
+class TestTopHeap(object):
+
+    def test_offer(self):
+        heap = TopHeap(3)
+        for key, count in [("a", 1), ("b", 5), ("c", 3), ("d", 2), ("e", 1)]:
+            heap.offer(key, count)
+
+        assert heap.items() == [("b", 5), ("c", 3), ("d", 2)]
+        assert "a" not in heap
+
+        heap.offer("d", 6)
+        heap.offer("a", 4)
+        assert heap.items() == [("d", 6), ("b", 5), ("a", 4)]
+
+    def test_random(self):
+        rng = random.Random(0)
+        heap = TopHeap(5)
+        counts = {}
+        for _ in range(1000):
+            key = rng.randrange(20)
+            counts[key] = counts.get(key, 0) + 1
+            heap.offer(key, counts[key])
+
+        expected = sorted(counts.values(), reverse=True)[:5]
+        assert [count for _, count in heap.items()] == expected
+
+    def test_rebuild(self):
+        heap = TopHeap(2)
+        heap.rebuild([("a", 1), ("b", 3), ("c", 2)])
+
+        assert heap.items() == [("b", 3), ("c", 2)]
+        heap.offer("a", 4)
+        assert heap.items() == [("a", 4), ("b", 3)]
+
+
+class TestTopNBolt(ComponentTestCase):
+
+    INSTANCE_CLS = TopNBolt
+
+    @pytest.fixture(autouse=True)
+    def setup_mocks(self, request):
+        patches = mock.patch.multiple(
+            self.instance, emit=mock.DEFAULT, _init_component=mock.DEFAULT)
+
+        request.addfinalizer(lambda: patches.__exit__(None, None, None))
+        self.mocks = patches.__enter__()
+
+        self.instance.options = {}
+
+    def _setup(self, tick_freq=2, **options):
+        self.instance.options = options
+        self.mocks['_init_component'].return_value = (
+            StormConfig({"topology.tick.tuple.freq.secs": tick_freq}), {})
+        self.instance.setup_component()
+
+    def test_setup_component_not_multiple(self):
+        with pytest.raises(ValueError):
+            self._setup(tick_freq=3, time_window=10)
+
+    def test_setup_component_no_tick(self):
+        with pytest.raises(ValueError):
+            self._setup(tick_freq=None, time_window=10)
+
+    def test_ranking(self):
+        self._setup(N=2, min_count=2)
+        for key in "abacbcc":
+            self.instance.add(key)
+
+        assert self.instance.ranking() == [("c", 3), ("a", 2)]
+
+        self._setup(N=3, min_count=3)
+        for key in "abacbcc":
+            self.instance.add(key)
+
+        assert self.instance.ranking() == [("c", 3)]
+
+    def test_process_tick(self):
+        self._setup(N=2, time_window=4)
+
+        self.instance.add("a", 3)
+        self.instance.add("b", 2)
+        self.instance.process_tick()
+        self.instance.add("b", 2)
+        self.instance.process_tick()
+        self.instance.process_tick()
+
+        assert self.mocks['emit'].call_args_list == [
+            mock.call(([("a", 3), ("b", 2)],)),
+            mock.call(([("b", 4), ("a", 3)],)),
+            mock.call(([("b", 2)],)),
+        ]
+
+
+class TestTopNMergeBolt(ComponentTestCase):
+
+    INSTANCE_CLS = TopNMergeBolt
+
+    @pytest.fixture(autouse=True)
+    def setup_mocks(self, request):
+        patches = mock.patch.multiple(
+            self.instance, emit=mock.DEFAULT, _init_component=mock.DEFAULT)
+
+        request.addfinalizer(lambda: patches.__exit__(None, None, None))
+        self.mocks = patches.__enter__()
+        self.mocks['_init_component'].return_value = ({}, {})
+
+        self.instance.options = {'N': 2}
+        self.instance.setup_component()
+
+    def _tuple(self, task, ranking):
+        return StormTuple(None, "top", "default", task, [ranking])
+
+    def test_merge(self):
+        self.instance.process_tuple(self._tuple(1, [["a", 5], ["b", 1]]))
+        self.instance.process_tuple(self._tuple(2, [["c", 3]]))
+        # Replaces the previous ranking of task 1
+        self.instance.process_tuple(self._tuple(1, [["a", 2], ["b", 1]]))
+        self.instance.process_tuple(self._tuple(3, [["b", 3]]))
+
+        self.instance.process_tick()
+
+        self.mocks['emit'].assert_called_once_with(([("b", 4), ("c", 3)],))
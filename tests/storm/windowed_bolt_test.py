@@ -0,0 +1,169 @@
+import pytest
+
+from pyleus.storm import StormTuple, WindowedBolt
+from pyleus.storm.component import StormConfig
+from pyleus.storm.windowed_bolt import TupleBuffer
+from pyleus.testing import ComponentTestCase, mock
+
+
+class MyException(Exception):
+    pass
+
+
+class TestTupleBuffer(object):
+
+    @pytest.fixture(autouse=True)
+    def setup_buffer(self):
+        self.buffer = TupleBuffer(chunk_size=3)
+        for i in range(8):
+            self.buffer.append(i, float(i))
+
+    def test_slice(self):
+        assert len(self.buffer) == 8
+        assert self.buffer.slice(0, 8) == list(range(8))
+        assert self.buffer.slice(2, 7) == [2, 3, 4, 5, 6]
+        assert self.buffer.slice(6, 20) == [6, 7]
+        assert self.buffer.slice(5, 5) == []
+
+    def test_pop_before(self):
+        assert self.buffer.pop_before(4) == [0, 1, 2, 3]
+        assert self.buffer.start == 4
+        assert len(self.buffer._chunks) == 2
+
+        assert self.buffer.slice(0, 6) == [4, 5]
+        assert self.buffer.pop_before(2) == []
+        assert self.buffer.pop_before(20) == [4, 5, 6, 7]
+        assert len(self.buffer) == 0
+
+        self.buffer.append(8, 8.0)
+        self.buffer.append(9, 9.0)
+        assert self.buffer.slice(8, 10) == [8, 9]
+        assert self.buffer.pop_before(9) == [8]
+        assert self.buffer.slice(0, 10) == [9]
+
+    def test_seq_at(self):
+        assert self.buffer.seq_at(-1.0) == 0
+        assert self.buffer.seq_at(4.0) == 4
+        assert self.buffer.seq_at(4.5) == 5
+        assert self.buffer.seq_at(100.0) == 8
+
+        self.buffer.pop_before(4)
+        assert self.buffer.seq_at(1.0) == 4
+
+
+class TestWindowedBolt(ComponentTestCase):
+
+    INSTANCE_CLS = WindowedBolt
+
+    TICK = StormTuple(None, '__system', '__tick', None, None)
+
+    @pytest.fixture(autouse=True)
+    def setup_mocks(self, request):
+        patches = mock.patch.multiple(
+            self.instance, process_window=mock.DEFAULT,
+            send_commands=mock.DEFAULT, ack=mock.DEFAULT,
+            _init_component=mock.DEFAULT)
+
+        request.addfinalizer(lambda: patches.__exit__(None, None, None))
+        self.mocks = patches.__enter__()
+
+        self.instance.options = {}
+
+    def _setup(self, tick_freq=1, **options):
+        self.instance.options = options
+        self.mocks['_init_component'].return_value = (
+            StormConfig({"topology.tick.tuple.freq.secs": tick_freq}), {})
+        with mock.patch('time.time', return_value=0):
+            self.instance.setup_component()
+
+    def _tuple(self, tup_id):
+        return StormTuple(tup_id, "comp", "stream", 1, [tup_id])
+
+    def _feed(self, tup_ids, now=0):
+        with mock.patch('time.time', return_value=now):
+            for tup_id in tup_ids:
+                self.instance._process_tuple(self._tuple(tup_id))
+
+    def _tick(self, now):
+        with mock.patch('time.time', return_value=now):
+            self.instance._process_tuple(self.TICK)
+
+    def _windows(self):
+        return [
+            ([tup.id for tup in c[0][0]], c[0][1], c[0][2])
+            for c in self.mocks['process_window'].call_args_list]
+
+    def _acked(self):
+        return [
+            [opts['id'] for opts in c[0][1]]
+            for c in self.mocks['send_commands'].call_args_list
+            if c[0][0] == 'ack']
+
+    def test_setup_component_invalid(self):
+        with pytest.raises(ValueError):
+            self._setup(window_length=0)
+        with pytest.raises(ValueError):
+            self._setup(time_based=True, tick_freq=None)
+
+    def test_count_tumbling(self):
+        self._setup(window_length=3)
+
+        self._feed(range(7))
+
+        assert self._windows() == [([0, 1, 2], 0, 3), ([3, 4, 5], 3, 6)]
+        assert self._acked() == [[0, 1, 2], [3, 4, 5]]
+
+    def test_count_sliding(self):
+        self._setup(window_length=4, sliding_interval=2)
+
+        self._feed(range(6))
+
+        assert self._windows() == [
+            ([0, 1], 0, 2), ([0, 1, 2, 3], 0, 4), ([2, 3, 4, 5], 2, 6)]
+        assert self._acked() == [[0, 1], [2, 3]]
+
+    def test_count_gaps(self):
+        self._setup(window_length=2, sliding_interval=3)
+
+        self._feed(range(7))
+
+        assert self._windows() == [([1, 2], 1, 3), ([4, 5], 4, 6)]
+        assert self._acked() == [[0], [1, 2], [3], [4, 5], [6]]
+
+    def test_time_sliding(self):
+        self._setup(window_length=4, sliding_interval=2, time_based=True)
+
+        self._feed([0], now=0.5)
+        self._feed([1], now=1.5)
+        self._tick(now=1.9)
+        self._feed([2], now=2.5)
+        self._tick(now=4)
+        self._feed([3], now=4.5)
+        self._tick(now=6.1)
+
+        assert self._windows() == [
+            ([0, 1], -2, 2), ([0, 1, 2], 0, 4), ([2, 3], 2, 6)]
+        assert self._acked() == [[0, 1], [2]]
+        assert self.mocks['ack'].call_count == 3
+
+    def test_time_idle(self):
+        self._setup(window_length=2, time_based=True)
+
+        self._feed([0], now=1)
+        self._tick(now=2)
+        self._tick(now=100.5)
+        self._feed([1], now=101)
+        self._tick(now=102)
+
+        assert self._windows() == [([0], 0, 2), ([1], 100, 102)]
+        assert self._acked() == [[0], [1]]
+
+    def test_process_window_exception(self):
+        self._setup(window_length=4, sliding_interval=2)
+        self.mocks['process_window'].side_effect = [None, MyException()]
+
+        with pytest.raises(MyException):
+            self._feed(range(4))
+
+        self.mocks['send_commands'].assert_called_with(
+            'fail', [{'id': 0}, {'id': 1}, {'id': 2}, {'id': 3}])
@@ -38,14 +38,14 @@ public class PyleusTopologyBuilder {
     public static final String KAFKA_ZK_ROOT_FMT = "/pyleus-kafka-offsets/%s";
     public static final String KAFKA_CONSUMER_ID_FMT = "pyleus-%s";
     public static final String MSGPACK_SERIALIZER_CLASS = "com.yelp.pyleus.serializer.MessagePackSerializer";
+    public static final String BINARY_SERIALIZER_CLASS = "com.yelp.pyleus.serializer.BinarySerializer";
 
     public static final PythonComponentsFactory pyFactory = new PythonComponentsFactory();
 
     public static void handleBolt(final TopologyBuilder builder, final BoltSpec spec,
         final TopologySpec topologySpec) {
 
-        PythonBolt bolt = pyFactory.createPythonBolt(spec.module,
-                spec.options, topologySpec.logging_config, topologySpec.serializer);
+        PythonBolt bolt = pyFactory.createPythonBolt(spec.module, spec.options, topologySpec);
 
         if (spec.output_fields != null) {
             bolt.setOutputFields(spec.output_fields);
@@ -178,8 +178,7 @@ public class PyleusTopologyBuilder {
             final SpoutSpec spec,
             final TopologySpec topologySpec) {
 
-        PythonSpout spout = pyFactory.createPythonSpout(spec.module,
-                spec.options, topologySpec.logging_config, topologySpec.serializer);
+        PythonSpout spout = pyFactory.createPythonSpout(spec.module, spec.options, topologySpec);
 
         if (spec.output_fields != null) {
             spout.setOutputFields(spec.output_fields);
@@ -217,11 +216,14 @@ public class PyleusTopologyBuilder {
     private static void setSerializer(Config conf, final String serializer) {
         if (serializer.equals(TopologySpec.MSGPACK_SERIALIZER)) {
             conf.put(Config.TOPOLOGY_MULTILANG_SERIALIZER, MSGPACK_SERIALIZER_CLASS);
+        } else if (serializer.equals(TopologySpec.BINARY_SERIALIZER)) {
+            conf.put(Config.TOPOLOGY_MULTILANG_SERIALIZER, BINARY_SERIALIZER_CLASS);
         } else if (serializer.equals(TopologySpec.JSON_SERIALIZER)) {
             // JSON_SERIALIZER is Storm default and nothing should be done
         } else {
-            throw new RuntimeException(String.format("Unknown serializer: %s. Known: %s, %s",
-                    serializer, TopologySpec.JSON_SERIALIZER, TopologySpec.MSGPACK_SERIALIZER));
+            throw new RuntimeException(String.format("Unknown serializer: %s. Known: %s, %s, %s",
+                    serializer, TopologySpec.JSON_SERIALIZER, TopologySpec.MSGPACK_SERIALIZER,
+                    TopologySpec.BINARY_SERIALIZER));
         }
     }
 
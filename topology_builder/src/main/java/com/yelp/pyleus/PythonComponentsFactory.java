@@ -6,6 +6,7 @@ import java.util.Map;
 import com.google.gson.Gson;
 import com.google.gson.GsonBuilder;
 import com.yelp.pyleus.bolt.PythonBolt;
+import com.yelp.pyleus.spec.TopologySpec;
 import com.yelp.pyleus.spout.PythonSpout;
 
 public class PythonComponentsFactory {
@@ -13,8 +14,44 @@ public class PythonComponentsFactory {
     public static final String VIRTUALENV_INTERPRETER = "pyleus_venv/bin/python";
     public static final String MODULE_OPTION = "-m";
 
+    // Please keep in sync with the keys read by pyleus.storm.component
+    private Map<String, Object> buildPyleusConfig(final TopologySpec topologySpec) {
+        Map<String, Object> pyleusConfig = new HashMap<String, Object>();
+        pyleusConfig.put("logging_config_path", topologySpec.logging_config);
+        pyleusConfig.put("serializer", topologySpec.serializer);
+        pyleusConfig.put("output_buffering", topologySpec.output_buffering);
+        pyleusConfig.put("need_task_ids", topologySpec.need_task_ids);
+        pyleusConfig.put("lazy_task_ids", topologySpec.lazy_task_ids);
+
+        if (topologySpec.json_backend != null) {
+            pyleusConfig.put("json_backend", topologySpec.json_backend);
+        }
+
+        if (topologySpec.state_dir != null) {
+            pyleusConfig.put("state_dir", topologySpec.state_dir);
+        }
+
+        if (topologySpec.state_backend != null) {
+            pyleusConfig.put("state_backend", topologySpec.state_backend);
+        }
+
+        if (topologySpec.read_buffer_size != -1) {
+            pyleusConfig.put("read_buffer_size", topologySpec.read_buffer_size);
+        }
+
+        if (topologySpec.output_buffer_size != -1) {
+            pyleusConfig.put("output_buffer_size", topologySpec.output_buffer_size);
+        }
+
+        if (topologySpec.output_buffer_max_messages != -1) {
+            pyleusConfig.put("output_buffer_max_messages", topologySpec.output_buffer_max_messages);
+        }
+
+        return pyleusConfig;
+    }
+
     private String[] buildCommand(final String module, final Map<String, Object> argumentsMap,
-        final String loggingConfig, final String serializerConfig) {
+        final TopologySpec topologySpec) {
 
         String[] command = new String[3];
 
@@ -34,11 +71,8 @@ public class PythonComponentsFactory {
         }
 
         {
-            Map<String, Object> pyleusConfig = new HashMap<String, Object>();
-            pyleusConfig.put("logging_config_path", loggingConfig);
-            pyleusConfig.put("serializer", serializerConfig);
             Gson gson = new GsonBuilder().create();
-            String json = gson.toJson(pyleusConfig);
+            String json = gson.toJson(buildPyleusConfig(topologySpec));
             json = json.replace("\"", "\\\"");
             strBuf.append(String.format(" --pyleus-config \"%s\"", json));
         }
@@ -49,15 +83,15 @@ public class PythonComponentsFactory {
     }
 
     public PythonBolt createPythonBolt(final String module, final Map<String, Object> argumentsMap,
-        final String loggingConfig, final String serializerConfig) {
+        final TopologySpec topologySpec) {
 
-        return new PythonBolt(buildCommand(module, argumentsMap, loggingConfig, serializerConfig));
+        return new PythonBolt(buildCommand(module, argumentsMap, topologySpec));
     }
 
     public PythonSpout createPythonSpout(final String module, final Map<String, Object> argumentsMap,
-        final String loggingConfig, final String serializerConfig) {
+        final TopologySpec topologySpec) {
 
-        return new PythonSpout(buildCommand(module, argumentsMap, loggingConfig, serializerConfig));
+        return new PythonSpout(buildCommand(module, argumentsMap, topologySpec));
     }
 
 }
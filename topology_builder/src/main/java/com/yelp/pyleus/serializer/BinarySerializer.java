@@ -0,0 +1,251 @@
+package com.yelp.pyleus.serializer;
+
+import java.io.ByteArrayInputStream;
+import java.io.ByteArrayOutputStream;
+import java.io.DataInputStream;
+import java.io.DataOutputStream;
+import java.io.EOFException;
+import java.io.IOException;
+import java.io.InputStream;
+import java.io.OutputStream;
+import java.util.ArrayList;
+import java.util.Arrays;
+import java.util.HashMap;
+import java.util.List;
+import java.util.Map;
+import java.util.TreeSet;
+
+import backtype.storm.multilang.BoltMsg;
+import backtype.storm.multilang.ISerializer;
+import backtype.storm.multilang.NoOutputException;
+import backtype.storm.multilang.ShellMsg;
+import backtype.storm.multilang.SpoutMsg;
+import backtype.storm.task.TopologyContext;
+import backtype.storm.utils.Utils;
+
+import org.apache.log4j.Logger;
+import org.msgpack.MessagePack;
+import org.msgpack.type.Value;
+import org.msgpack.unpacker.Unpacker;
+
+/**
+ * Length-prefixed binary framing serializer. Every frame is made of the frame
+ * length and the header length (both 4 bytes, big endian), a msgpack array
+ * header whose first element is an integer message code and, for messages
+ * carrying a tuple, a msgpack array of values.
+ *
+ * Please keep in sync with pyleus.storm.serializers.binary_serializer.
+ */
+public class BinarySerializer implements ISerializer {
+    public static Logger LOG = Logger.getLogger(BinarySerializer.class);
+
+    // Storm -> component message codes
+    public static final int SETUP = 0;
+    public static final int BOLT_TUPLE = 1;
+    public static final int SPOUT_COMMAND = 2;
+    public static final int TASK_IDS = 3;
+
+    // Component -> Storm message codes and spout commands
+    public static final int PID = 0;
+    public static final int EMIT = 1;
+    public static final int ACK = 2;
+    public static final int FAIL = 3;
+    public static final int SYNC = 4;
+    public static final int LOG_MSG = 5;
+    public static final int ERROR = 6;
+    public static final int NEXT = 7;
+
+    private DataOutputStream processIn;
+    private DataInputStream processOut;
+    private MessagePack msgPack;
+    // Streams declared by the component, sorted by name. Python components
+    // refer to streams by their index in this list.
+    private List<String> streams = new ArrayList<String>();
+
+    @Override
+    public void initialize(OutputStream processIn, InputStream processOut) {
+        this.processIn = new DataOutputStream(processIn);
+        this.processOut = new DataInputStream(processOut);
+        this.msgPack = new MessagePack();
+    }
+
+    @SuppressWarnings("unchecked")
+    private Map<String, Object> getMapFromContext(TopologyContext context) {
+        Map context_map = new HashMap();
+        context_map.put("taskid", context.getThisTaskId());
+        context_map.put("task->component", context.getTaskToComponent());
+        return context_map;
+    }
+
+    private void initializeStreams(TopologyContext context) {
+        TreeSet<String> sortedStreams = new TreeSet<String>();
+        for (String stream : context.getThisStreams()) {
+            // Skip Storm system streams
+            if (!stream.startsWith("__")) {
+                sortedStreams.add(stream);
+            }
+        }
+        this.streams = new ArrayList<String>(sortedStreams);
+    }
+
+    @Override
+    public Number connect(Map conf, TopologyContext context) throws IOException,
+    NoOutputException {
+        initializeStreams(context);
+
+        // Create the setup message for the initial handshake
+        Map<String, Object> setupmsg = new HashMap<String, Object>();
+        setupmsg.put("conf", conf);
+        setupmsg.put("pidDir", context.getPIDDir());
+        setupmsg.put("context", getMapFromContext(context));
+        writeFrame(Arrays.<Object>asList(SETUP, setupmsg), null);
+
+        Unpacker unpacker = readFrame();
+        Value[] header = unpacker.readValue().asArrayValue().getElementArray();
+        if (header[0].asIntegerValue().getInt() != PID) {
+            throw new NoOutputException("Expected pid message during handshake");
+        }
+        return header[1].asIntegerValue().getInt();
+    }
+
+    private static boolean isNil(Value value) {
+        return value == null || value.isNilValue();
+    }
+
+    private String decodeStream(Value value) {
+        if (isNil(value)) {
+            return Utils.DEFAULT_STREAM_ID;
+        }
+        if (value.isIntegerValue()) {
+            return this.streams.get(value.asIntegerValue().getInt());
+        }
+        return value.asRawValue().getString();
+    }
+
+    private static Object decodeId(Value value) {
+        if (isNil(value)) {
+            return null;
+        }
+        /* As in MessagePackSerializer, turn numeric ids into strings. */
+        if (value.isIntegerValue()) {
+            return value.asIntegerValue().toString();
+        }
+        return value.asRawValue().getString();
+    }
+
+    @Override
+    public ShellMsg readShellMsg() throws IOException, NoOutputException {
+        Unpacker unpacker = readFrame();
+        Value[] header = unpacker.readValue().asArrayValue().getElementArray();
+        int code = header[0].asIntegerValue().getInt();
+
+        ShellMsg shellMsg = new ShellMsg();
+        shellMsg.setStream(Utils.DEFAULT_STREAM_ID);
+        shellMsg.setTask(0);
+        shellMsg.setNeedTaskIds(true);
+
+        switch (code) {
+            case EMIT:
+                shellMsg.setCommand("emit");
+                shellMsg.setStream(decodeStream(header[1]));
+                shellMsg.setId(decodeId(header[2]));
+                if (!isNil(header[3])) {
+                    for (Value anchor : header[3].asArrayValue()) {
+                        shellMsg.addAnchor(anchor.asRawValue().getString());
+                    }
+                }
+                if (!isNil(header[4])) {
+                    shellMsg.setTask(header[4].asIntegerValue().getLong());
+                }
+                shellMsg.setNeedTaskIds(header[5].asBooleanValue().getBoolean());
+                for (Value element : unpacker.readValue().asArrayValue()) {
+                    shellMsg.addTuple(MessagePackSerializer.valueToJavaType(element));
+                }
+                break;
+            case ACK:
+                shellMsg.setCommand("ack");
+                shellMsg.setId(decodeId(header[1]));
+                break;
+            case FAIL:
+                shellMsg.setCommand("fail");
+                shellMsg.setId(decodeId(header[1]));
+                break;
+            case SYNC:
+                shellMsg.setCommand("sync");
+                break;
+            case LOG_MSG:
+                shellMsg.setCommand("log");
+                shellMsg.setMsg(header[1].asRawValue().getString());
+                if (!isNil(header[2])) {
+                    shellMsg.setLogLevel(header[2].asIntegerValue().getInt());
+                }
+                break;
+            case ERROR:
+                shellMsg.setCommand("error");
+                shellMsg.setMsg(header[1].asRawValue().getString());
+                break;
+            default:
+                throw new IOException(String.format("Unknown message code: %d", code));
+        }
+        return shellMsg;
+    }
+
+    @Override
+    public void writeBoltMsg(BoltMsg boltMsg) throws IOException {
+        List<Object> header = Arrays.<Object>asList(BOLT_TUPLE,
+                boltMsg.getId(), boltMsg.getComp(), boltMsg.getStream(), boltMsg.getTask());
+        writeFrame(header, boltMsg.getTuple());
+    }
+
+    private static int spoutCommandCode(String command) {
+        if (command.equals("next")) {
+            return NEXT;
+        } else if (command.equals("ack")) {
+            return ACK;
+        } else if (command.equals("fail")) {
+            return FAIL;
+        }
+        throw new RuntimeException(String.format("Unknown spout command: %s", command));
+    }
+
+    @Override
+    public void writeSpoutMsg(SpoutMsg spoutMsg) throws IOException {
+        List<Object> header = Arrays.<Object>asList(SPOUT_COMMAND,
+                spoutCommandCode(spoutMsg.getCommand()), spoutMsg.getId());
+        writeFrame(header, null);
+    }
+
+    @Override
+    public void writeTaskIds(List<Integer> taskIds) throws IOException {
+        writeFrame(Arrays.<Object>asList(TASK_IDS, taskIds), null);
+    }
+
+    private Unpacker readFrame() throws IOException, NoOutputException {
+        int frameLength;
+        try {
+            frameLength = this.processOut.readInt();
+        } catch (EOFException e) {
+            throw new NoOutputException("Pipe to subprocess seems to be broken!");
+        }
+        // Header length is only needed by lazy readers, skip it
+        this.processOut.readInt();
+
+        byte[] frame = new byte[frameLength];
+        this.processOut.readFully(frame);
+        return msgPack.createUnpacker(new ByteArrayInputStream(frame));
+    }
+
+    private void writeFrame(List<Object> header, List<Object> values) throws IOException {
+        ByteArrayOutputStream frame = new ByteArrayOutputStream();
+        msgPack.write(frame, header);
+        int headerLength = frame.size();
+        if (values != null) {
+            msgPack.write(frame, values);
+        }
+
+        this.processIn.writeInt(frame.size());
+        this.processIn.writeInt(headerLength);
+        frame.writeTo(this.processIn);
+        this.processIn.flush();
+    }
+}
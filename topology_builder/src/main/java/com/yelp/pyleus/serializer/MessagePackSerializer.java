@@ -146,7 +146,7 @@ public class MessagePackSerializer implements ISerializer {
         return shellMsg;
     }
 
-    private Object valueToJavaType(Value element) {
+    static Object valueToJavaType(Value element) {
         switch (element.getType()) {
             case RAW:
                 return element.asRawValue().getString();
@@ -19,6 +19,7 @@ public class TopologySpec {
 
     public static final String JSON_SERIALIZER = "json";
     public static final String MSGPACK_SERIALIZER = "msgpack";
+    public static final String BINARY_SERIALIZER = "binary";
 
     public String name;
     public List<ComponentSpec> topology;
@@ -36,6 +37,15 @@ public class TopologySpec {
     public Integer transfer_buffer_size = -1;
 
     public String serializer = MSGPACK_SERIALIZER;
+    public String json_backend;
+    public Integer read_buffer_size = -1;
+    public Boolean output_buffering = false;
+    public Integer output_buffer_size = -1;
+    public Integer output_buffer_max_messages = -1;
+    public Boolean need_task_ids = true;
+    public Boolean lazy_task_ids = false;
+    public String state_dir;
+    public String state_backend;
     public String logging_config;
     @SuppressWarnings("unused")
     public String requirements_filename; // Not used in Java.